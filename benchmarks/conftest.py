@@ -0,0 +1,86 @@
+import os
+import sys
+
+# Typstwriter parses the command line when it is imported, it must not see the arguments of pytest
+sys.argv = sys.argv[:1]
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("QT_API", "pyside6")
+
+import pytest  # noqa: E402
+
+from typstwriter import journal  # noqa: E402
+
+# The baselines are stored next to the benchmarks unless another storage is given
+baseline_storage = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Number of lines of the synthetic documents
+document_sizes = (1_000, 10_000, 100_000)
+
+# A section of a Typst document, repeated to build the synthetic documents
+section = """= Section {i}
+#let value{i} = {i} * 2
+
+Some text with *strong*, _emphasized_ and `raw` content, a label <sec{i}> and a reference @sec{i}.
+$ sum_(k=0)^{i} k^2 = (n (n + 1) (2n + 1)) / 6 $
+// A comment about section {i}
+- A list item with #value{i}
+  + A nested item with a #link("https://typst.app")[link]
+#figure(image("figure{i}.png"), caption: [Figure {i}])
+
+"""
+
+
+def typst_document(lines):
+    """Return a synthetic Typst document with the given number of lines."""
+    text = []
+    count = 0
+    i = 0
+    while count < lines:
+        part = section.format(i=i).splitlines(keepends=True)[: lines - count]
+        text.extend(part)
+        count += len(part)
+        i += 1
+    return "".join(text)
+
+
+def pytest_addoption(parser):
+    """Add the option to select the document sizes."""
+    parser.addoption(
+        "--document-sizes",
+        default=",".join(str(s) for s in document_sizes),
+        help="Comma separated numbers of lines of the synthetic documents.",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Store the baselines next to the benchmarks."""
+    if config.getoption("benchmark_storage") == "file://./.benchmarks":
+        config.option.benchmark_storage = "file://" + baseline_storage
+
+
+def pytest_generate_tests(metafunc):
+    """Parametrize the benchmarks over the document sizes."""
+    if "lines" in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption("document_sizes").split(",")]
+        metafunc.parametrize("lines", sizes, ids=[f"{s}_lines" for s in sizes])
+
+
+@pytest.fixture
+def document(lines):
+    """Return a synthetic Typst document."""
+    return typst_document(lines)
+
+
+@pytest.fixture
+def rounds(lines):
+    """Return the number of rounds of the benchmarks, fewer for larger documents."""
+    return max(1, min(10, 20_000 // lines))
+
+
+@pytest.fixture(autouse=True)
+def journal_directory(tmp_path, monkeypatch):
+    """Keep the journals of the benchmarked editor pages out of the user data directory."""
+    directory = tmp_path / "journal"
+    monkeypatch.setattr(journal, "journal_directory", lambda: str(directory))
+    return directory
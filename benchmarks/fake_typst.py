@@ -0,0 +1,151 @@
+"""
+A scripted stand-in for the typst executable, used to benchmark the compile loop without typst.
+
+It understands the compile and watch subcommands. The source is not typeset: every compilation writes a PDF with the
+requested number of pages, padded to the requested size, and reports an unknown variable for every occurrence of
+#undefined in the source. The watch subcommand polls the source and emits the same stderr as typst watch.
+
+Usage: python benchmarks/fake_typst.py [--pages 1] [--size 0] [--delay 0] [--poll 5] {compile,watch} input output
+"""
+
+import argparse
+import datetime
+import os
+import re
+import sys
+import time
+
+# Size of a page, A4 in points
+media_box = "0 0 595 842"
+
+# Occurrences of this variable in the source are reported as errors
+undefined = re.compile(r"#undefined\b")
+
+# Escape sequence clearing the terminal, typst watch clears it before every status
+clear_screen = "\x1b[2J\x1b[1;1H"
+
+
+def pdf(pages, size, revision):
+    """Return a PDF with the given number of pages, padded with comments to about size bytes."""
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    font = 3 + 2 * pages
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(pages))}] /Count {pages} >>".encode(),
+    ]
+
+    # Distribute the padding over the content streams of the pages
+    padding = max(0, size - 250 * pages - 500) // pages
+    filler = b"% " + b"x" * 61 + b"\n"
+    for i in range(pages):
+        text = f"BT /F1 24 Tf 72 770 Td (Page {i + 1}, revision {revision}) Tj ET\n".encode()
+        stream = text + filler * (padding // len(filler))
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [{media_box}] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"endstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    body = bytearray(header)
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(body)
+
+
+def diagnostics(path, source):
+    """Return the errors typst would report for source, formatted like typst does."""
+    reports = []
+    for number, line in enumerate(source.splitlines(), 1):
+        for match in undefined.finditer(line):
+            gutter = " " * len(str(number))
+            reports.append(
+                "error: unknown variable: undefined\n"
+                f"{gutter} ┌─ {path}:{number}:{match.start() + 2}\n"
+                f"{gutter} │\n"
+                f"{number} │ {line}\n"
+                f"{gutter} │ {' ' * (match.start() + 1)}{'^' * (len(match.group()) - 1)}\n"
+            )
+    return "\n".join(reports)
+
+
+def compile_document(args, revision):
+    """Compile the input once and return the errors and the time it took in ms."""
+    start = time.perf_counter()
+    with open(args.input, encoding="utf8") as f:
+        source = f.read()
+    time.sleep(args.delay / 1000)
+
+    errors = diagnostics(os.path.relpath(args.input), source)
+    if not errors:
+        with open(args.output, "wb") as f:
+            f.write(pdf(args.pages, args.size, revision))
+    return (errors, 1000 * (time.perf_counter() - start))
+
+
+def write(text):
+    """Write text to stderr right away."""
+    sys.stderr.buffer.write(text.encode("utf8"))
+    sys.stderr.buffer.flush()
+
+
+def status(args, text, details=""):
+    """Write a status line of typst watch, followed by details in the same write like typst does."""
+    now = datetime.datetime.now().strftime("%H:%M:%S")
+    write(f"{clear_screen}watching {args.input}\nwriting to {args.output}\n\n[{now}] {text}\n{details}")
+
+
+def watch(args):
+    """Compile the input every time it changes."""
+    revision = 0
+    source = None
+    while True:
+        try:
+            with open(args.input, "rb") as f:
+                current = f.read()
+        except OSError:
+            current = None
+
+        if current is not None and current != source:
+            source = current
+            revision += 1
+            status(args, "compiling ...")
+            (errors, duration) = compile_document(args, revision)
+            if errors:
+                status(args, "compiled with errors", f"\n{errors}")
+            else:
+                status(args, f"compiled successfully in {duration:.2f}ms")
+
+        time.sleep(args.poll / 1000)
+
+
+def main():
+    """Run the subcommand."""
+    parser = argparse.ArgumentParser(description="A scripted stand-in for typst.")
+    parser.add_argument("--pages", type=int, default=1, help="Number of pages of the written PDF.")
+    parser.add_argument("--size", type=int, default=0, help="Approximate size of the written PDF in bytes.")
+    parser.add_argument("--delay", type=float, default=0, help="Simulated compilation time in ms.")
+    parser.add_argument("--poll", type=float, default=5, help="Interval in ms in which watch checks the input.")
+    parser.add_argument("command", choices=["compile", "watch"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "watch":
+        watch(args)
+
+    (errors, _) = compile_document(args, 1)
+    if errors:
+        write(errors)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""A harness driving the compile loop, from an edit of the source to the reloaded PDF, with the fake typst."""
+
+from qtpy import QtCore
+
+import os
+import sys
+import time
+
+from typstwriter import compiler
+from typstwriter import enums
+from typstwriter import file_io
+from typstwriter import pdf_viewer
+
+# The script standing in for typst
+fake_typst_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_typst.py")
+
+
+def fake_typst(directory, pages=1, size=0, delay=0):
+    """Write an executable running the fake typst with the given options to directory and return its path."""
+    path = os.path.join(directory, "typst")
+    with open(path, "w") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{fake_typst_path}" --pages {pages} --size {size} --delay {delay} "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+class CompilePipeline(QtCore.QObject):
+    """
+    Connects a WrappedCompilerConnector to a PDFViewer like the main window does and times edits of the source.
+
+    The compiler is taken from the configuration, so the fake typst has to be configured before the pipeline is
+    created.
+    """
+
+    def __init__(self, compiler_mode, source, output):
+        """Init."""
+        super().__init__()
+
+        self.compiler_mode = compiler_mode
+        self.source = source
+        self.output = output
+        self.revision = 0
+
+        self.edited = None
+        self.changed = None
+        self.reloaded = None
+        self.loop = None
+
+        self.connector = compiler.WrappedCompilerConnector(compiler_mode, source, output)
+        self.viewer = pdf_viewer.PDFViewer()
+
+        # The viewer reloads in between, so the slots see the time before and after the reload
+        self.connector.document_changed.connect(self.document_changed)
+        self.connector.document_changed.connect(self.viewer.reload)
+        self.connector.document_changed.connect(self.reload_finished)
+
+    def start(self, timeout=10):
+        """Write the source, wait for the first compilation and open the PDF in the viewer."""
+        self.edit(timeout)
+        self.viewer.open(self.output)
+
+    def stop(self):
+        """Stop the compiler and wait for its process to finish."""
+        process = self.connector.CompilerConnector.process
+        if process is not None:
+            self.connector.stop()
+            process.waitForFinished(1000)
+
+    def edit(self, timeout=10):
+        """
+        Change the source and wait until the viewer reloaded the PDF.
+
+        Return the seconds from the edit until document_changed was emitted and until the reload finished.
+        """
+        self.revision += 1
+        self.changed = None
+        self.reloaded = None
+
+        self.edited = time.perf_counter()
+        file_io.atomic_write(self.source, f"= Revision {self.revision}\n\nSome text.\n", fsync=False)
+
+        if self.compiler_mode is enums.compiler_mode.on_demand or self.connector.CompilerConnector.process is None:
+            self.connector.start()
+
+        if self.reloaded is None:
+            self.loop = QtCore.QEventLoop()
+            QtCore.QTimer.singleShot(int(1000 * timeout), self.loop.quit)
+            self.loop.exec()
+            self.loop = None
+        if self.reloaded is None:
+            raise TimeoutError(f"The PDF was not reloaded within {timeout} s.")
+
+        return (self.changed - self.edited, self.reloaded - self.edited)
+
+    @QtCore.Slot()
+    def document_changed(self):
+        """Record the time the compiler reported the changed document."""
+        self.changed = time.perf_counter()
+
+    @QtCore.Slot()
+    def reload_finished(self):
+        """Record the time the viewer finished reloading."""
+        self.reloaded = time.perf_counter()
+        if self.loop is not None:
+            self.loop.quit()
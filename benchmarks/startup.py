@@ -0,0 +1,125 @@
+"""
+Measure the time from launching Typstwriter until its main window is painted for the first time.
+
+Every run starts a fresh interpreter with -X importtime, so the imports are measured as well. The script fails if the
+median time to first paint exceeds the budget.
+
+Usage: python benchmarks/startup.py [--runs 5] [--budget 2000] [--mode lazy] [--imports 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode):
+    """Start Typstwriter and report the time to first paint once the main window is painted."""
+    spawned = float(os.environ["TYPSTWRITER_BENCHMARK_SPAWNED"])
+    sys.argv = sys.argv[:1]
+    sys.path.insert(0, root)
+    os.environ["QT_API"] = "pyside6"
+
+    from qtpy import QtCore  # noqa: PLC0415
+    from qtpy import QtWidgets  # noqa: PLC0415
+
+    from typstwriter import configuration  # noqa: PLC0415
+    from typstwriter import lazy  # noqa: PLC0415
+
+    configuration.Config.set("General", "startup_mode", mode)
+
+    from typstwriter import mainwindow  # noqa: PLC0415
+
+    class FirstPaint(QtCore.QObject):
+        """Report the first paint event of a widget of the main window and quit."""
+
+        window = None
+
+        def eventFilter(self, obj, event):  # This is an overriding function # noqa: N802
+            """Wait for the first paint."""
+            if (
+                event.type() == QtCore.QEvent.Type.Paint
+                and isinstance(obj, QtWidgets.QWidget)
+                and self.window is not None
+                and obj.window() is self.window
+            ):
+                report = {"first_paint": time.time() - spawned, "lazy_imports": lazy.import_times}
+                print(json.dumps(report), flush=True)
+                # Only the startup is measured, closing would save the session
+                os._exit(0)
+            return False
+
+    app = QtWidgets.QApplication(sys.argv)
+    first_paint = FirstPaint()
+    app.installEventFilter(first_paint)
+    first_paint.window = mainwindow.MainWindow()
+    first_paint.window.show()
+    app.exec()
+
+
+def import_times(stderr, count):
+    """Return the count slowest imports with their cumulative time in ms from the output of -X importtime."""
+    times = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            (_, cumulative, name) = line.removeprefix("import time:").split("|")
+            times.append((int(cumulative) / 1000, name.strip()))
+    return sorted(times, reverse=True)[:count]
+
+
+def run(mode):
+    """Launch Typstwriter once and return its report and the output of -X importtime."""
+    env = {**os.environ, "TYPSTWRITER_BENCHMARK_SPAWNED": repr(time.time())}
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", "--mode", mode],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=root,
+    )
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    return (report, process.stderr)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure the time to first paint of Typstwriter.")
+    parser.add_argument("--runs", type=int, default=5, help="The number of launches.")
+    parser.add_argument("--budget", type=float, default=2000, help="The allowed median time to first paint in ms.")
+    parser.add_argument("--mode", choices=["eager", "lazy"], default="lazy", help="The startup mode.")
+    parser.add_argument("--imports", type=int, default=15, help="The number of slowest imports to show.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.mode)
+        return
+
+    times = []
+    for i in range(args.runs):
+        (report, stderr) = run(args.mode)
+        times.append(1000 * report["first_paint"])
+        print(f"Run {i + 1}: first paint after {times[-1]:.0f} ms")
+
+    print(f"\nSlowest imports of the last run ({args.mode} startup):")
+    for cumulative, name in import_times(stderr, args.imports):
+        print(f"{cumulative:10.1f} ms  {name}")
+    for name, seconds in report["lazy_imports"].items():
+        print(f"{1000 * seconds:10.1f} ms  {name} (lazy, before first paint)")
+
+    median = statistics.median(times)
+    print(f"\nMedian time to first paint: {median:.0f} ms, budget {args.budget:.0f} ms")
+    if median > args.budget:
+        print("Over budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import collections
+
+import pytest
+
+from pipeline import CompilePipeline
+from pipeline import fake_typst
+
+from typstwriter import compiler
+from typstwriter import enums
+
+# Number of pages and approximate size in bytes of the PDFs written by the fake typst
+documents = [(1, 10_000), (50, 1_000_000), (500, 10_000_000)]
+
+
+@pytest.fixture(params=documents, ids=[f"{pages}_pages_{size // 1000}kB" for pages, size in documents])
+def document(request):
+    """Return the number of pages and the size of the PDF."""
+    return request.param
+
+
+@pytest.fixture
+def typst(tmp_path, monkeypatch, document):
+    """Configure the fake typst writing PDFs of the requested pages and size."""
+    path = fake_typst(str(tmp_path), *document)
+    monkeypatch.setitem(compiler.config.config["Compiler"], "name", path)
+    return path
+
+
+@pytest.fixture(params=[enums.compiler_mode.live, enums.compiler_mode.on_demand], ids=["live", "on_demand"])
+def pipeline(request, qtbot, tmp_path, typst):
+    """Return a started compile pipeline."""
+    pipeline = CompilePipeline(request.param, str(tmp_path / "main.typ"), str(tmp_path / "main.pdf"))
+    qtbot.addWidget(pipeline.viewer)
+    pipeline.start()
+    yield pipeline
+    pipeline.stop()
+
+
+def test_edit(benchmark, pipeline, document):
+    """Benchmark the time from an edit of the source until the viewer reloaded the PDF."""
+    timings = []
+
+    def edit():
+        timings.append(pipeline.edit())
+
+    benchmark.pedantic(edit, rounds=10)
+
+    # The time until document_changed covers the fake typst, the connector and parsing its output
+    benchmark.extra_info["document_changed"] = min(changed for changed, _ in timings)
+    benchmark.extra_info["reload"] = min(reloaded - changed for changed, reloaded in timings)
+    assert pipeline.viewer.m_document.pageCount() == document[0]
+
+
+def test_error_report(qtbot, tmp_path, monkeypatch):
+    """Make sure the errors reported by the fake typst are parsed like the ones of typst."""
+    monkeypatch.setitem(compiler.config.config["Compiler"], "name", fake_typst(str(tmp_path)))
+    monkeypatch.setattr(compiler.state.working_directory, "Value", str(tmp_path))
+    source = tmp_path / "main.typ"
+    source.write_text("= Heading\n\nSome #undefined text.\n")
+    connector = compiler.WrappedCompilerConnector(enums.compiler_mode.live, str(source), str(tmp_path / "main.pdf"))
+
+    with qtbot.waitSignal(connector.error_report, timeout=10000) as blocker:
+        connector.start()
+    process = connector.CompilerConnector.process
+    connector.stop()
+    process.waitForFinished(1000)
+
+    assert blocker.args[0] == collections.defaultdict(list, {str(source): [("unknown variable: undefined", 3, 7, 9)]})
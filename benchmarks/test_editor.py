@@ -0,0 +1,143 @@
+from qtpy import QtGui
+
+from typstwriter import editor
+from typstwriter import enums
+
+
+def code_edit(qtbot, document, highlight_syntax=False, show_line_numbers=False):
+    """Return a code editor showing document."""
+    edit = editor.CodeEdit(highlight_synatx=highlight_syntax, show_line_numbers=show_line_numbers, syntax="Typst")
+    qtbot.addWidget(edit)
+    edit.setPlainText(document)
+    return edit
+
+
+def select_all(edit):
+    """Select the whole document."""
+    cursor = edit.textCursor()
+    cursor.select(QtGui.QTextCursor.SelectionType.Document)
+    edit.setTextCursor(cursor)
+
+
+class TestEditorPage:
+    """Benchmark editor.EditorPage."""
+
+    def test_load(self, benchmark, qtbot, tmp_path, document, rounds):
+        """Benchmark loading a file, until the whole document is shown."""
+        path = tmp_path / "document.typ"
+        path.write_text(document)
+
+        def setup():
+            page = editor.EditorPage()
+            qtbot.addWidget(page)
+            return ((page,), {})
+
+        def load(page):
+            page.load(str(path))
+            qtbot.waitUntil(lambda: not page.isloading, timeout=60000)
+
+        benchmark.pedantic(load, setup=setup, rounds=rounds)
+
+    def test_write(self, benchmark, qtbot, tmp_path, document, rounds):
+        """Benchmark writing a file, until it is on disk."""
+        path = tmp_path / "document.typ"
+        path.write_text(document)
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+        qtbot.waitUntil(lambda: not page.isloading, timeout=60000)
+
+        assert benchmark.pedantic(page.write, kwargs={"wait": True}, rounds=rounds)
+
+
+class TestSyntaxHighlighting:
+    """Benchmark syntax_highlighting.CodeSyntaxHighlight."""
+
+    def test_rehighlight(self, benchmark, qtbot, document, rounds):
+        """Benchmark highlighting the whole document."""
+        edit = code_edit(qtbot, document, highlight_syntax=True)
+
+        benchmark.pedantic(edit.highlighter.rehighlight, rounds=rounds)
+
+    def test_keystroke(self, benchmark, qtbot, document):
+        """Benchmark highlighting after typing a character in the middle of the document."""
+        edit = code_edit(qtbot, document, highlight_syntax=True)
+        cursor = QtGui.QTextCursor(edit.document().findBlockByNumber(edit.document().blockCount() // 2))
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.EndOfBlock)
+
+        def keystroke():
+            cursor.insertText("x")
+            cursor.deletePreviousChar()
+
+        benchmark(keystroke)
+
+
+class TestSearch:
+    """Benchmark searching and replacing in editor.CodeEdit."""
+
+    def test_highlight_all_matches(self, benchmark, qtbot, document, rounds):
+        """Benchmark highlighting all matches of a query."""
+        edit = code_edit(qtbot, document)
+
+        benchmark.pedantic(edit.highlight_all_matches, args=("section", enums.search_mode.case_insensitive), rounds=rounds)
+        assert edit.any_match_found
+
+    def test_highlight_all_matches_regex(self, benchmark, qtbot, document, rounds):
+        """Benchmark highlighting all matches of a regular expression."""
+        edit = code_edit(qtbot, document)
+
+        benchmark.pedantic(edit.highlight_all_matches, args=(r"#\w+\(", enums.search_mode.regex), rounds=rounds)
+        assert edit.any_match_found
+
+    def test_replace_all_matches(self, benchmark, qtbot, document, rounds):
+        """Benchmark replacing all matches of a query."""
+        edit = code_edit(qtbot, document)
+
+        def setup():
+            edit.setPlainText(document)
+            return (("section", enums.search_mode.case_insensitive, "chapter"), {})
+
+        benchmark.pedantic(edit.replace_all_matches, setup=setup, rounds=rounds)
+        assert "section" not in edit.toPlainText().lower()
+
+
+class TestLineOperations:
+    """Benchmark the operations of editor.CodeEdit on all selected lines."""
+
+    def benchmark_operation(self, benchmark, qtbot, document, rounds, operation):
+        """Benchmark the operation on the whole document."""
+        edit = code_edit(qtbot, document)
+
+        def setup():
+            edit.setPlainText(document)
+            select_all(edit)
+            return ((), {})
+
+        benchmark.pedantic(lambda: operation(edit), setup=setup, rounds=rounds)
+        return edit
+
+    def test_indent(self, benchmark, qtbot, document, rounds):
+        """Benchmark indenting all lines."""
+        self.benchmark_operation(benchmark, qtbot, document, rounds, editor.CodeEdit.indent)
+
+    def test_comment(self, benchmark, qtbot, document, rounds):
+        """Benchmark commenting all lines."""
+        self.benchmark_operation(benchmark, qtbot, document, rounds, editor.CodeEdit.comment)
+
+    def test_toggle_comment(self, benchmark, qtbot, document, rounds):
+        """Benchmark toggling the comment of all lines."""
+        edit = self.benchmark_operation(benchmark, qtbot, document, rounds, editor.CodeEdit.toggle_comment)
+        assert edit.toPlainText().startswith("//")
+
+
+class TestLineNumberWidget:
+    """Benchmark editor.LineNumberWidget."""
+
+    def test_paint(self, benchmark, qtbot, document):
+        """Benchmark painting the line numbers in the middle of the document."""
+        edit = code_edit(qtbot, document, highlight_syntax=True, show_line_numbers=True)
+        edit.resize(800, 1000)
+        edit.show()
+        qtbot.waitExposed(edit)
+        edit.jump_to(edit.document().findBlockByNumber(edit.document().blockCount() // 2).position())
+
+        benchmark(edit.line_numbers.grab)
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from typstwriter import file_index
+
+# Number of paths of the synthetic projects
+project_sizes = (10_000, 100_000)
+
+# Queries typed into Go to File, from common prefixes to scattered characters matching few paths
+queries = ("m", "main", "intro12", "thesis/intro", "chtyp", "tsidr", "zzz")
+
+
+def project(size):
+    """Return the paths of a synthetic project with the given number of files."""
+    rng = random.Random(size)
+    directories = ["src", "lib", "docs", "thesis", "paper", "data", "tests", "chapters", "images", "vendor/pkg"]
+    names = ["main", "intro", "util", "figure", "notes", "appendix", "chapter", "config", "readme", "data"]
+    extensions = [".typ", ".bib", ".png", ".py", ".md", ".json"]
+    paths = set()
+    while len(paths) < size:
+        directory = "/".join(rng.choice(directories) for _ in range(rng.randint(1, 4)))
+        paths.add(f"{directory}/{rng.choice(names)}{rng.randint(0, 20_000)}{rng.choice(extensions)}")
+    return sorted(paths)
+
+
+@pytest.fixture(params=project_sizes, ids=[f"{s}_files" for s in project_sizes])
+def matcher(request):
+    """Return a matcher of a synthetic project."""
+    return file_index.Matcher(project(request.param))
+
+
+@pytest.mark.parametrize("query", queries)
+def test_search(benchmark, matcher, query):
+    """Benchmark searching a project for the matches shown by Go to File, which has to fit in a frame."""
+    benchmark(matcher.search, query)
+
+
+def test_build(benchmark):
+    """Benchmark building the matcher of 100 000 paths, which runs on the worker thread after every update."""
+    paths = project(100_000)
+    benchmark(file_index.Matcher, paths)
@@ -0,0 +1,115 @@
+"""
+A scripted language server for testing typstwriter.lsp.
+
+It applies the changes it receives to its own copy of every document, publishes a diagnostic for every occurrence of
+the word error, answers completion and semantic token requests with fixed results and returns its copy of a document on
+the custom request fake/text. Run with the argument full, it asks for full instead of incremental document sync.
+"""
+
+import json
+import sys
+
+
+def read():
+    """Read a message from stdin."""
+    length = None
+    while True:
+        line = sys.stdin.buffer.readline()
+        if not line:
+            return None
+        if not line.strip():
+            break
+        (name, _, value) = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    return json.loads(sys.stdin.buffer.read(length))
+
+
+def write(message):
+    """Write a message to stdout."""
+    body = json.dumps(message).encode("utf-8")
+    sys.stdout.buffer.write(b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    sys.stdout.buffer.flush()
+
+
+def offset(text, position):
+    """Return the offset in UTF-16 code units of an LSP position in text."""
+    lines = text.split("\n")
+    preceding = sum(len(line.encode("utf-16-le")) // 2 + 1 for line in lines[: position["line"]])
+    return preceding + position["character"]
+
+
+def apply(text, change):
+    """Apply a content change to text."""
+    if "range" not in change:
+        return change["text"]
+    units = text.encode("utf-16-le")
+    start = 2 * offset(text, change["range"]["start"])
+    end = 2 * offset(text, change["range"]["end"])
+    return (units[:start] + change["text"].encode("utf-16-le") + units[end:]).decode("utf-16-le")
+
+
+def publish(uri, text):
+    """Publish a diagnostic for every occurrence of the word error."""
+    diagnostics = []
+    for number, line in enumerate(text.split("\n")):
+        column = line.find("error")
+        if column != -1:
+            span = {"start": {"line": number, "character": column}, "end": {"line": number, "character": column + 5}}
+            diagnostics.append({"range": span, "severity": 1, "message": "error found"})
+    write({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics", "params": {"uri": uri, "diagnostics": diagnostics}})
+
+
+def respond(message, result):
+    """Respond to a request."""
+    write({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+
+def sync(method, params, documents):
+    """Update the copies of the documents and publish their diagnostics."""
+    uri = params["textDocument"]["uri"]
+    if method == "textDocument/didOpen":
+        documents[uri] = params["textDocument"]["text"]
+    elif method == "textDocument/didChange":
+        for change in params["contentChanges"]:
+            documents[uri] = apply(documents[uri], change)
+    else:
+        documents.pop(uri)
+        return
+    publish(uri, documents[uri])
+
+
+def main():
+    """Serve until exit is received."""
+    documents = {}
+    while (message := read()) is not None:
+        method = message.get("method")
+        params = message.get("params")
+        if method == "initialize":
+            legend = {"tokenTypes": ["keyword", "heading"], "tokenModifiers": []}
+            change = 1 if "full" in sys.argv else 2
+            capabilities = {
+                "textDocumentSync": {"openClose": True, "change": change},
+                "semanticTokensProvider": {"legend": legend},
+            }
+            respond(message, {"capabilities": capabilities})
+            # Ask something of the client, which has to answer
+            write({"jsonrpc": "2.0", "id": "config", "method": "workspace/configuration", "params": {"items": [{}]}})
+        elif method in ("textDocument/didOpen", "textDocument/didChange", "textDocument/didClose"):
+            sync(method, params, documents)
+        elif method == "textDocument/completion":
+            respond(message, {"isIncomplete": False, "items": [{"label": "heading"}, {"label": "highlight"}]})
+        elif method == "textDocument/semanticTokens/full":
+            respond(message, {"data": [0, 0, 1, 1, 0, 1, 0, 4, 0, 0, 0, 5, 3, 0, 0]})
+        elif method == "fake/text":
+            respond(message, documents.get(params["uri"]))
+        elif method == "fake/crash":
+            sys.exit(1)
+        elif method == "shutdown":
+            respond(message, None)
+        elif method == "exit":
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from typstwriter import background
+
+
+class TestBackgroundJobs:
+    """Test background.BackgroundJobs."""
+
+    def test_report(self, qtbot):
+        """Make sure jobs are reported once on the GUI thread with their context."""
+        jobs = background.BackgroundJobs("Test")
+        reports = []
+        jobs.finished.connect(lambda future, context: reports.append((future.result(), context, threading.current_thread())))
+        with qtbot.waitSignal(jobs.finished):
+            jobs.submit("a", lambda: 1)
+            # Finished jobs are not reported before the event loop is reached
+            assert reports == []
+        assert reports == [(1, "a", threading.main_thread())]
+        assert not jobs.busy()
+        jobs.stop()
+
+    def test_wait(self, qtbot):
+        """Make sure wait reports the jobs in order, including the ones submitted while reporting."""
+        jobs = background.BackgroundJobs("Test", workers=2)
+        reports = []
+
+        def finished(future, context):
+            reports.append(context)
+            if context == "first":
+                jobs.submit("follow up", lambda: None)
+
+        jobs.finished.connect(finished)
+        jobs.submit("first", lambda: None)
+        jobs.submit("second", lambda: None)
+        assert jobs.contexts() == ["first", "second"]
+        jobs.wait()
+        assert reports == ["first", "second", "follow up"]
+
+        with qtbot.assertNotEmitted(jobs.finished, wait=50):
+            pass
+        jobs.stop()
+
+    def test_failure(self, qtbot):
+        """Make sure failed jobs are reported with their exception."""
+        jobs = background.BackgroundJobs("Test")
+        with qtbot.waitSignal(jobs.finished) as blocker:
+            jobs.submit(None, lambda: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            blocker.args[0].result()
+        jobs.stop()
+
+    def test_submit_after(self, qtbot):
+        """Make sure a job submitted after another one starts once it finished, without occupying a worker meanwhile."""
+        jobs = background.BackgroundJobs("Test", workers=2)
+        release = threading.Event()
+        first = jobs.submit("first", release.wait)
+        second = jobs.submit_after(first, "second", lambda: "done")
+        third = jobs.submit("third", lambda: None)
+        jobs.submit("fourth", lambda: None)
+        jobs.wait([third])
+        assert not second.done()
+        assert jobs.contexts() == ["first", "second", "fourth"]
+        release.set()
+        jobs.wait()
+        assert second.result() == "done"
+        jobs.stop()
+
+    def test_stop(self, qtbot):
+        """Make sure stopping cancels the jobs which did not start yet, unless told to keep them."""
+        jobs = background.BackgroundJobs("Test")
+        release = threading.Event()
+        first = jobs.submit(None, release.wait)
+        second = jobs.submit_after(first, None, lambda: None)
+        jobs.stop()
+        release.set()
+        assert second.cancelled()
+
+        jobs = background.BackgroundJobs("Test")
+        release = threading.Event()
+        first = jobs.submit(None, release.wait)
+        second = jobs.submit_after(first, None, lambda: "done")
+        jobs.stop(cancel=False)
+        release.set()
+        assert second.result(timeout=5) == "done"
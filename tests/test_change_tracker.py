@@ -0,0 +1,90 @@
+from qtpy import QtGui
+
+import pytest
+
+from typstwriter import change_tracker
+from typstwriter import editor
+
+
+@pytest.fixture()
+def edit(qtbot):
+    """Return a code edit holding a short document."""
+    edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=False)
+    qtbot.addWidget(edit)
+    edit.setPlainText("= Title\nSome text\n#let f(x) = {\n  x\n}\n")
+    return edit
+
+
+def insert(document, position, text, removed=0):
+    """Replace removed characters at position by text."""
+    cursor = QtGui.QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + removed, QtGui.QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(text)
+
+
+def replay(text, deltas):
+    """Apply deltas to text, which holds no characters outside the BMP."""
+    for d in deltas:
+        text = d.text if d.start is None else text[: d.position] + d.text + text[d.position + d.removed :]
+    return text
+
+
+class TestChangeTracker:
+    """Test change_tracker.ChangeTracker."""
+
+    def test_deltas(self, edit):
+        """Make sure edits are recorded with the lines and columns of the replaced range."""
+        tracker = change_tracker.ChangeTracker(edit.document())
+        (version, text) = tracker.snapshot()
+        assert version == 0
+
+        insert(edit.document(), 2, "Big ")
+        insert(edit.document(), 10, "\nNew", removed=6)
+        insert(edit.document(), 0, "")
+        assert tracker.version == 2  # noqa: PLR2004
+
+        deltas = tracker.deltas_since(0)
+        assert [(d.version, d.position, d.removed, d.text) for d in deltas] == [(1, 2, 0, "Big "), (2, 10, 6, "\nNew")]
+        assert (deltas[1].start, deltas[1].end) == ((0, 10), (1, 4))
+        assert replay(text, deltas) == edit.toPlainText()
+        assert [d.version for d in tracker.deltas_since(1)] == [2]
+        assert tracker.deltas_since(2) == []
+
+    def test_replaced_text(self, edit):
+        """Make sure replacing the whole text is recorded as such."""
+        tracker = change_tracker.ChangeTracker(edit.document())
+        edit.setPlainText("New\ntext")
+        # Qt first removes the old text, counting the final paragraph separator, and then inserts the new text
+        deltas = tracker.deltas_since(0)
+        assert [(d.start, d.text) for d in deltas] == [(None, ""), ((0, 0), "New\ntext")]
+        assert replay("anything", deltas) == "New\ntext"
+        assert tracker.line_lengths == [3, 4]
+
+        insert(edit.document(), 4, "more ")
+        assert tracker.deltas_since(tracker.version - 1)[0].start == (1, 0)
+
+    def test_history(self, edit, monkeypatch):
+        """Make sure consumers which fell too far behind are told to take a snapshot."""
+        monkeypatch.setattr(change_tracker, "history_length", 3)
+        tracker = change_tracker.ChangeTracker(edit.document())
+        for i in range(5):
+            insert(edit.document(), 0, str(i))
+
+        assert tracker.deltas_since(1) is None
+        assert [d.version for d in tracker.deltas_since(2)] == [3, 4, 5]
+        assert tracker.deltas_since(6) is None
+
+    def test_snapshot(self, edit):
+        """Make sure snapshots are shared until the text changes."""
+        tracker = change_tracker.ChangeTracker(edit.document())
+        assert tracker.snapshot() is tracker.snapshot()
+        insert(edit.document(), 0, "x")
+        assert tracker.snapshot() == (1, edit.toPlainText())
+
+    def test_folding(self, edit):
+        """Make sure folding, which only changes the layout, is not recorded as an edit."""
+        tracker = change_tracker.ChangeTracker(edit.document())
+        edit.folding.fold(edit.document().findBlockByNumber(2))
+        edit.folding.unfold(edit.document().findBlockByNumber(2))
+        assert tracker.version == 0
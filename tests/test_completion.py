@@ -0,0 +1,155 @@
+from qtpy import QtCore
+
+import pytest
+
+from typstwriter import completion
+from typstwriter import editor
+
+
+@pytest.fixture()
+def edit(qtbot):
+    """Return a code edit holding a short Typst document."""
+    edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=False)
+    qtbot.addWidget(edit)
+    edit.setPlainText("= Intro <intro>\n#let greeting(name) = name\n= Methods <methods>\n")
+    edit.moveCursor(edit.textCursor().MoveOperation.End)
+    return edit
+
+
+def texts(candidates):
+    """Return the texts of completion candidates."""
+    return [text for (text, _) in candidates]
+
+
+class TestSortedIndex:
+    """Test completion.SortedIndex."""
+
+    def test_prefixed(self):
+        """Make sure prefix lookups ignore case and return all matches in order."""
+        index = completion.SortedIndex([("image", "function"), ("import", "keyword"), ("Image", "label"), ("int", "function")])
+        assert len(index) == 4  # noqa: PLR2004
+        assert texts(index.prefixed("im")) == ["Image", "image", "import"]
+        assert texts(index.prefixed("IMA")) == ["Image", "image"]
+        assert index.prefixed("x") == []
+        assert len(index.prefixed("")) == 4  # noqa: PLR2004
+
+    def test_catalog(self):
+        """Make sure the bundled catalog provides builtins and symbols."""
+        assert ("image", "function") in completion.builtins().prefixed("ima")
+        assert ("let", "keyword") in completion.builtins().prefixed("le")
+        assert ("arrow.r", "symbol") in completion.symbols().prefixed("arrow.")
+
+
+class TestComplete:
+    """Test completion.complete."""
+
+    def test_fuzzy_score(self):
+        """Make sure consecutive matches and matches at word starts rank higher."""
+        assert completion.fuzzy_score("xyz", "arrow") is None
+        assert completion.fuzzy_score("arl", "arrow.l") > completion.fuzzy_score("arl", "parallel")
+        assert completion.fuzzy_score("ab", "ab") > completion.fuzzy_score("ab", "a.b")
+
+    def test_prefix_before_fuzzy(self):
+        """Make sure prefix matches come first, shortest first, followed by fuzzy matches."""
+        index = completion.SortedIndex((name, "function") for name in ("heading", "head", "hide", "the.heading", "table"))
+        assert texts(completion.complete("hea", [index])) == ["head", "heading", "the.heading"]
+        assert texts(completion.complete("hd", [index])) == ["head", "hide", "heading", "the.heading"]
+
+    def test_limit(self, monkeypatch):
+        """Make sure no more than limit candidates are returned."""
+        monkeypatch.setattr(completion, "limit", 3)
+        assert len(completion.complete("a", [completion.symbols()])) == 3  # noqa: PLR2004
+
+    def test_budget(self, monkeypatch):
+        """Make sure fuzzy matching stops once the budget is used up, but prefix matches are still found."""
+        monkeypatch.setattr(completion, "budget", -1)
+        index = completion.SortedIndex([("alpha", "symbol"), ("beta", "symbol")])
+        assert texts(completion.complete("al", [index])) == ["alpha"]
+        assert completion.complete("lh", [index]) == []
+
+
+class TestCompletionModel:
+    """Test completion.CompletionModel."""
+
+    def test_incremental_update(self, qtbot):
+        """Make sure only the changed rows are inserted and removed."""
+        model = completion.CompletionModel()
+        model.set_items([("a", "function"), ("b", "function"), ("c", "function")])
+        assert model.rowCount() == 3  # noqa: PLR2004
+
+        inserted = []
+        removed = []
+        resets = []
+        model.rowsInserted.connect(lambda _, first, last: inserted.append((first, last)))
+        model.rowsRemoved.connect(lambda _, first, last: removed.append((first, last)))
+        model.modelReset.connect(lambda: resets.append(True))
+
+        model.set_items([("a", "function"), ("c", "function"), ("d", "function")])
+        assert removed == [(1, 1)]
+        assert inserted == [(3, 3)]
+        assert resets == []
+        assert [model.data(model.index(i, 0)) for i in range(model.rowCount())] == ["a", "c", "d"]
+        assert model.data(model.index(0, 0), QtCore.Qt.ToolTipRole) == "function"
+
+
+class TestCompletion:
+    """Test completion.Completion."""
+
+    @pytest.mark.parametrize(
+        ("line", "prefix", "expected"),
+        [
+            ("See @me", "me", "methods"),
+            ("#gree", "gree", "greeting"),
+            ("#imag", "imag", "image"),
+            ("$sym.arrow.", "arrow.", "arrow.r"),
+        ],
+    )
+    def test_candidates(self, edit, line, prefix, expected):
+        """Make sure the context left of the cursor selects the candidates."""
+        edit.insertPlainText(line)
+        (found_prefix, candidates) = edit.completion.candidates()
+        assert found_prefix == prefix
+        assert expected in texts(candidates)
+
+    def test_document_names(self, edit):
+        """Make sure the names of the document are only sorted again once they changed, not while typing a reference."""
+        edit.insertPlainText("See @m")
+        labels = edit.completion.names("label")
+        edit.insertPlainText("et")
+        assert edit.completion.names("label") is labels
+        assert texts(edit.completion.candidates()[1]) == ["methods"]
+
+        edit.insertPlainText(" <metrics>\n@met")
+        assert texts(edit.completion.candidates()[1]) == ["methods", "metrics"]
+
+    def test_no_candidates(self, edit):
+        """Make sure plain text is only completed when forced."""
+        edit.insertPlainText("Some text")
+        assert edit.completion.candidates() == ("", [])
+        assert "text" in texts(completion.complete("te", [completion.builtins()]))
+        assert edit.completion.candidates(forced=True)[0] == "text"
+
+    def test_paths(self, edit, tmp_path):
+        """Make sure paths are completed relative to the file and hidden files are skipped."""
+        (tmp_path / "figures").mkdir()
+        (tmp_path / "figures" / "plot.png").touch()
+        (tmp_path / "chapter.typ").touch()
+        (tmp_path / ".hidden.typ").touch()
+        edit.completion.set_path(str(tmp_path / "main.typ"))
+
+        edit.insertPlainText('#include "')
+        assert texts(edit.completion.candidates()[1]) == ["figures/", "chapter.typ"]
+
+        edit.insertPlainText('\n#image("figures/pl')
+        assert edit.completion.candidates() == ("pl", [("plot.png", "file")])
+
+    def test_insert(self, qtbot, edit):
+        """Make sure typing shows the popup and accepting a completion replaces the prefix."""
+        edit.show()
+        qtbot.keyClicks(edit, "@meth")
+        assert edit.completion.popup_visible()
+        assert edit.completion.model.items == [("methods", "label")]
+
+        qtbot.keyClick(edit.completion.completer.popup(), QtCore.Qt.Key_Return)
+        assert edit.document().lastBlock().text() == "@methods"
+        assert not edit.completion.popup_visible()
@@ -0,0 +1,87 @@
+import collections
+
+import pytest
+
+from typstwriter import decorations
+from typstwriter import enums
+
+
+@pytest.fixture()
+def project(tmp_path):
+    """Create a project whose main file includes, imports and loads other files, return its path."""
+    (tmp_path / "chapters").mkdir()
+    (tmp_path / "main.typ").write_text(
+        '#import "template.typ": conf\n#include "chapters/intro.typ"\n#bibliography("refs.bib")\n#include "missing.typ"\n'
+    )
+    (tmp_path / "template.typ").write_text('#let conf(doc) = doc\n#import "@preview/cetz:0.2.0"\n')
+    (tmp_path / "chapters" / "intro.typ").write_text('= Intro\n#image("/figure.png")\n#include "../main.typ"\n')
+    (tmp_path / "refs.bib").write_text("")
+    (tmp_path / "figure.png").write_text("")
+    (tmp_path / "unused.typ").write_text("")
+    return tmp_path
+
+
+def test_dependency_closure(project):
+    """Make sure the files used directly and through other files are collected, skipping packages and missing files."""
+    closure = decorations.dependency_closure(str(project / "main.typ"))
+    assert closure == {
+        str(project / "template.typ"),
+        str(project / "chapters" / "intro.typ"),
+        str(project / "refs.bib"),
+        str(project / "figure.png"),
+    }
+
+
+class TestDecorations:
+    """Test decorations.Decorations."""
+
+    def test_main_file(self, qtbot, project):
+        """Make sure the main file and its dependencies are decorated and only changed paths are reported."""
+        d = decorations.Decorations()
+        main = str(project / "main.typ")
+        with qtbot.waitSignal(d.changed) as blocker:
+            d.set_main_file(main)
+            d.wait()
+        assert set(blocker.args[0]) == set(decorations.dependency_closure(main)) | {main}
+        assert d.decoration(main) == enums.file_decoration.main_file
+        assert d.decoration(str(project / "refs.bib")) == enums.file_decoration.dependency
+        assert not d.decoration(str(project / "unused.typ"))
+
+        # Only the dropped include is reported once the main file changed
+        (project / "main.typ").write_text('#import "template.typ": conf\n#bibliography("refs.bib")\n')
+        with qtbot.waitSignal(d.changed) as blocker:
+            d.file_changed(main)
+            d.wait()
+        assert set(blocker.args[0]) == {str(project / "chapters" / "intro.typ"), str(project / "figure.png")}
+
+        with qtbot.waitSignal(d.changed) as blocker:
+            d.set_main_file(None)
+        assert set(blocker.args[0]) == {main, str(project / "template.typ"), str(project / "refs.bib")}
+        assert not d.decorations
+        d.stop()
+
+    def test_problems(self, qtbot, project):
+        """Make sure unsaved files and problems are combined and unchanged decorations are not reported."""
+        d = decorations.Decorations()
+        intro = str(project / "chapters" / "intro.typ")
+        with qtbot.waitSignal(d.changed) as blocker:
+            d.set_unsaved([intro])
+            d.set_compiler_problems(collections.defaultdict(list, {intro: [("error", 1, 0, 1)]}))
+        assert blocker.args == [[intro]]
+        assert d.decoration(intro) == enums.file_decoration.unsaved | enums.file_decoration.problems
+        assert d.describe(intro) == ["Unsaved changes", "1 problem"]
+
+        # Recompiling with the same errors or adding diagnostics of the language server does not change the decoration
+        with qtbot.assertNotEmitted(d.changed, wait=10):
+            d.clear_compiler_problems()
+            d.set_compiler_problems(collections.defaultdict(list, {intro: [("error", 1, 0, 1)]}))
+            d.set_language_server_problems(intro, [{"message": "warning"}])
+        assert d.problems(intro) == 2  # noqa: PLR2004
+
+        with qtbot.waitSignal(d.changed) as blocker:
+            d.clear_compiler_problems()
+            d.set_language_server_problems(intro, [])
+            d.set_unsaved([])
+        assert blocker.args == [[intro]]
+        assert not d.decoration(intro)
+        d.stop()
@@ -0,0 +1,80 @@
+from qtpy import QtGui
+
+import pytest
+
+from typstwriter import diagnostics
+from typstwriter import editor
+
+
+@pytest.fixture()
+def edit(qtbot):
+    """Return a shown code edit holding a long document."""
+    edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=True)
+    qtbot.addWidget(edit)
+    edit.setPlainText("\n".join(f"line {i}" for i in range(5000)))
+    edit.resize(400, 300)
+    edit.show()
+    qtbot.waitExposed(edit)
+    return edit
+
+
+def highlighted_lines(edit):
+    """Return the lines holding an error highlight."""
+    return {s.cursor.blockNumber() for s in edit.error_highlight}
+
+
+class TestDiagnosticStore:
+    """Test diagnostics.DiagnosticStore."""
+
+    def test_between(self):
+        """Make sure the diagnostics of a range of lines are found."""
+        store = diagnostics.DiagnosticStore()
+        store.set([(5, 0, 1, "c"), (1, 0, 1, "a"), (3, 2, 1, "b"), (3, 0, 1, "b2")])
+        assert len(store) == 4  # noqa: PLR2004
+        assert [e[3] for e in store.between(1, 3)] == ["a", "b", "b2"]
+        assert store.between(6, 10) == []
+
+    def test_shift(self):
+        """Make sure diagnostics move with inserted and removed lines."""
+        store = diagnostics.DiagnosticStore()
+        store.set([(1, 0, 1, "a"), (3, 0, 1, "b"), (5, 0, 1, "c")])
+        store.shift(1, 2)
+        assert store.lines == [1, 5, 7]
+        store.shift(2, -4)
+        assert store.lines == [1, 2, 3]
+
+
+class TestDiagnosticsOverlay:
+    """Test diagnostics.DiagnosticsOverlay."""
+
+    def test_viewport_only(self, qtbot, edit):
+        """Make sure only the diagnostics in the viewport are turned into selections, also after scrolling."""
+        edit.highlight_errors([("error", line + 1, 0, 4) for line in range(5000)])
+        (first, last) = edit.diagnostics.visible_lines()
+        assert first == 0
+        assert last < 100  # noqa: PLR2004
+        assert highlighted_lines(edit) == set(range(first, last + 1))
+        assert len(edit.line_numbers.markers["errors"]) == 5000  # noqa: PLR2004
+
+        edit.verticalScrollBar().setValue(2000)
+        qtbot.waitUntil(lambda: 2000 in highlighted_lines(edit))  # noqa: PLR2004
+        assert 0 not in highlighted_lines(edit)
+
+        edit.clear_errors()
+        assert edit.error_highlight == []
+        assert "errors" not in edit.line_numbers.markers
+
+    def test_span(self, edit):
+        """Make sure the span of a diagnostic is underlined."""
+        edit.highlight_errors([("error", 2, 2, 3)])
+        span = [s for s in edit.error_highlight if s.cursor.hasSelection()]
+        assert [s.cursor.selectedText() for s in span] == ["ne "]
+
+    def test_inserted_lines(self, qtbot, edit):
+        """Make sure diagnostics move along when lines are inserted above them."""
+        edit.highlight_errors([("error", 3, 0, 4)])
+        cursor = QtGui.QTextCursor(edit.document())
+        cursor.insertText("new\nlines\n")
+        assert edit.diagnostics.store.lines == [4]
+        assert set(edit.line_numbers.markers["errors"]) == {4}
+        qtbot.waitUntil(lambda: highlighted_lines(edit) == {4})
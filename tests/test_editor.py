@@ -5,6 +5,9 @@ import pytest
 
 from typstwriter import editor
 from typstwriter import enums
+from typstwriter import file_io
+from typstwriter import journal
+from typstwriter import workspace_index
 
 search_data = [
     (
@@ -88,22 +91,32 @@ class TestCodeEdit:
     """Test editor.CodeEdit."""
 
     # TODO: Test syntax highlighting
-    # TODO: Test line numbers
 
     def test_line_highlighting_on(self, qtbot):
         """Test line highlighting."""
         code_edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=False, highlight_line=True)
+        qtbot.addWidget(code_edit)
+        code_edit.show()
+        qtbot.waitExposed(code_edit)
         code_edit.insertPlainText("Just\nsome\nexample\ntext.")
+        color = QtGui.QColor(code_edit.highlighter.highlight_color)
 
-        # Selecting a single line should highlight
+        # Selecting a single line should highlight, without submitting extra selections
         code_edit.moveCursor(QtGui.QTextCursor.Start)
         code_edit.moveCursor(QtGui.QTextCursor.NextBlock, QtGui.QTextCursor.MoveMode.MoveAnchor)
-        assert code_edit.extraSelections()[0].cursor == code_edit.textCursor()
+        rect = code_edit.current_line_rect()
+        assert rect == code_edit.line_rect(code_edit.textCursor())
+        assert not code_edit.extraSelections()
+        image = code_edit.viewport().grab().toImage()
+        assert image.pixelColor(rect.right() - 1, rect.center().y()) == color
+        assert image.pixelColor(rect.right() - 1, rect.bottom() + rect.height() // 2) != color
 
         # Selecting multiple lines should not highlight
         code_edit.moveCursor(QtGui.QTextCursor.Start)
         code_edit.moveCursor(QtGui.QTextCursor.NextBlock, QtGui.QTextCursor.MoveMode.KeepAnchor)
-        assert not code_edit.extraSelections()
+        assert code_edit.current_line_rect() is None
+        image = code_edit.viewport().grab().toImage()
+        assert image.pixelColor(rect.right() - 1, rect.center().y()) != color
 
     def test_line_highlighting_off(self, qtbot):
         """Test line highlighting."""
@@ -112,6 +125,70 @@ class TestCodeEdit:
         code_edit.moveCursor(QtGui.QTextCursor.Start)
         code_edit.moveCursor(QtGui.QTextCursor.NextBlock)
         assert not code_edit.extraSelections()
+        assert code_edit.current_line_rect() is None
+
+    def test_selection_layers(self, qtbot, monkeypatch):
+        """Make sure moving the cursor submits no extra selections and layers are only submitted when they change."""
+        code_edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=False, highlight_line=True)
+        code_edit.insertPlainText("Just\nsome\nexample\ntext.")
+        code_edit.highlight_all_matches("e", enums.search_mode.case_insensitive)
+        code_edit.highlight_errors([("error", 2, 0, 4)])
+
+        submitted = []
+        monkeypatch.setattr(code_edit, "setExtraSelections", submitted.append)
+        for _ in range(3):
+            code_edit.moveCursor(QtGui.QTextCursor.NextBlock)
+        code_edit.clear_errors()
+        code_edit.clear_errors()
+        assert [len(s) for s in submitted] == [len(code_edit.search_highlights)]
+
+    def test_line_numbers_width(self, qtbot):
+        """Make sure the line number widget only changes its width if the number of digits changes."""
+        code_edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=True)
+        qtbot.addWidget(code_edit)
+        line_numbers = code_edit.line_numbers
+        width = line_numbers.width()
+
+        code_edit.setPlainText("\n" * 8)
+        assert line_numbers.digits == 1
+        assert line_numbers.width() == width
+
+        code_edit.setPlainText("\n" * 9)
+        assert line_numbers.digits == 2  # noqa: PLR2004
+        assert line_numbers.width() > width
+        assert code_edit.viewportMargins().left() == line_numbers.width()
+
+    def test_line_numbers_paint(self, qtbot):
+        """Make sure painting only lays out the line numbers of visible lines and the cache is dropped on font changes."""
+        code_edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=True)
+        qtbot.addWidget(code_edit)
+        code_edit.resize(400, 200)
+        code_edit.setPlainText("\n".join(str(i) for i in range(1000)))
+        code_edit.show()
+        qtbot.waitExposed(code_edit)
+
+        code_edit.line_numbers.grab()
+        glyphs = code_edit.line_numbers.glyphs
+        assert 1 in glyphs
+        assert 1000 not in glyphs  # noqa: PLR2004
+
+        font = code_edit.font()
+        font.setPointSize(font.pointSize() + 4)
+        code_edit.setFont(font)
+        assert not code_edit.line_numbers.glyphs
+
+    def test_line_number_markers(self, qtbot):
+        """Make sure errors are marked next to the line numbers."""
+        code_edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=True)
+        qtbot.addWidget(code_edit)
+        code_edit.setPlainText("Just\nsome\nexample\ntext.")
+
+        code_edit.highlight_errors([("error", 2, 1, 2), ("error", 4, 0, 1)])
+        assert set(code_edit.line_numbers.markers["errors"]) == {1, 3}
+        code_edit.line_numbers.grab()
+
+        code_edit.clear_errors()
+        assert "errors" not in code_edit.line_numbers.markers
 
     def test_key_press_tab(self, qtbot):
         """Test key press interception when pressing tab."""
@@ -160,3 +237,255 @@ class TestCodeEdit:
 
         code_edit.toggle_comment()
         assert code_edit.toPlainText() == retoggle
+
+
+@pytest.fixture(autouse=True)
+def journal_directory(tmp_path, monkeypatch):
+    """Keep the journals of the tested editor pages out of the user data directory."""
+    directory = tmp_path / "journal"
+    monkeypatch.setattr(journal, "journal_directory", lambda: str(directory))
+    return directory
+
+
+class TestEditorPage:
+    """Test editor.EditorPage."""
+
+    def test_load(self, qtbot, tmp_path):
+        """Make sure small files are loaded right away."""
+        path = tmp_path / "file.typ"
+        path.write_text("= Heading\nSome text.")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+        assert page.isloaded
+        assert page.issaved
+        assert page.edit.toPlainText() == "= Heading\nSome text."
+
+    def test_close_save_service(self, qtbot, tmp_path):
+        """Make sure a page stops its own save service once closed, after the last save was written."""
+        path = tmp_path / "file.typ"
+        path.write_text("")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+        page.edit.setPlainText("Some text.")
+        assert page.save(wait=True)
+        assert page.tryclose()
+        assert path.read_text() == "Some text."
+        with pytest.raises(RuntimeError):
+            page.save_service.save(str(path), "Other text.", fsync=False)
+
+        # A shared save service keeps running
+        shared = file_io.SaveService()
+        page = editor.EditorPage(str(path), save_service=shared)
+        qtbot.addWidget(page)
+        assert page.tryclose()
+        assert shared.wait(shared.save(str(path), "Other text.", fsync=False))
+
+    def test_load_chunked(self, qtbot, tmp_path, monkeypatch):
+        """Make sure large files are streamed in and the page is editable afterwards."""
+        monkeypatch.setattr(file_io, "chunked_loading_threshold", 64)
+        monkeypatch.setattr(file_io, "chunk_size", 16)
+        text = "".join(f"Line {i} äöü\n" for i in range(200))
+        path = tmp_path / "file.typ"
+        path.write_text(text)
+
+        page = editor.EditorPage()
+        qtbot.addWidget(page)
+        with qtbot.waitSignal(page.loaded, timeout=5000):
+            page.load(str(path))
+            assert page.isloading
+            assert page.edit.isReadOnly()
+            assert page.progress_bar is not None
+
+        assert page.isloaded
+        assert not page.isloading
+        assert page.issaved
+        assert not page.edit.isReadOnly()
+        assert page.progress_bar is None
+        assert page.edit.toPlainText() == text
+        assert not page.edit.document().isUndoAvailable()
+
+    def test_load_chunked_invalid(self, qtbot, tmp_path, monkeypatch):
+        """Make sure a binary file is rejected even if the failure occurs after the first blocks were shown."""
+        monkeypatch.setattr(file_io, "chunked_loading_threshold", 64)
+        monkeypatch.setattr(file_io, "chunk_size", 16)
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"a" * 100 + b"\xff")
+
+        page = editor.EditorPage()
+        qtbot.addWidget(page)
+        page.load(str(path))
+        qtbot.waitUntil(lambda: not page.isloading)
+        assert not page.isloaded
+        assert page.edit.toPlainText() == ""
+
+    def test_save(self, qtbot, tmp_path):
+        """Make sure saving writes the file in the background and does not trigger the file changed warning."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+
+        page.edit.setPlainText("New text.")
+        assert not page.issaved
+        with qtbot.waitSignal(page.save_service.saved):
+            page.save()
+        assert page.issaved
+        assert path.read_text() == "New text."
+
+        qtbot.wait(100)
+        assert page.file_changed_warning is None
+        assert not page.changed_on_disk
+
+    def test_save_edit_in_between(self, qtbot, tmp_path):
+        """Make sure edits made while a save is running keep the page unsaved."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+
+        page.edit.setPlainText("New text.")
+        with qtbot.waitSignal(page.save_service.saved):
+            page.save()
+            page.edit.setPlainText("Newer text.")
+        assert not page.issaved
+        assert path.read_text() == "New text."
+
+    def test_external_change(self, qtbot, tmp_path):
+        """Make sure changes by other programs still show the file changed warning."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+
+        path.write_text("Changed by someone else.")
+        qtbot.waitUntil(lambda: page.file_changed_warning is not None)
+        assert page.changed_on_disk
+
+    def test_journal(self, qtbot, tmp_path, journal_directory):
+        """Make sure unsaved edits are journaled and the journal is removed once they are saved."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+        page = editor.EditorPage(str(path))
+        qtbot.addWidget(page)
+        assert page.journal.file is None
+
+        page.edit.textCursor().insertText("New text. ")
+        page.journal.flush()
+        assert journal.replay(page.journal.file) == (str(path), "New text. Old text.")
+
+        with qtbot.waitSignal(page.save_service.saved):
+            page.save()
+        assert page.journal.file is None
+        assert list(journal_directory.iterdir()) == []
+
+    def test_restore(self, qtbot):
+        """Make sure recovered text replaces the text and is journaled right away."""
+        page = editor.EditorPage()
+        qtbot.addWidget(page)
+        page.restore("Recovered text.")
+        assert page.edit.toPlainText() == "Recovered text."
+        assert not page.issaved
+        assert journal.replay(page.journal.file) == (None, "Recovered text.")
+
+
+class TestEditor:
+    """Test editor.Editor."""
+
+    @pytest.fixture()
+    def files(self, tmp_path):
+        """Create some files and return a session of them."""
+        files = []
+        for i in range(5):
+            path = tmp_path / f"file_{i}.typ"
+            path.write_text("".join(f"Line {n}\n" for n in range(500)))
+            files.append({"path": str(path), "scroll": 10 * i, "folds": []})
+        return files
+
+    def test_open_files_lazily(self, qtbot, files):
+        """Make sure only the active tab is loaded and the others are loaded once activated."""
+        e = editor.Editor()
+        qtbot.addWidget(e)
+        e.open_files_lazily(files)
+
+        tabs = e.tabs_list()
+        assert [type(t) for t in tabs] == [editor.EditorPagePlaceholder] * 4 + [editor.EditorPage]
+        assert e.TabWidget.currentIndex() == 4  # noqa: PLR2004
+        assert e.openfiles_list() == [f["path"] for f in files]
+
+        with qtbot.waitSignal(e.active_file_changed) as blocker:
+            e.TabWidget.setCurrentIndex(2)
+        assert blocker.args == [files[2]["path"]]
+        page = e.TabWidget.currentWidget()
+        assert isinstance(page, editor.EditorPage)
+        assert page.path == files[2]["path"]
+        assert page.edit.toPlainText().startswith("Line 0\n")
+
+        assert e.session() == files
+
+    def test_open_file_placeholder(self, qtbot, files):
+        """Make sure opening a file which is a placeholder activates and loads it."""
+        e = editor.Editor()
+        qtbot.addWidget(e)
+        e.open_files_lazily(files)
+
+        e.open_file(files[1]["path"])
+        assert e.TabWidget.currentIndex() == 1
+        assert isinstance(e.TabWidget.currentWidget(), editor.EditorPage)
+        assert len(e.tabs_list()) == len(files)
+
+    def test_errors_on_placeholder(self, qtbot, files):
+        """Make sure errors for placeholders are applied once they are loaded."""
+        e = editor.Editor()
+        qtbot.addWidget(e)
+        e.open_files_lazily(files)
+
+        e.apply_errors({files[0]["path"]: [("error: unknown variable", 2, 1, 3)]})
+        e.TabWidget.setCurrentIndex(0)
+        assert e.TabWidget.currentWidget().edit.error_highlight
+
+    def test_folds_in_session(self, qtbot, tmp_path):
+        """Make sure folded regions are stored in the session and restored for placeholders."""
+        path = tmp_path / "file.typ"
+        path.write_text("= Heading\n#let f(x) = {\n  x\n}\nText\n")
+        e = editor.Editor()
+        qtbot.addWidget(e)
+
+        e.open_files_lazily([{"path": str(path), "scroll": 0, "folds": [1]}])
+        page = e.TabWidget.currentWidget()
+        assert page.folded_lines() == [1]
+        assert not page.edit.document().findBlockByNumber(2).isVisible()
+        assert e.session() == [{"path": str(path), "scroll": 0, "folds": [1]}]
+
+    def test_go_to_definition(self, qtbot, tmp_path):
+        """Make sure references are resolved in the file itself first and in the workspace otherwise."""
+        (tmp_path / "intro.typ").write_text("Text.\n= Introduction <intro>\n")
+        main = tmp_path / "main.typ"
+        main.write_text("= Main <main>\nSee @main, @intro and @missing.\n")
+        index = workspace_index.WorkspaceIndex(path=str(tmp_path / "index.sqlite"))
+        index.set_root(str(tmp_path))
+        index.wait()
+
+        e = editor.Editor(index=index)
+        qtbot.addWidget(e)
+        e.open_file(str(main))
+        page = e.TabWidget.currentWidget()
+
+        page.edit.jump_to(page.edit.document().findBlockByNumber(1).position() + 5)
+        e.go_to_definition()
+        assert page.edit.textCursor().blockNumber() == 0
+
+        page.edit.jump_to(page.edit.document().findBlockByNumber(1).position() + 13)
+        e.go_to_definition()
+        intro = e.TabWidget.currentWidget()
+        assert intro.path == str(tmp_path / "intro.typ")
+        assert intro.edit.textCursor().blockNumber() == 1
+        assert intro.edit.textCursor().positionInBlock() == 15  # noqa: PLR2004
+
+        # Only the unresolved reference is marked
+        e.TabWidget.setCurrentWidget(page)
+        e.check_references()
+        assert page.edit.line_numbers.markers["references"].keys() == {1}
+        page.edit.setPlainText("See @main.\n")
+        e.check_references()
+        assert not page.edit.line_numbers.markers["references"]
+        index.stop()
@@ -0,0 +1,199 @@
+from qtpy import QtCore
+
+import os
+import threading
+
+import pytest
+
+from typstwriter import file_finder
+from typstwriter import file_index
+
+
+@pytest.fixture()
+def tree(tmp_path, monkeypatch):
+    """Create a project with ignored entries and keep the persisted indexes in tmp_path, return the project path."""
+    monkeypatch.setitem(file_index.config.config["Internals"], "file_index_path", str(tmp_path / "cache"))
+    monkeypatch.setitem(file_index.config.config["FS Explorer"], "ignore_patterns", ".*, node_modules")
+
+    root = tmp_path / "project"
+    (root / "chapters" / "drafts").mkdir(parents=True)
+    (root / "node_modules").mkdir()
+    (root / "out").mkdir()
+    (root / "main.typ").write_text("= Main")
+    (root / "main.pdf").write_text("")
+    (root / "keep.pdf").write_text("")
+    (root / "chapters" / "intro.typ").write_text("= Intro")
+    (root / "chapters" / "drafts" / "old.typ").write_text("")
+    (root / "node_modules" / "package.json").write_text("")
+    (root / "out" / "main.pdf").write_text("")
+    (root / ".gitignore").write_text("# Build output\n*.pdf\n!keep.pdf\n/out/\n")
+    (root / "chapters" / ".gitignore").write_text("drafts/\n")
+    return root
+
+
+def test_gitignore(tmp_path):
+    """Make sure the rules of .gitignore files are applied like git does."""
+    (tmp_path / ".gitignore").write_text("*.log\n!important.log\n/build\ndocs/**/tmp\ncache/\n\\#notes\n")
+    gitignore = file_index.GitIgnore().extended("", str(tmp_path / ".gitignore"))
+
+    assert gitignore.ignored("debug.log", False)
+    assert gitignore.ignored("sub/debug.log", False)
+    assert not gitignore.ignored("important.log", False)
+    assert gitignore.ignored("build", True)
+    assert not gitignore.ignored("sub/build", True)
+    assert gitignore.ignored("docs/tmp", False)
+    assert gitignore.ignored("docs/a/b/tmp", False)
+    assert gitignore.ignored("sub/cache", True)
+    assert not gitignore.ignored("cache", False)
+    assert gitignore.ignored("#notes", False)
+
+
+def test_walk(tree):
+    """Make sure the ignore patterns and the .gitignore files of all directories are honored."""
+    walked = file_index.walk(str(tree), "", file_index.GitIgnore(), [".*", "node_modules"])
+    assert sorted(file_index.files_of(walked)) == ["chapters/intro.typ", "keep.pdf", "main.typ"]
+
+
+class TestMatcher:
+    """Test file_index.Matcher."""
+
+    def test_ranking(self):
+        """Make sure matching file names rank before matching paths and subsequences, shorter paths first."""
+        paths = ["src/main.py", "chapters/intro.typ", "main.typ", "thesis/intro/appendix.typ", "manual/index.typ"]
+        matcher = file_index.Matcher(paths)
+        assert matcher.search("main") == ["main.typ", "src/main.py", "manual/index.typ"]
+        assert matcher.search("INTRO") == ["chapters/intro.typ", "thesis/intro/appendix.typ"]
+        assert matcher.search("mntyp") == ["main.typ", "manual/index.typ"]
+        assert matcher.search("thsapx") == ["thesis/intro/appendix.typ"]
+        assert matcher.search("t^[]") == []
+        assert matcher.search("") == sorted(paths, key=len)
+        assert len(matcher.search("a", limit=2)) == 2  # noqa: PLR2004
+
+    def test_large(self, monkeypatch):
+        """Make sure matches are found among 100 000 paths, also when the subsequence matching stops early."""
+        # The time budget would make the number of matches depend on the load of the machine
+        monkeypatch.setattr(file_index, "budget", 10)
+        paths = [f"dir{i % 100}/sub{i % 7}/file{i}.typ" for i in range(100_000)]
+        matcher = file_index.Matcher(paths)
+        assert matcher.search("file99999") == ["dir99/sub4/file99999.typ"]
+        assert len(matcher.search("d3s2f9")) == file_index.limit
+
+
+class TestFileIndex:
+    """Test file_index.FileIndex."""
+
+    def test_index(self, qtbot, tree):
+        """Make sure the files below the root are indexed and the index is persisted."""
+        index = file_index.FileIndex()
+        with qtbot.waitSignal(index.updated):
+            index.set_root(str(tree))
+        index.wait()
+        assert index.search("intro") == [str(tree / "chapters" / "intro.typ")]
+        assert sorted(index.search("")) == [
+            str(tree / "chapters" / "intro.typ"),
+            str(tree / "keep.pdf"),
+            str(tree / "main.typ"),
+        ]
+        assert os.path.exists(file_index.cache_path(str(tree)))
+
+        # The next session starts from the persisted index until the tree was walked again
+        (tree / "chapters" / "intro.typ").unlink()
+        index = file_index.FileIndex()
+        (_, matcher) = index.load(str(tree))
+        assert matcher.search("intro") == ["chapters/intro.typ"]
+        index.set_root(str(tree))
+        index.wait()
+        assert index.search("intro") == []
+
+    def test_update(self, qtbot, tree):
+        """Make sure changed directories are listed again, walking new subdirectories."""
+        index = file_index.FileIndex()
+        index.set_root(str(tree))
+        index.wait()
+
+        (tree / "appendix.typ").touch()
+        (tree / "images").mkdir()
+        (tree / "images" / "figure.png").touch()
+        (tree / "chapters" / "intro.typ").unlink()
+        (tree / "debug.pdf").touch()
+        with qtbot.waitSignal(index.updated):
+            index.directory_changed(str(tree))
+            index.directory_changed(str(tree / "chapters"))
+        index.wait()
+        assert sorted(os.path.relpath(p, tree) for p in index.search("")) == [
+            "appendix.typ",
+            os.path.join("images", "figure.png"),
+            "keep.pdf",
+            "main.typ",
+        ]
+
+        with qtbot.assertNotEmitted(index.updated):
+            index.directory_changed(str(tree))
+            index.directory_changed(str(tree / "node_modules"))
+            index.directory_changed(str(tree.parent))
+            index.wait()
+
+        (tree / "chapters" / "conclusion.typ").touch()
+        with qtbot.waitSignal(index.updated):
+            index.file_saved(str(tree / "chapters" / "conclusion.typ"))
+        assert index.search("conclusion") == [str(tree / "chapters" / "conclusion.typ")]
+
+    def test_change_root(self, qtbot, tree, monkeypatch):
+        """Make sure the walk of the previous root is cancelled and setting the same root again does nothing."""
+        gate = threading.Event()
+        list_entries = file_index.list_entries
+
+        def wait_for_gate(root, *args):
+            if root == str(tree):
+                gate.wait(5)
+            return list_entries(root, *args)
+
+        monkeypatch.setattr(file_index, "list_entries", wait_for_gate)
+        index = file_index.FileIndex()
+        index.set_root(str(tree))
+        index.set_root(str(tree / "chapters"))
+        gate.set()
+        index.wait()
+        assert not os.path.exists(file_index.cache_path(str(tree)))
+        assert index.search("") == [str(tree / "chapters" / "intro.typ")]
+
+        with qtbot.assertNotEmitted(index.updated):
+            index.set_root(str(tree / "chapters"))
+        assert not index.jobs.busy()
+
+    def test_refresh(self, qtbot, tree, monkeypatch):
+        """Make sure the tree is walked again once the last walk is older than the rescan interval."""
+        index = file_index.FileIndex()
+        index.set_root(str(tree))
+        index.wait()
+
+        (tree / "images").mkdir()
+        (tree / "images" / "figure.png").touch()
+        index.refresh()
+        assert not index.jobs.busy()
+
+        monkeypatch.setattr(file_index, "rescan_interval", 0)
+        with qtbot.waitSignal(index.updated):
+            index.refresh()
+        assert index.search("figure") == [str(tree / "images" / "figure.png")]
+
+
+def test_file_finder(qtbot, tree):
+    """Make sure the best match is selected and opened with the return key."""
+    index = file_index.FileIndex()
+    index.set_root(str(tree))
+    index.wait()
+    finder = file_finder.FileFinder(index)
+    qtbot.addWidget(finder)
+    finder.popup()
+
+    qtbot.keyClicks(finder.line_edit, "mntp")
+    assert finder.model.items == [("main.typ", "file")]
+    finder.line_edit.setText("typ")
+    assert [item for (item, _) in finder.model.items] == ["main.typ", os.path.join("chapters", "intro.typ")]
+
+    qtbot.keyClick(finder.line_edit, QtCore.Qt.Key_Down)
+    with qtbot.waitSignal(finder.open_file) as blocker:
+        qtbot.keyClick(finder.line_edit, QtCore.Qt.Key_Return)
+    assert blocker.args == [str(tree / "chapters" / "intro.typ")]
+    assert not finder.isVisible()
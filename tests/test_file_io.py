@@ -0,0 +1,172 @@
+import pytest
+
+from typstwriter import file_io
+
+
+@pytest.fixture()
+def small_chunks(monkeypatch):
+    """Use a tiny chunk size so that even short files are split into many blocks."""
+    monkeypatch.setattr(file_io, "chunk_size", 7)
+
+
+class TestChunkedFileLoader:
+    """Test file_io.ChunkedFileLoader."""
+
+    def load(self, qtbot, path):
+        """Load path and return the concatenation of all delivered blocks."""
+        chunks = []
+        loader = file_io.ChunkedFileLoader(str(path))
+        loader.chunk_loaded.connect(chunks.append)
+        with qtbot.waitSignal(loader.finished):
+            loader.start()
+        return "".join(chunks)
+
+    def test_multibyte_characters(self, qtbot, tmp_path, small_chunks):
+        """Make sure characters split across block boundaries are decoded correctly."""
+        text = "Grüße 👍 aus Zürich, ½ + ¼ = ¾.\n" * 20
+        path = tmp_path / "file.typ"
+        path.write_text(text, encoding="utf-8")
+        assert self.load(qtbot, path) == text
+
+    def test_line_endings(self, qtbot, tmp_path, small_chunks):
+        """Make sure line endings are translated, even if CRLF is split across blocks."""
+        path = tmp_path / "file.typ"
+        path.write_bytes(b"abcde\r\nfghij\r\nk\rl\n" * 10)
+        assert self.load(qtbot, path) == "abcde\nfghij\nk\nl\n" * 10
+
+    def test_progress(self, qtbot, tmp_path, small_chunks):
+        """Make sure the progress reaches the file size."""
+        path = tmp_path / "file.typ"
+        path.write_text("x" * 100)
+        progress = []
+        loader = file_io.ChunkedFileLoader(str(path))
+        loader.progress.connect(progress.append)
+        with qtbot.waitSignal(loader.finished):
+            loader.start()
+        assert progress == sorted(progress)
+        assert progress[-1] == 100  # noqa: PLR2004
+
+    def test_invalid_file(self, qtbot, tmp_path, small_chunks):
+        """Make sure binary files fail with a UnicodeError."""
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"some text \xff\xfe\xfd")
+        loader = file_io.ChunkedFileLoader(str(path))
+        with qtbot.waitSignal(loader.failed) as blocker:
+            loader.start()
+        assert isinstance(blocker.args[0], UnicodeError)
+
+    def test_missing_file(self, qtbot, tmp_path):
+        """Make sure missing files fail with an OSError."""
+        loader = file_io.ChunkedFileLoader(str(tmp_path / "missing.typ"))
+        with qtbot.waitSignal(loader.failed) as blocker:
+            loader.start()
+        assert isinstance(blocker.args[0], OSError)
+
+    def test_cancel(self, qtbot, tmp_path, small_chunks):
+        """Make sure a cancelled loader stops delivering and its thread terminates."""
+        path = tmp_path / "file.typ"
+        path.write_text("x" * 10000)
+        loader = file_io.ChunkedFileLoader(str(path))
+        loader.start()
+        loader.cancel()
+        loader.thread.join(timeout=5)
+        assert not loader.thread.is_alive()
+        with qtbot.assertNotEmitted(loader.finished, wait=50):
+            pass
+
+
+class TestAtomicWrite:
+    """Test file_io.atomic_write."""
+
+    @pytest.mark.parametrize("fsync", [True, False])
+    def test_write(self, tmp_path, fsync):
+        """Make sure the text is written and no temporary files are left behind."""
+        path = tmp_path / "file.typ"
+        identity = file_io.atomic_write(str(path), "Grüße\n", fsync)
+        assert path.read_text(encoding="utf-8") == "Grüße\n"
+        assert identity == file_io.file_identity(str(path))
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_keep_mode(self, tmp_path):
+        """Make sure the permissions of an existing file are kept."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+        path.chmod(0o640)
+        file_io.atomic_write(str(path), "New text.")
+        assert path.stat().st_mode & 0o777 == 0o640  # noqa: PLR2004
+
+    def test_symlink(self, tmp_path):
+        """Make sure the target of a symlink is written instead of replacing the link."""
+        target = tmp_path / "target.typ"
+        target.write_text("Old text.")
+        link = tmp_path / "link.typ"
+        link.symlink_to(target)
+        file_io.atomic_write(str(link), "New text.")
+        assert link.is_symlink()
+        assert target.read_text() == "New text."
+
+    def test_failure(self, tmp_path, monkeypatch):
+        """Make sure a failed write leaves the original file intact and cleans up."""
+        path = tmp_path / "file.typ"
+        path.write_text("Old text.")
+
+        def fail(*args):
+            raise OSError("Disk full")
+
+        monkeypatch.setattr(file_io.os, "replace", fail)
+        with pytest.raises(OSError, match="Disk full"):
+            file_io.atomic_write(str(path), "New text.")
+        assert path.read_text() == "Old text."
+        assert list(tmp_path.iterdir()) == [path]
+
+
+class TestSaveService:
+    """Test file_io.SaveService."""
+
+    def test_save(self, qtbot, tmp_path):
+        """Make sure saved and idle are emitted once the file is written."""
+        service = file_io.SaveService()
+        path = str(tmp_path / "file.typ")
+        with qtbot.waitSignals([service.saved, service.idle]):
+            service.save(path, "Some text.", fsync=False)
+            assert service.busy()
+            assert service.is_saving(path)
+        assert not service.busy()
+        assert not service.is_saving(path)
+        assert (tmp_path / "file.typ").read_text() == "Some text."
+
+    def test_order(self, qtbot, tmp_path):
+        """Make sure the last requested save of a path wins."""
+        service = file_io.SaveService()
+        path = str(tmp_path / "file.typ")
+        for i in range(20):
+            service.save(path, f"Version {i}", fsync=False)
+        assert service.wait()
+        assert (tmp_path / "file.typ").read_text() == "Version 19"
+
+    def test_parallel(self, qtbot, tmp_path):
+        """Make sure many files can be saved at once."""
+        service = file_io.SaveService()
+        paths = [tmp_path / f"file_{i}.typ" for i in range(50)]
+        with qtbot.waitSignal(service.idle):
+            for p in paths:
+                service.save(str(p), p.name, fsync=False)
+        assert all(p.read_text() == p.name for p in paths)
+
+    def test_failed(self, qtbot, tmp_path):
+        """Make sure failed is emitted if the file cannot be written."""
+        service = file_io.SaveService()
+        path = str(tmp_path / "missing_dir" / "file.typ")
+        with qtbot.waitSignal(service.failed) as blocker, qtbot.assertNotEmitted(service.saved):
+            service.save(path, "Some text.", fsync=False)
+        assert blocker.args[0] == path
+
+    def test_wait(self, qtbot, tmp_path):
+        """Make sure wait reports the result and the signals are not emitted twice."""
+        service = file_io.SaveService()
+        future = service.save(str(tmp_path / "file.typ"), "Some text.", fsync=False)
+        with qtbot.waitSignal(service.saved, timeout=100, raising=False) as blocker:
+            assert service.wait(future)
+        assert blocker.signal_triggered
+        with qtbot.assertNotEmitted(service.saved, wait=100):
+            pass
@@ -0,0 +1,151 @@
+import errno
+import os
+import pathlib
+
+import pytest
+
+from typstwriter import file_operations
+
+# Modification time of a copied file
+mtime = 1_000_000
+
+# Size of the files of the copied directory
+size = 106_000
+
+
+@pytest.fixture()
+def source(tmp_path):
+    """Create a directory with files, a subdirectory and a linked directory, return its path."""
+    path = tmp_path / "figures"
+    (path / "sub").mkdir(parents=True)
+    (path / "plot.svg").write_bytes(b"<svg/>" * 1000)
+    (path / "sub" / "photo.png").write_bytes(os.urandom(100_000))
+    os.utime(path / "plot.svg", (mtime, mtime))
+    os.symlink("sub", path / "link")
+    return path
+
+
+def test_read_write_partial(tmp_path, monkeypatch):
+    """Make sure partial writes are continued instead of dropping the rest of the chunk."""
+    write = os.write
+    monkeypatch.setattr(file_operations.os, "write", lambda fd, data: write(fd, data[:100]))
+    (tmp_path / "source").write_bytes(os.urandom(1000))
+    with open(tmp_path / "source", "rb") as src, open(tmp_path / "destination", "wb") as dst:
+        assert file_operations.read_write(src.fileno(), dst.fileno(), 0, 1000) == 1000  # noqa: PLR2004
+    assert (tmp_path / "destination").read_bytes() == (tmp_path / "source").read_bytes()
+
+
+def test_plan_copy_cancelled(source):
+    """Make sure planning stops walking once the operation is cancelled."""
+    operation = file_operations.FileOperation("copy", [])
+    operation.cancel()
+    assert [step[0] for step in file_operations.plan_copy(str(source), "copy", operation)] == ["directory"]
+
+
+def tree(path):
+    """Return the relative paths and contents of the files below path."""
+    return {
+        os.path.relpath(os.path.join(directory, name), path): pathlib.Path(directory, name).read_bytes()
+        for (directory, _, files) in os.walk(path)
+        for name in files
+    }
+
+
+class TestFileOperationQueue:
+    """Test file_operations.FileOperationQueue."""
+
+    def test_copy(self, qtbot, tmp_path, source, monkeypatch):
+        """Make sure directories are copied in chunks with their metadata and their progress is reported."""
+        monkeypatch.setattr(file_operations, "chunk_size", 4096)
+        queue = file_operations.FileOperationQueue()
+        with qtbot.waitSignal(queue.finished) as blocker:
+            operation = queue.copy([(str(source), str(tmp_path / "copy"))])
+            assert queue.busy()
+        assert blocker.args == [operation]
+        assert not queue.busy()
+
+        assert tree(tmp_path / "copy") == tree(source)
+        assert os.path.islink(tmp_path / "copy" / "link")
+        assert os.stat(tmp_path / "copy" / "plot.svg").st_mtime == mtime
+        assert operation.error is None
+        assert operation.bytes_done == operation.bytes_total == size
+        assert operation.items_done == operation.items_total == 1
+        assert operation.throughput() > 0
+
+    def test_dangling_link(self, qtbot, tmp_path, source):
+        """Make sure links pointing nowhere are linked again instead of failing the copy."""
+        os.symlink("missing.svg", source / "dangling.svg")
+        os.symlink("missing.svg", tmp_path / "dangling.svg")
+        queue = file_operations.FileOperationQueue()
+        operation = queue.copy(
+            [(str(source), str(tmp_path / "copy")), (str(tmp_path / "dangling.svg"), str(tmp_path / "d.svg"))]
+        )
+        queue.wait()
+        assert operation.error is None
+        assert os.readlink(tmp_path / "copy" / "dangling.svg") == "missing.svg"
+        assert os.readlink(tmp_path / "d.svg") == "missing.svg"
+
+    def test_fallback(self, qtbot, tmp_path, source, monkeypatch):
+        """Make sure the next copy method is used if one is not supported for the files."""
+        calls = []
+
+        def unsupported(*args):
+            calls.append(args)
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(file_operations, "copy_methods", lambda: [unsupported, file_operations.read_write])
+        queue = file_operations.FileOperationQueue()
+        queue.copy([(str(source / "plot.svg"), str(tmp_path / "plot.svg"))])
+        queue.wait()
+        assert len(calls) == 1
+        assert (tmp_path / "plot.svg").read_bytes() == (source / "plot.svg").read_bytes()
+
+    def test_cancel(self, qtbot, tmp_path, source, monkeypatch):
+        """Make sure a cancelled copy removes what it created and leaves existing files untouched."""
+        monkeypatch.setattr(file_operations, "chunk_size", 1000)
+        (tmp_path / "copy").mkdir()
+        (tmp_path / "copy" / "plot.svg").write_text("existing")
+
+        queue = file_operations.FileOperationQueue()
+        operation = file_operations.FileOperation("copy", [(str(source), str(tmp_path / "copy"))])
+        copy_data = file_operations.copy_data
+
+        def cancel_after_first_file(*args):
+            copy_data(*args)
+            operation.cancel()
+
+        monkeypatch.setattr(file_operations, "copy_data", cancel_after_first_file)
+        queue.submit(operation)
+        with qtbot.waitSignal(queue.idle):
+            pass
+        assert operation.cancelled()
+        assert os.listdir(tmp_path / "copy") == ["plot.svg"]
+        assert (tmp_path / "copy" / "plot.svg").read_text() == "existing"
+
+    def test_move(self, qtbot, tmp_path, source, monkeypatch):
+        """Make sure moves to another file system are copied and the sources removed."""
+        expected = tree(source)
+        rename = os.rename
+
+        def cross_device(path_from, path_to):
+            if os.path.isdir(path_from):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            rename(path_from, path_to)
+
+        monkeypatch.setattr(file_operations.os, "rename", cross_device)
+        (tmp_path / "notes.typ").write_text("= Notes")
+        queue = file_operations.FileOperationQueue()
+        operation = queue.move([(str(source), str(tmp_path / "moved")), (str(tmp_path / "notes.typ"), str(tmp_path / "n.typ"))])
+        queue.wait()
+        assert operation.error is None
+        assert operation.items_done == 2  # noqa: PLR2004
+        assert not source.exists()
+        assert tree(tmp_path / "moved") == expected
+        assert (tmp_path / "n.typ").read_text() == "= Notes"
+
+    def test_error(self, qtbot, tmp_path):
+        """Make sure failed operations are reported."""
+        queue = file_operations.FileOperationQueue()
+        operation = queue.copy([(str(tmp_path / "missing"), str(tmp_path / "copy"))])
+        queue.wait()
+        assert isinstance(operation.error, OSError)
@@ -0,0 +1,99 @@
+import os
+import pytest
+
+from typstwriter import file_io
+from typstwriter import file_watcher
+
+
+@pytest.fixture()
+def watcher(qtbot):
+    """Return a file watcher with a short debounce interval."""
+    w = file_watcher.FileWatcher()
+    w.timer.setInterval(20)
+    return w
+
+
+@pytest.fixture()
+def path(tmp_path):
+    """Return the path of an existing file."""
+    path = tmp_path / "file.typ"
+    path.write_text("Some text.")
+    return str(path)
+
+
+class TestFileWatcher:
+    """Test file_watcher.FileWatcher."""
+
+    def test_subscriptions(self, watcher, path):
+        """Make sure paths are watched as long as they have subscriptions."""
+        watcher.subscribe(path)
+        watcher.subscribe(path)
+        assert watcher.watcher.files() == [path]
+
+        watcher.unsubscribe(path)
+        assert watcher.watched() == [path]
+        assert watcher.watcher.files() == [path]
+
+        watcher.unsubscribe(path)
+        assert watcher.watched() == []
+        assert watcher.watcher.files() == []
+
+        # Unbalanced unsubscriptions are ignored
+        watcher.unsubscribe(path)
+        assert watcher.watched() == []
+
+    def test_change(self, qtbot, watcher, path):
+        """Make sure a burst of changes is reported once."""
+        watcher.subscribe(path)
+        changes = []
+        watcher.file_changed.connect(changes.append)
+
+        with qtbot.waitSignal(watcher.file_changed):
+            for i in range(5):
+                with open(path, "a") as f:
+                    f.write(f" {i}")
+        qtbot.wait(100)
+        assert changes == [path]
+
+    def test_same_content(self, qtbot, watcher, path):
+        """Make sure writes which do not change the content are not reported."""
+        watcher.subscribe(path)
+        with qtbot.assertNotEmitted(watcher.file_changed, wait=200):
+            with open(path, "w") as f:
+                f.write("Some text.")
+            os.utime(path, ns=(0, 0))
+
+    def test_large_file(self, qtbot, watcher, path, monkeypatch):
+        """Make sure large files are not hashed and any change of them is reported."""
+        monkeypatch.setattr(file_io, "chunked_loading_threshold", 4)
+        watcher.subscribe(path)
+        assert watcher.versions[path][1] is None
+        with qtbot.waitSignal(watcher.file_changed):
+            with open(path, "w") as f:
+                f.write("Some text.")
+            os.utime(path, ns=(0, 0))
+
+    def test_acknowledge(self, qtbot, watcher, path):
+        """Make sure acknowledged changes are not reported and replaced files are still watched."""
+        watcher.subscribe(path)
+        with qtbot.assertNotEmitted(watcher.file_changed, wait=200):
+            file_io.atomic_write(path, "Our own text.", fsync=False)
+            watcher.acknowledge(path)
+        assert watcher.watcher.files() == [path]
+
+        with qtbot.waitSignal(watcher.file_changed):
+            file_io.atomic_write(path, "Someone else's text.", fsync=False)
+
+    def test_removal(self, qtbot, watcher, path):
+        """Make sure removing a file is reported."""
+        watcher.subscribe(path)
+        with qtbot.waitSignal(watcher.file_changed) as blocker:
+            os.remove(path)
+        assert blocker.args == [path]
+
+    def test_directory(self, qtbot, watcher, tmp_path):
+        """Make sure changes of directory entries are reported."""
+        watcher.subscribe(str(tmp_path))
+        with qtbot.waitSignal(watcher.directory_changed) as blocker:
+            (tmp_path / "new_file.typ").touch()
+        assert blocker.args == [str(tmp_path)]
@@ -0,0 +1,157 @@
+from qtpy import QtCore
+from qtpy import QtGui
+
+import pytest
+
+from typstwriter import editor
+from typstwriter import folding
+
+
+text = """= Introduction
+#let f(x) = {
+  let y = (
+    x, x,
+  )
+  y
+}
+
+Some text with a string "(" and a comment // [
+
+```typ
+#let g = (
+```
+
+== Details
+More text.
+= Conclusion
+Final text.
+"""
+
+
+@pytest.fixture()
+def edit(qtbot):
+    """Return a code edit holding a short Typst document."""
+    edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=True)
+    qtbot.addWidget(edit)
+    edit.setPlainText(text)
+    return edit
+
+
+def block(edit, number):
+    """Return a block of edit by number."""
+    return edit.document().findBlockByNumber(number)
+
+
+def hidden(edit):
+    """Return the numbers of all hidden blocks."""
+    return [n for n in range(edit.document().blockCount()) if not block(edit, n).isVisible()]
+
+
+@pytest.mark.parametrize(
+    ("line", "balance"),
+    [
+        ("#let f(x) = {", (0, 1)),
+        ("  )", (1, 0)),
+        (")[", (1, 1)),
+        ('"(" + `[` // {', (0, 0)),
+        ("\\( ``` ( ``` [", (0, 1)),
+    ],
+)
+def test_bracket_balance(line, balance):
+    """Test folding.bracket_balance."""
+    assert folding.bracket_balance(line) == balance
+
+
+class TestFolding:
+    """Test folding.Folding."""
+
+    def test_regions(self, edit):
+        """Make sure regions are found for headings, brackets and raw blocks only."""
+        f = edit.folding
+        assert [f.kind(block(edit, n)) for n in range(4)] == ["heading", "bracket", "bracket", None]
+        assert f.region(block(edit, 0)) == 15  # noqa: PLR2004
+        assert f.region(block(edit, 1)) == 5  # noqa: PLR2004
+        assert f.region(block(edit, 2)) == 3  # noqa: PLR2004
+        assert f.region(block(edit, 8)) is None
+        assert f.region(block(edit, 10)) == 11  # noqa: PLR2004
+        # Brackets in raw blocks are ignored
+        assert f.kind(block(edit, 11)) is None
+        assert f.region(block(edit, 14)) == 15  # noqa: PLR2004
+        assert f.region(block(edit, 16)) == 17  # noqa: PLR2004
+
+    def test_fold(self, edit):
+        """Make sure folding hides the region and unfolding shows it again."""
+        f = edit.folding
+        assert f.fold(block(edit, 2))
+        assert f.fold(block(edit, 1))
+        assert hidden(edit) == [2, 3, 4, 5]
+        assert f.folded() == [1]
+        assert not f.fold(block(edit, 8))
+
+        f.unfold(block(edit, 1))
+        assert hidden(edit) == []
+
+        f.fold_blocks([1, 2])
+        assert f.folded() == [1]
+        assert hidden(edit) == [2, 3, 4, 5]
+
+    def test_edit(self, edit):
+        """Make sure editing a folded region or breaking up its first line unfolds it."""
+        f = edit.folding
+        f.fold(block(edit, 1))
+
+        # Editing the first line keeps the region folded as long as it still starts one
+        cursor = QtGui.QTextCursor(block(edit, 1))
+        cursor.insertText("  ")
+        assert f.folded() == [1]
+
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.EndOfBlock)
+        cursor.insertText("\n")
+        assert hidden(edit) == []
+
+    def test_fences(self, edit):
+        """Make sure the fences are updated from the edited blocks like a full scan would find them."""
+        assert edit.folding.fences() == [10, 12]
+        edits = [
+            (0, 0, "```\n\n"),
+            (2, 5, "```raw```\n"),
+            (40, 0, "```\nline\n```\n"),
+            (45, 30, ""),
+            (0, 3, "`"),
+        ]
+        for position, removed, inserted in edits:
+            cursor = QtGui.QTextCursor(edit.document())
+            cursor.setPosition(position)
+            cursor.setPosition(position + removed, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(inserted)
+            fences = edit.folding.fences()
+            edit.folding.fence_blocks = None
+            assert fences == edit.folding.fences()
+
+    def test_reveal_cursor(self, edit):
+        """Make sure moving the cursor into a folded region unfolds it."""
+        edit.folding.fold(block(edit, 10))
+        edit.setTextCursor(QtGui.QTextCursor(block(edit, 11)))
+        assert hidden(edit) == []
+
+    def test_shortcuts(self, qtbot, edit):
+        """Make sure the innermost region containing the cursor is folded."""
+        edit.setTextCursor(QtGui.QTextCursor(block(edit, 3)))
+        edit.fold()
+        assert hidden(edit) == [3]
+        assert edit.textCursor().blockNumber() == 2  # noqa: PLR2004
+
+        edit.unfold()
+        assert hidden(edit) == []
+
+    def test_paint(self, qtbot, edit):
+        """Make sure fold markers can be painted and clicking them toggles the fold."""
+        edit.resize(400, 400)
+        edit.show()
+        qtbot.waitExposed(edit)
+        edit.folding.fold(block(edit, 1))
+        edit.line_numbers.grab()
+
+        y = int(edit.blockBoundingGeometry(block(edit, 1)).translated(edit.contentOffset()).center().y())
+        qtbot.mouseClick(edit.line_numbers, QtCore.Qt.LeftButton, pos=QtCore.QPoint(5, y))
+        assert hidden(edit) == []
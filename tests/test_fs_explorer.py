@@ -1,5 +1,8 @@
 from qtpy import QtWidgets
 
+import os
+import shutil
+
 from typstwriter import fs_explorer
 
 
@@ -30,7 +33,7 @@ class TestFSExplorer:
 
         assert fse.root == str(tmp_path)
         assert fse.filesystem_model.rootPath() == str(tmp_path)
-        assert fse.completer_filesystem_model.rootPath() == str(tmp_path)
+        assert fse.completer.scanner is fse.filesystem_model.scanner
         assert fse.pathBar.text() == str(tmp_path)
         assert fs_explorer.state.working_directory.Value == str(tmp_path)
 
@@ -166,6 +169,7 @@ class TestFSExplorer:
         assert from_path.exists()
         assert not to_path.exists()
         fse.copy_from_to(str(from_path), str(to_path))
+        fse.file_operations.wait()
         assert from_path.exists()
         assert to_path.exists()
 
@@ -179,6 +183,46 @@ class TestFSExplorer:
         assert from_path.exists()
         assert to_path.exists()
 
+    def test_paste(self, tmp_path, qtbot):
+        """Make sure pasted items are copied by one operation whose progress is shown."""
+        fse = fs_explorer.FSExplorer()
+        qtbot.addWidget(fse)
+        fse.show()
+
+        (tmp_path / "from").mkdir()
+        (tmp_path / "to").mkdir()
+        paths = [tmp_path / "from" / "a.typ", tmp_path / "from" / "b.typ"]
+        for path in paths:
+            path.write_text("= Text")
+        fse.copy_to_clipboard([str(path) for path in paths])
+
+        fse.paste_from_clipboard(str(tmp_path / "to"))
+        assert len(fse.file_operations.operations()) == 1
+        assert fse.file_operations_bar.isVisible()
+        assert fse.file_operations_bar.label.text().startswith("Copying")
+        fse.file_operations.wait()
+        assert not fse.file_operations_bar.isVisible()
+        assert sorted(os.listdir(tmp_path / "to")) == ["a.typ", "b.typ"]
+
+    def test_paste_rename_cancelled(self, tmp_path, qtbot, monkeypatch):
+        """Make sure cancelling the new name of one existing item still pastes the others."""
+        fse = fs_explorer.FSExplorer()
+        qtbot.addWidget(fse)
+
+        (tmp_path / "from").mkdir()
+        (tmp_path / "to").mkdir()
+        paths = [tmp_path / "from" / "a.typ", tmp_path / "from" / "b.typ"]
+        for path in paths:
+            path.write_text("= Text")
+        (tmp_path / "to" / "a.typ").write_text("existing")
+        fse.copy_to_clipboard([str(path) for path in paths])
+        monkeypatch.setattr(QtWidgets.QInputDialog, "getText", lambda *args, **kwargs: ("", False))
+
+        fse.paste_from_clipboard(str(tmp_path / "to"))
+        fse.file_operations.wait()
+        assert sorted(os.listdir(tmp_path / "to")) == ["a.typ", "b.typ"]
+        assert (tmp_path / "to" / "a.typ").read_text() == "existing"
+
     def test_delete(self, tmp_path, qtbot, monkeypatch):
         """Make sure a folder or file can be deleted."""
         fse = fs_explorer.FSExplorer()
@@ -203,5 +247,40 @@ class TestFSExplorer:
         monkeypatch.setattr(QtWidgets.QMessageBox, "question", lambda *args: QtWidgets.QMessageBox.StandardButton.Yes)
         fse.delete(str(folder_path))
         fse.delete(str(file_path))
+        fse.file_operations.wait()
         assert not file_path.exists()
         assert not folder_path.exists()
+
+    def test_delete_selection(self, tmp_path, qtbot, monkeypatch):
+        """Make sure deleting several items asks only once."""
+        fse = fs_explorer.FSExplorer()
+        qtbot.addWidget(fse)
+
+        paths = [tmp_path / f"file{i}.typ" for i in range(12)]
+        for path in paths:
+            path.touch()
+
+        questions = []
+        monkeypatch.setattr(
+            QtWidgets.QMessageBox,
+            "question",
+            lambda *args: questions.append(args[2]) or QtWidgets.QMessageBox.StandardButton.Yes,
+        )
+        fse.delete([str(path) for path in paths])
+        fse.file_operations.wait()
+        assert len(questions) == 1
+        assert "these 12 items" in questions[0]
+        assert "and 2 more" in questions[0]
+        assert not any(path.exists() for path in paths)
+
+    def test_root_removed(self, tmp_path, qtbot):
+        """Make sure the explorer moves up if its root directory is removed."""
+        fse = fs_explorer.FSExplorer()
+        qtbot.addWidget(fse)
+
+        path = tmp_path / "test_path" / "nested"
+        path.mkdir(parents=True)
+        fse.set_root(str(path))
+
+        shutil.rmtree(tmp_path / "test_path")
+        qtbot.waitUntil(lambda: fse.root == str(tmp_path))
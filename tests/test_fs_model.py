@@ -0,0 +1,189 @@
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtTest
+
+import os
+
+import pytest
+
+from typstwriter import decorations
+from typstwriter import file_watcher
+from typstwriter import fs_model
+
+
+@pytest.fixture()
+def tree(tmp_path):
+    """Create a directory tree with ignored entries and return its path."""
+    (tmp_path / "chapters").mkdir()
+    (tmp_path / "chapters" / "intro.typ").write_text("= Intro")
+    (tmp_path / "images").mkdir()
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "main.typ").write_text("= Main")
+    (tmp_path / "Bibliography.bib").write_text("")
+    return tmp_path
+
+
+def names(model, parent=QtCore.QModelIndex()):  # noqa: B008
+    """Return the names of the rows below parent."""
+    return [model.index(row, 0, parent).data() for row in range(model.rowCount(parent))]
+
+
+def test_list_directory(tree):
+    """Make sure ignored entries are skipped and directories are listed first."""
+    (path, entries) = fs_model.list_directory(str(tree), [".*", "node_modules"])
+    assert path == str(tree)
+    assert [(name, is_dir) for (name, is_dir, _, _) in entries] == [
+        ("chapters", True),
+        ("images", True),
+        ("Bibliography.bib", False),
+        ("main.typ", False),
+    ]
+
+
+class TestDirectoryScanner:
+    """Test fs_model.DirectoryScanner."""
+
+    def test_cache(self, qtbot, tree, monkeypatch):
+        """Make sure listings are cached and only listed again once they are stale or invalidated."""
+        scanner = fs_model.DirectoryScanner()
+        with qtbot.waitSignal(scanner.listed) as blocker:
+            assert scanner.listing(str(tree)) is None
+        assert blocker.args[0] == str(tree)
+        assert len(scanner.listing(str(tree))) == 4  # noqa: PLR2004
+        assert not scanner.pending
+
+        (tree / "appendix.typ").touch()
+        assert len(scanner.listing(str(tree))) == 4  # noqa: PLR2004
+        scanner.invalidate(str(tree))
+        scanner.wait()
+        assert len(scanner.listing(str(tree))) == 5  # noqa: PLR2004
+
+        monkeypatch.setitem(fs_model.config.config["FS Explorer"], "listing_ttl", "0")
+        (tree / "notes.typ").touch()
+        assert len(scanner.listing(str(tree))) == 5  # noqa: PLR2004
+        assert str(tree) in scanner.pending
+        scanner.wait()
+
+    def test_lru(self, qtbot, tmp_path, monkeypatch):
+        """Make sure only the most recently used listings are kept."""
+        monkeypatch.setattr(fs_model, "max_cached_directories", 2)
+        scanner = fs_model.DirectoryScanner()
+        for name in ("a", "b", "c"):
+            (tmp_path / name).mkdir()
+            scanner.request(str(tmp_path / name))
+            scanner.wait()
+        assert list(scanner.cache) == [str(tmp_path / "b"), str(tmp_path / "c")]
+
+
+class TestFileSystemModel:
+    """Test fs_model.FileSystemModel."""
+
+    def test_lazy(self, qtbot, tree):
+        """Make sure directories are only listed once they are fetched."""
+        scanner = fs_model.DirectoryScanner()
+        model = fs_model.FileSystemModel(scanner)
+        model.setRootPath(str(tree))
+        assert model.rowCount() == 0
+        scanner.wait()
+        assert names(model) == ["chapters", "images", "Bibliography.bib", "main.typ"]
+        assert model.rootPath() == str(tree)
+
+        chapters = model.index(str(tree / "chapters"))
+        assert model.filePath(chapters) == str(tree / "chapters")
+        assert model.isDir(chapters)
+        assert model.hasChildren(chapters)
+        assert model.canFetchMore(chapters)
+        assert model.rowCount(chapters) == 0
+        assert not model.index(str(tree / "chapters" / "intro.typ")).isValid()
+
+        model.fetchMore(chapters)
+        scanner.wait()
+        intro = model.index(str(tree / "chapters" / "intro.typ"))
+        assert model.parent(intro) == chapters
+        assert model.filePath(intro) == str(tree / "chapters" / "intro.typ")
+        assert not model.hasChildren(intro)
+        assert not model.canFetchMore(intro)
+
+    def test_update(self, qtbot, qtmodeltester, tree):
+        """Make sure only changed rows are inserted, removed or updated when a watched directory changes."""
+        scanner = fs_model.DirectoryScanner()
+        watcher = file_watcher.FileWatcher()
+        model = fs_model.FileSystemModel(scanner, watcher)
+        model.setRootPath(str(tree))
+        scanner.wait()
+        qtmodeltester.check(model)
+        # The tester fetches the subdirectories
+        scanner.wait()
+        assert str(tree) in watcher.watched()
+
+        main = QtCore.QPersistentModelIndex(model.index(str(tree / "main.typ")))
+        inserted = QtTest.QSignalSpy(model.rowsInserted)
+        removed = QtTest.QSignalSpy(model.rowsRemoved)
+        reset = QtTest.QSignalSpy(model.modelReset)
+
+        (tree / "appendix.typ").touch()
+        os.rmdir(tree / "images")
+        qtbot.waitUntil(lambda: names(model) == ["chapters", "appendix.typ", "Bibliography.bib", "main.typ"])
+        assert inserted.count() == 1
+        assert removed.count() == 1
+        assert reset.count() == 0
+        assert main.isValid()
+        assert model.filePath(QtCore.QModelIndex(main)) == str(tree / "main.typ")
+        assert not model.index(str(tree / "images")).isValid()
+        assert model.index(str(tree / "appendix.typ")).isValid()
+
+        with qtbot.waitSignal(model.dataChanged):
+            (tree / "main.typ").write_text("= Main\nWith more text.")
+            (tree / "extra.typ").touch()
+
+    def test_set_root(self, qtbot, tree):
+        """Make sure the previous root is no longer watched once the root changes."""
+        scanner = fs_model.DirectoryScanner()
+        watcher = file_watcher.FileWatcher()
+        model = fs_model.FileSystemModel(scanner, watcher)
+        model.setRootPath(str(tree))
+        model.setRootPath(str(tree / "chapters"))
+        scanner.wait()
+        assert watcher.watched() == [str(tree / "chapters")]
+        assert names(model) == ["intro.typ"]
+
+    def test_decorations(self, qtbot, tree):
+        """Make sure decorations are shown and only the rows of changed paths are repainted."""
+        scanner = fs_model.DirectoryScanner()
+        model = fs_model.FileSystemModel(scanner)
+        d = decorations.Decorations()
+        model.set_decorations(d)
+        model.setRootPath(str(tree))
+        scanner.wait()
+
+        main = model.index(str(tree / "main.typ"))
+        with qtbot.waitSignal(model.dataChanged) as blocker:
+            d.set_unsaved([str(tree / "main.typ"), str(tree / "images" / "unlisted.typ")])
+        assert blocker.args[0] == main
+        assert blocker.args[1] == main.siblingAtColumn(len(fs_model.columns) - 1)
+        assert model.data(main, QtCore.Qt.ItemDataRole.FontRole).italic()
+        assert model.data(main, QtCore.Qt.ItemDataRole.ToolTipRole) == f"{tree / 'main.typ'}\nUnsaved changes"
+
+        bib = model.index(str(tree / "Bibliography.bib"))
+        assert model.data(bib, QtCore.Qt.ItemDataRole.FontRole) is None
+        assert model.data(bib, QtCore.Qt.ItemDataRole.ToolTipRole) == str(tree / "Bibliography.bib")
+        with qtbot.waitSignal(d.changed):
+            d.set_language_server_problems(str(tree / "Bibliography.bib"), [{"message": "error"}])
+        assert model.data(bib, QtCore.Qt.ItemDataRole.ForegroundRole) == QtGui.QColor("red")
+        d.stop()
+
+
+class TestDirectoryCompleter:
+    """Test fs_model.DirectoryCompleter."""
+
+    def test_completions(self, qtbot, tree):
+        """Make sure the subdirectories of the typed directory are offered."""
+        scanner = fs_model.DirectoryScanner()
+        completer = fs_model.DirectoryCompleter(scanner)
+        completer.update_directory(str(tree / "ch"))
+        scanner.wait()
+        assert completer.completions() == [str(tree / "chapters"), str(tree / "images")]
+
+        completer.update_directory("relative/path")
+        assert completer.completions() == []
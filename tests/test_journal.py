@@ -0,0 +1,132 @@
+from qtpy import QtGui
+
+import json
+import pytest
+
+from typstwriter import journal
+from typstwriter import file_io
+
+
+@pytest.fixture()
+def document(qtbot):
+    """Return an empty text document."""
+    document = QtGui.QTextDocument()
+    # Documents only report changes once they have a layout, like the ones of text edits do
+    document.documentLayout()
+    return document
+
+
+def edit(document, position, removed, text):
+    """Replace removed characters at position by text."""
+    cursor = QtGui.QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + removed, QtGui.QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(text)
+
+
+class TestJournal:
+    """Test journal.Journal."""
+
+    def test_new_file(self, tmp_path, document):
+        """Make sure the edits of a new document can be replayed."""
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+
+        edit(document, 0, 0, "Hello\nWorld")
+        edit(document, 5, 1, " 👍 ")
+        edit(document, 0, 1, "J")
+        j.flush()
+
+        assert journal.replay(j.file) == (None, "Jello 👍 World")
+
+    def test_existing_file(self, tmp_path, document):
+        """Make sure the edits are replayed on top of the file the document was loaded from."""
+        path = tmp_path / "file.typ"
+        path.write_text("= Heading\nSome text.\n")
+        document.setPlainText(path.read_text())
+
+        j = journal.Journal(document, directory=str(tmp_path / "journal"))
+        j.start(str(path), file_io.file_identity(str(path)))
+        edit(document, 2, 7, "Title")
+        edit(document, document.characterCount() - 1, 0, "More text.")
+        j.flush()
+
+        assert journal.replay(j.file) == (str(path), "= Title\nSome text.\nMore text.")
+
+    def test_no_changes(self, tmp_path, document):
+        """Make sure journals whose edits cancel out are not replayed."""
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+        edit(document, 0, 0, "abc")
+        edit(document, 0, 3, "")
+        j.flush()
+
+        assert journal.replay(j.file) is None
+
+    def test_changed_file(self, tmp_path, document):
+        """Make sure edits are not replayed on a file that was changed after the journal was started."""
+        path = tmp_path / "file.typ"
+        path.write_text("Some text.")
+        document.setPlainText(path.read_text())
+
+        j = journal.Journal(document, directory=str(tmp_path / "journal"))
+        j.start(str(path), file_io.file_identity(str(path)))
+        edit(document, 0, 4, "Other")
+        j.flush()
+
+        path.write_text("Changed by someone else.")
+        assert journal.replay(j.file) is None
+
+    def test_compaction(self, tmp_path, document, monkeypatch):
+        """Make sure long journals are replaced by a snapshot."""
+        monkeypatch.setattr(journal, "compaction_threshold", 5)
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+
+        for i in range(12):
+            edit(document, 0, 0, str(i))
+            j.flush()
+
+        with open(j.file) as f:
+            entries = [json.loads(line)["type"] for line in f]
+        assert entries[:2] == ["header", "snapshot"]
+        assert len(entries) < 7  # noqa: PLR2004
+        assert journal.replay(j.file) == (None, "11109876543210")
+
+    def test_truncated(self, tmp_path, document):
+        """Make sure a journal whose last line was cut off by a crash can still be replayed."""
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+        edit(document, 0, 0, "abc")
+        j.flush()
+
+        with open(j.file, "a") as f:
+            f.write('{"type": "edit", "posi')
+        assert journal.replay(j.file) == (None, "abc")
+
+    def test_stop(self, tmp_path, document):
+        """Make sure stopping removes the journal and nothing is recorded afterwards."""
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+        edit(document, 0, 0, "abc")
+        j.flush()
+        file = j.file
+
+        j.stop()
+        edit(document, 0, 0, "abc")
+        j.flush()
+        assert j.file is None
+        assert list(tmp_path.iterdir()) == []
+        assert journal.replay(file) is None
+
+    def test_orphaned(self, tmp_path, document):
+        """Make sure only journals no longer used by a running instance are reported as orphaned."""
+        j = journal.Journal(document, directory=str(tmp_path))
+        j.start(None, None)
+        edit(document, 0, 0, "abc")
+        j.flush()
+        assert journal.orphaned_journals(str(tmp_path)) == []
+
+        # Simulate a crash
+        j.lock.unlock()
+        assert journal.orphaned_journals(str(tmp_path)) == [j.file]
@@ -0,0 +1,46 @@
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+import sys
+
+from typstwriter import lazy
+
+
+def test_module(tmp_path, monkeypatch):
+    """Make sure lazy modules are imported once they are used and the import is timed."""
+    (tmp_path / "lazily_imported_module.py").write_text("value = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazily_imported_module", raising=False)
+
+    module = lazy.module("lazily_imported_module")
+    assert "lazily_imported_module" not in sys.modules
+    assert module.value == 42  # noqa: PLR2004
+    assert "lazily_imported_module" in sys.modules
+    assert "lazily_imported_module" in lazy.import_times
+    assert lazy.module("lazily_imported_module") is sys.modules["lazily_imported_module"]
+
+
+class TestLazyDockWidget:
+    """Test lazy.LazyDockWidget."""
+
+    def test_lazy(self, qtbot):
+        """Make sure the widget is only constructed after the dock was shown and painted."""
+        window = QtWidgets.QMainWindow()
+        qtbot.addWidget(window)
+        dock = lazy.LazyDockWidget("Dock", QtWidgets.QLabel, window)
+        window.addDockWidget(QtCore.Qt.DockWidgetArea.LeftDockWidgetArea, dock)
+        dock.hide()
+        window.show()
+        qtbot.waitExposed(window)
+        assert dock.content is None
+
+        with qtbot.waitSignal(dock.built):
+            dock.show()
+        assert isinstance(dock.widget(), QtWidgets.QLabel)
+
+    def test_eager(self, qtbot):
+        """Make sure the widget is constructed right away if the dock is not lazy."""
+        dock = lazy.LazyDockWidget("Dock", QtWidgets.QLabel, lazy=False)
+        qtbot.addWidget(dock)
+        assert isinstance(dock.widget(), QtWidgets.QLabel)
+        assert dock.build() is dock.widget()
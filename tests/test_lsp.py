@@ -0,0 +1,175 @@
+from qtpy import QtGui
+
+import io
+import os
+import sys
+
+import pytest
+
+from typstwriter import change_tracker
+from typstwriter import editor
+from typstwriter import lsp
+
+fake_server = os.path.join(os.path.dirname(__file__), "fake_language_server.py")
+
+
+@pytest.fixture()
+def server(qtbot):
+    """Return a language client connected to the fake language server."""
+    server = lsp.LanguageServer(command=[sys.executable, fake_server])
+    with qtbot.waitSignal(server.started, timeout=5000):
+        assert server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def document(server, tmp_path, qtbot):
+    """Return a document opened on the server and the path it belongs to."""
+    (document, changes) = new_document("= Title\nSome text\n")
+    path = str(tmp_path / "main.typ")
+    with qtbot.waitSignal(server.diagnostics_published, timeout=5000):
+        server.open_document(path, changes)
+    return (document, path)
+
+
+def server_text(server, path, qtbot):
+    """Return the text of a document as known to the server."""
+    result = []
+    server.request("fake/text", {"uri": lsp.path_to_uri(path)}, result.append)
+    qtbot.waitUntil(lambda: len(result) == 1, timeout=5000)
+    return result[0]
+
+
+def new_document(text=""):
+    """Return a document which reports its changes like the document of an edit, and its change tracker."""
+    document = QtGui.QTextDocument()
+    document.setPlainText(text)
+    # Qt only emits contentsChange for documents with a layout
+    document.documentLayout()
+    return (document, change_tracker.ChangeTracker(document))
+
+
+def edit(document, position, text, removed=0):
+    """Replace removed characters at position by text."""
+    cursor = QtGui.QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + removed, QtGui.QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(text)
+
+
+def test_framing():
+    """Make sure messages survive encoding and reading back."""
+    stream = io.BytesIO(lsp.encode({"id": 1, "result": "ä"}) + lsp.encode({"method": "exit"}))
+    assert lsp.read_message(stream) == {"id": 1, "result": "ä"}
+    assert lsp.read_message(stream) == {"method": "exit"}
+    assert lsp.read_message(stream) is None
+
+
+def test_semantic_tokens():
+    """Make sure the relative token encoding is decoded."""
+    data = [0, 2, 3, 0, 0, 0, 4, 1, 1, 0, 2, 1, 5, 7, 0]
+    assert lsp.semantic_tokens(data, ["keyword", "heading"]) == [(0, 2, 3, "keyword"), (0, 6, 1, "heading"), (2, 1, 5, None)]
+
+
+class TestLanguageServer:
+    """Test lsp.LanguageServer against a fake language server."""
+
+    def test_start_failure(self):
+        """Make sure a missing server is reported and does not raise."""
+        server = lsp.LanguageServer(command=["/nonexistent/language-server"])
+        assert not server.start()
+        assert not server.running()
+
+    def test_incremental_sync(self, qtbot, server, document):
+        """Make sure edits are sent as ranges, batched until control returns to the event loop, and reproduce the text."""
+        (document, path) = document
+        sent = []
+        server.send = lambda message, *args, send=server.send: sent.append(message) or send(message, *args)
+
+        edit(document, 2, "Big ")
+        edit(document, 8, "\nNew line", removed=6)
+        edit(document, 0, "ä😀")
+        edit(document, 3, "", removed=9)
+        edit(document, document.characterCount() - 1, "error")
+
+        qtbot.waitUntil(lambda: len(sent) == 1)
+        edit(document, 0, "= ")
+        qtbot.waitUntil(lambda: len(sent) == 2)  # noqa: PLR2004
+
+        assert [m["method"] for m in sent] == ["textDocument/didChange"] * 2
+        assert [m["params"]["textDocument"]["version"] for m in sent] == [5, 6]
+        changes = sent[0]["params"]["contentChanges"]
+        assert len(changes) == 5  # noqa: PLR2004
+        assert all("range" in change for change in changes)
+        assert changes[1]["range"] == {"start": {"line": 0, "character": 8}, "end": {"line": 1, "character": 2}}
+
+        # The emoji counts as two UTF-16 code units, the unit of LSP positions and Qt document positions alike
+        assert server_text(server, path, qtbot) == document.toPlainText()
+
+    def test_full_sync(self, qtbot, tmp_path):
+        """Make sure the whole text is sent if the server asks for it, or if Qt reports a change past the end."""
+        server = lsp.LanguageServer(command=[sys.executable, fake_server, "full"])
+        with qtbot.waitSignal(server.started, timeout=5000):
+            server.start()
+        (document, changes) = new_document()
+        path = str(tmp_path / "main.typ")
+        server.open_document(path, changes)
+
+        edit(document, 0, "Hello")
+        document.setPlainText("Replaced\ntext")
+        assert server_text(server, path, qtbot) == "Replaced\ntext"
+        server.stop()
+
+    def test_diagnostics(self, qtbot, server, document):
+        """Make sure diagnostics are converted to the format of CodeEdit.highlight_errors."""
+        (document, path) = document
+        with qtbot.waitSignal(server.diagnostics_published, timeout=5000) as blocker:
+            edit(document, 8, "An error here\n")
+        assert blocker.args == [path, [("error", 2, 3, 5)]]
+
+        with qtbot.waitSignal(server.diagnostics_published, timeout=5000) as blocker:
+            edit(document, 8, "", removed=14)
+        assert blocker.args == [path, []]
+
+    def test_requests(self, qtbot, server, document):
+        """Make sure completions and semantic tokens are returned through callbacks."""
+        (document, path) = document
+        completions = []
+        server.complete(path, 0, 2, completions.append)
+        tokens = []
+        server.request_semantic_tokens(path, tokens.append)
+        qtbot.waitUntil(lambda: bool(completions and tokens), timeout=5000)
+
+        assert completions == [["heading", "highlight"]]
+        assert tokens == [[(0, 0, 1, "heading"), (1, 0, 4, "keyword"), (1, 5, 3, "keyword")]]
+
+    def test_close_and_crash(self, qtbot, server, document):
+        """Make sure closed documents are no longer synced and a crashed server is forgotten."""
+        (document, path) = document
+        server.close_document(path)
+        assert server.documents == {}
+        assert server_text(server, path, qtbot) is None
+
+        with qtbot.waitSignal(server.stopped, timeout=5000):
+            server.request("fake/crash", None)
+        assert not server.running()
+        # Edits to formerly opened documents are not sent anymore
+        edit(document, 0, "text")
+
+    def test_editor(self, qtbot, server, tmp_path):
+        """Make sure the editor syncs opened Typst files and shows their diagnostics."""
+        path = tmp_path / "main.typ"
+        path.write_text("= Title\nSome text\n")
+        e = editor.Editor(language_server=server)
+        qtbot.addWidget(e)
+        e.open_file(str(path))
+        page = e.TabWidget.currentWidget()
+        assert str(path) in server.documents
+
+        page.edit.textCursor().insertText("error ")
+        qtbot.waitUntil(lambda: bool(page.edit.error_highlight), timeout=5000)
+
+        page.save(wait=True)
+        e.close_tab(e.TabWidget.currentIndex())
+        assert server.documents == {}
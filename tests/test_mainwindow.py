@@ -0,0 +1,52 @@
+from qtpy import QtWidgets
+
+import pytest
+
+from typstwriter import globalstate
+from typstwriter import mainwindow
+from typstwriter import util
+
+
+@pytest.fixture()
+def window(qtbot, tmp_path, monkeypatch):
+    """Return a main window working in tmp_path, keeping its caches and session there."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setitem(util.config.config["Internals"], "session_path", str(tmp_path / "session"))
+    monkeypatch.setattr(mainwindow.MainWindow, "check_typst_availability", lambda self, record: None)
+    monkeypatch.setattr(QtWidgets.QMessageBox, "question", lambda *args: QtWidgets.QMessageBox.StandardButton.No)
+    working_directory = globalstate.State.working_directory
+    previous = working_directory.Value
+    working_directory.Value = str(tmp_path)
+
+    w = mainwindow.MainWindow()
+    qtbot.addWidget(w)
+    yield w
+    w.close()
+
+    # The closed window must not follow the working directory anymore
+    working_directory.blockSignals(True)
+    working_directory.Value = previous
+    working_directory.blockSignals(False)
+
+
+class TestMainWindow:
+    """Test mainwindow.MainWindow."""
+
+    def test_start_compiler(self, window, monkeypatch):
+        """Make sure the compiler starts once after the pending saves, unless Run was toggled off meanwhile."""
+        starts = []
+        monkeypatch.setattr(window.CompilerConnector, "start", lambda: starts.append(True))
+        monkeypatch.setattr(window.editor.save_service, "busy", lambda: True)
+
+        window.actions.run.setChecked(True)
+        window.start_compiler()
+        window.start_compiler()
+        window.editor.save_service.idle.emit()
+        window.editor.save_service.idle.emit()
+        assert len(starts) == 1
+
+        window.start_compiler()
+        window.actions.run.setChecked(False)
+        window.stop_compiler()
+        window.editor.save_service.idle.emit()
+        assert len(starts) == 1
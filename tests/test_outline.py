@@ -0,0 +1,117 @@
+from qtpy import QtGui
+
+import pytest
+
+from typstwriter import editor
+from typstwriter import outline
+
+
+text = """= Introduction <intro>
+#let greet(name) = [Hello #name]
+See @intro and @methods, mail me at someone@example.com.
+
+== Details
+Text.
+= Methods <methods>
+"""
+
+
+@pytest.fixture()
+def edit(qtbot):
+    """Return a code edit holding a short Typst document."""
+    edit = editor.CodeEdit(highlight_synatx=False, show_line_numbers=False)
+    qtbot.addWidget(edit)
+    edit.setPlainText(text)
+    return edit
+
+
+def symbols(index):
+    """Return the kind, name and line of all outline symbols."""
+    return [(s.kind, s.name, s.line()) for s in index.outline()]
+
+
+def insert(edit, position, text, removed=0):
+    """Replace removed characters at position by text."""
+    cursor = QtGui.QTextCursor(edit.document())
+    cursor.setPosition(position)
+    cursor.setPosition(position + removed, QtGui.QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(text)
+
+
+class TestSymbolIndex:
+    """Test outline.SymbolIndex."""
+
+    def test_symbols(self, edit):
+        """Make sure headings, labels, function definitions and references are found."""
+        index = edit.symbols
+        assert symbols(index) == [
+            ("heading", "Introduction", 0),
+            ("label", "intro", 0),
+            ("function", "greet", 1),
+            ("heading", "Details", 4),
+            ("heading", "Methods", 6),
+            ("label", "methods", 6),
+        ]
+        assert index.definition("intro").line() == 0
+        assert index.definition("unknown") is None
+        assert [s.line() for s in index.references("methods")] == [2]
+        assert index.references("example.com") == []
+        assert index.function("greet").column == 5  # noqa: PLR2004
+        assert sorted(index.labels()) == ["intro", "methods"]
+
+    def test_incremental(self, edit):
+        """Make sure edits only rescan the changed blocks and keep the index consistent."""
+        index = edit.symbols
+        methods = index.definition("methods")
+
+        # Inserting lines shifts the symbols after them, which are not rescanned
+        insert(edit, 0, "= Preface\n\n")
+        assert index.definition("methods") is methods
+        assert methods.line() == 8  # noqa: PLR2004
+        assert len(index.blocks) == edit.document().blockCount()
+
+        # Removing a label removes it from the index
+        position = edit.document().findBlockByNumber(8).position()
+        insert(edit, position, "= Results", removed=len("= Methods <methods>"))
+        assert index.definition("methods") is None
+        assert index.references("methods")
+        assert symbols(index)[-1] == ("heading", "Results", 8)
+
+        # Replacing the whole text starts over
+        edit.setPlainText("#let f(x) = x\n")
+        assert symbols(index) == [("function", "f", 0)]
+        assert index.references("methods") == []
+        assert len(index.blocks) == edit.document().blockCount()
+
+    def test_changed(self, qtbot, edit):
+        """Make sure changed is only emitted if symbols changed."""
+        with qtbot.assertNotEmitted(edit.symbols.changed):
+            insert(edit, edit.document().findBlockByNumber(5).position(), "More ")
+        with qtbot.waitSignal(edit.symbols.changed, timeout=0):
+            insert(edit, 0, "<start>")
+
+
+class TestOutlineView:
+    """Test outline.OutlineView."""
+
+    def test_populate(self, qtbot, edit):
+        """Make sure symbols are nested by heading level and clicking them moves the cursor."""
+        view = outline.OutlineView()
+        qtbot.addWidget(view)
+        view.set_edit(edit)
+
+        root = view.tree_widget.invisibleRootItem()
+        assert [root.child(i).text(0) for i in range(root.childCount())] == ["Introduction", "Methods"]
+        introduction = root.child(0)
+        assert [introduction.child(i).text(0) for i in range(introduction.childCount())] == ["<intro>", "greet", "Details"]
+
+        view.jump_to(introduction.child(2))
+        assert edit.textCursor().blockNumber() == 4  # noqa: PLR2004
+
+        # Changes are shown after a short delay
+        with qtbot.waitSignal(view.timer.timeout):
+            insert(edit, 0, "= Preface\n")
+        assert root.child(0).text(0) == "Preface"
+
+        view.set_edit(None)
+        assert root.childCount() == 0
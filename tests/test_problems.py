@@ -0,0 +1,93 @@
+from qtpy import QtCore
+
+import collections
+import pytest
+
+from typstwriter import editor
+from typstwriter import problems
+
+
+def report(errors):
+    """Return errors by path like the compiler reports them."""
+    result = collections.defaultdict(list)
+    for path, entries in errors.items():
+        result[path].extend(entries)
+    return result
+
+
+def shown(model, column):
+    """Return the column of the fetched rows."""
+    return [model.data(model.index(row, column)) for row in range(model.rowCount())]
+
+
+class TestProblemsModel:
+    """Test problems.ProblemsModel."""
+
+    def test_report(self, qtbot):
+        """Make sure the problems of all files are held and sorted by file and line."""
+        model = problems.ProblemsModel()
+        model.set_report(
+            report({"/b.typ": [("error: b", 3, 0, 1)], "/a.typ": [("error: a2", 7, 2, 1), ("warning: a1", 1, 0, 1)]})
+        )
+        assert shown(model, 0) == ["warning: a1", "error: a2", "error: b"]
+        assert model.errors_for("/b.typ") == [("error: b", 3, 0, 1)]
+        assert model.errors_for("/c.typ") == []
+
+        model.sort(0, QtCore.Qt.SortOrder.DescendingOrder)
+        assert shown(model, 0) == ["warning: a1", "error: b", "error: a2"]
+
+        model.clear()
+        assert model.rowCount() == 0
+        assert model.errors_for("/b.typ") == []
+
+    def test_fetch(self, monkeypatch):
+        """Make sure rows are handed out in batches."""
+        monkeypatch.setattr(problems, "fetch_size", 10)
+        model = problems.ProblemsModel()
+        model.set_report(report({"/a.typ": [("error", line, 0, 1) for line in range(1, 26)]}))
+        assert model.rowCount() == 10  # noqa: PLR2004
+        assert model.canFetchMore()
+
+        model.fetchMore()
+        model.fetchMore()
+        assert model.rowCount() == 25  # noqa: PLR2004
+        assert not model.canFetchMore()
+        assert shown(model, 2) == list(range(1, 26))
+
+    @pytest.mark.parametrize(("text", "count"), [("", 3), ("UNKNOWN", 2), ("b.typ", 1), ("nothing", 0)])
+    def test_filter(self, text, count):
+        """Make sure only problems whose message or file match the filter are shown."""
+        model = problems.ProblemsModel()
+        model.set_report(
+            report(
+                {"/a.typ": [("unknown variable", 1, 0, 1), ("expected comma", 2, 0, 1)], "/b.typ": [("unknown font", 1, 0, 1)]}
+            )
+        )
+        model.set_filter(text)
+        assert model.rowCount() == count
+
+
+class TestProblemsView:
+    """Test problems.ProblemsView."""
+
+    def test_open_location(self, qtbot, tmp_path):
+        """Make sure clicking a problem opens its file with the stored errors, without compiling."""
+        path = tmp_path / "file.typ"
+        path.write_text("".join(f"Line {n}\n" for n in range(50)))
+
+        view = problems.ProblemsView()
+        qtbot.addWidget(view)
+        view.model.set_report(report({str(path): [("error: unknown variable", 20, 2, 3)]}))
+
+        e = editor.Editor()
+        qtbot.addWidget(e)
+        view.open_location.connect(lambda p, line, column: e.open_location(p, line, column, view.model.errors_for(p)))
+
+        with qtbot.waitSignal(view.open_location) as blocker:
+            view.table.clicked.emit(view.model.index(0, 0))
+        assert blocker.args == [str(path), 20, 2]
+
+        page = e.TabWidget.currentWidget()
+        assert page.path == str(path)
+        assert page.edit.diagnostics.store.lines == [19]
+        assert page.edit.textCursor().blockNumber() == 19  # noqa: PLR2004
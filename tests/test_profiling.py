@@ -0,0 +1,81 @@
+from qtpy import QtWidgets
+
+import argparse
+import json
+import sys
+
+import pytest
+
+from typstwriter import profiling
+
+
+@pytest.mark.parametrize(
+    ("argv", "result"),
+    [
+        (["tw"], False),
+        (["tw", "--profile-startup"], True),
+        (["tw", "--profile-startup=t.json"], True),
+        (["tw", "a.typ"], False),
+    ],
+)
+def test_requested(argv, result):
+    """Test profiling.requested."""
+    assert profiling.requested(argv) is result
+
+
+def test_trace_path():
+    """Make sure only JSON files are accepted as trace path, so that source files are never overwritten."""
+    assert profiling.trace_path("trace.json") == "trace.json"
+    with pytest.raises(argparse.ArgumentTypeError):
+        profiling.trace_path("main.typ")
+
+
+class TestProfiler:
+    """Test profiling.Profiler."""
+
+    def test_span(self):
+        """Make sure nested spans are recorded as complete events."""
+        profiler = profiling.Profiler()
+        with profiler.span("outer"), profiler.span("inner"):
+            pass
+        profiler.counter("latency", {"ms": 1.5})
+
+        trace = profiler.trace()
+        (inner, outer, counter) = trace["traceEvents"][1:]
+        assert (inner["name"], outer["name"]) == ("inner", "outer")
+        assert inner["ph"] == outer["ph"] == "X"
+        assert outer["ts"] <= inner["ts"] <= inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+        assert counter["args"] == {"ms": 1.5}
+
+    def test_imports(self, tmp_path, monkeypatch):
+        """Make sure imports are recorded and the modules keep their original loader."""
+        (tmp_path / "profiled_module.py").write_text("import profiled_dependency\n")
+        (tmp_path / "profiled_dependency.py").write_text("value = 1\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        profiler = profiling.Profiler()
+        monkeypatch.setattr(sys, "meta_path", [profiling.ImportTimer(profiler), *sys.meta_path])
+
+        import profiled_module  # noqa: PLC0415
+
+        names = [e["name"] for e in profiler.events if e["cat"] == "import"]
+        assert names == ["profiled_dependency", "profiled_module"]
+        assert not isinstance(profiled_module.__loader__, profiling.TimedLoader)
+        assert not isinstance(profiled_module.__spec__.loader, profiling.TimedLoader)
+        monkeypatch.delitem(sys.modules, "profiled_module")
+        monkeypatch.delitem(sys.modules, "profiled_dependency")
+
+    def test_finish(self, qtbot, tmp_path, monkeypatch):
+        """Make sure the first paint and the event loop latency are recorded and the trace is written."""
+        monkeypatch.setattr(profiling, "sampling_time", 0.2)
+        window = QtWidgets.QLabel("Window")
+        qtbot.addWidget(window)
+        profiler = profiling.Profiler()
+        done = []
+
+        window.show()
+        profiler.finish(window, str(tmp_path / "trace.json"), done=lambda: done.append(True))
+        qtbot.waitUntil(lambda: bool(done), timeout=5000)
+
+        events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+        assert [e["name"] for e in events if e["ph"] == "X"] == ["first paint"]
+        assert any(e["ph"] == "C" and e["name"] == "event loop latency" for e in events)
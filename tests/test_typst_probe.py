@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+
+from typstwriter import typst_probe
+
+fake_typst = """#!{python}
+import sys
+if sys.argv[1:] == ["--version"]:
+    print("typst 0.12.3 (8cccff48)")
+elif sys.argv[1:] == ["fonts"]:
+    print("DejaVu Sans")
+    print("Libertinus Serif")
+else:
+    sys.exit(2)
+"""
+
+
+@pytest.fixture()
+def typst(tmp_path, monkeypatch):
+    """Configure a fake typst executable and a probe cache in tmp_path and return the path of the executable."""
+    path = tmp_path / "typst"
+    path.write_text(fake_typst.format(python=sys.executable))
+    path.chmod(0o755)
+    monkeypatch.setitem(typst_probe.config.config["Compiler"], "name", str(path))
+    monkeypatch.setitem(typst_probe.config.config["Internals"], "typst_probe_path", str(tmp_path / "cache" / "probe.json"))
+    return path
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The fake typst is a script")
+class TestTypstProbe:
+    """Test typst_probe.TypstProbe."""
+
+    def test_probe(self, qtbot, typst):
+        """Make sure typst is probed in the background and its capabilities are recorded."""
+        probe = typst_probe.TypstProbe()
+        assert probe.available() is None
+
+        with qtbot.waitSignal(probe.finished, timeout=10000) as blocker:
+            probe.start()
+        record = blocker.args[0]
+        assert record["available"]
+        assert record["executable"] == os.path.realpath(typst)
+        assert record["fonts"] == ["DejaVu Sans", "Libertinus Serif"]
+        assert set(record["package_paths"]) == {"local", "cache"}
+        assert probe.version() == (0, 12, 3)
+
+    def test_cache(self, qtbot, typst, monkeypatch):
+        """Make sure the record of a working typst is cached until the executable changes."""
+        probe = typst_probe.TypstProbe()
+        with qtbot.waitSignal(probe.finished, timeout=10000):
+            probe.start()
+
+        calls = []
+        unavailable = {"available": False, "version": None, "fonts": [], "package_paths": {}}
+        monkeypatch.setattr(typst_probe, "probe", lambda identity: calls.append(identity) or {**identity, **unavailable})
+        probe = typst_probe.TypstProbe()
+        probe.start()
+        assert probe.available()
+        assert calls == []
+
+        stat = typst.stat()
+        os.utime(typst, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with qtbot.waitSignal(probe.finished, timeout=10000) as blocker:
+            probe.start()
+        assert not blocker.args[0]["available"]
+        assert len(calls) == 1
+
+        # Failed probes are not cached
+        with qtbot.waitSignal(probe.finished, timeout=10000):
+            probe.start()
+        assert len(calls) == 2  # noqa: PLR2004
+
+    def test_not_found(self, qtbot, typst, monkeypatch):
+        """Make sure a missing typst is reported as unavailable."""
+        monkeypatch.setitem(typst_probe.config.config["Compiler"], "name", str(typst.parent / "missing"))
+        probe = typst_probe.TypstProbe()
+        with qtbot.waitSignal(probe.finished):
+            probe.start()
+        assert probe.available() is False
+        assert probe.version() is None
+
+    def test_not_typst(self, typst):
+        """Make sure an executable which is not typst is reported as unavailable."""
+        typst.write_text(f"#!{sys.executable}\nprint('something else')\n")
+        record = typst_probe.probe(typst_probe.executable_identity(str(typst)))
+        assert not record["available"]
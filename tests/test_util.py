@@ -158,24 +158,26 @@ class TestTogglingAction:
             action.trigger()
 
 
-def test_typst_available(monkeypatch):
-    """Test util.typst_available."""
-    monkeypatch.setattr(QtCore.QProcess, "start", lambda *args: None)
-    monkeypatch.setattr(QtCore.QProcess, "exitCode", lambda *args: 2)
-    monkeypatch.setattr(QtCore.QProcess, "exitStatus", lambda *args: QtCore.QProcess.ExitStatus.NormalExit)
-
-    # Typst available
-    monkeypatch.setattr(QtCore.QProcess, "readAll", lambda *args: b"The Typst compiler")
-    assert util.typst_available()
-
-    # Typst not available
-    monkeypatch.setattr(QtCore.QProcess, "readAll", lambda *args: b"Some other program")
-    assert not util.typst_available()
-
-
 def test_qstring_length():
     """Test util.qstring_length."""
     assert util.qstring_length("asdf") == 4  # noqa: PLR2004
     assert util.qstring_length("Some\nText") == 9  # noqa: PLR2004
     assert util.qstring_length("👍") == 2  # noqa: PLR2004
     assert util.qstring_length('"Happy Birthday 🎉"') == 19  # noqa: PLR2004
+
+
+def test_session_file(tmp_path, monkeypatch):
+    """Test util.read_session_file and util.write_session_file."""
+    path = tmp_path / "Session.txt"
+    monkeypatch.setitem(util.config.config["Internals"], "session_path", str(path))
+
+    files = [{"path": "/a.typ", "scroll": 0, "folds": []}, {"path": "/b.typ", "scroll": 42, "folds": [3, 17]}]
+    util.write_session_file("/", files)
+    assert util.read_session_file() == ("/", files)
+
+    # Sessions written by older versions only store paths or no folds
+    path.write_text('["/", ["/a.typ", {"path": "/b.typ", "scroll": 42}]]')
+    assert util.read_session_file() == (
+        "/",
+        [{"path": "/a.typ", "scroll": 0, "folds": []}, {"path": "/b.typ", "scroll": 42, "folds": []}],
+    )
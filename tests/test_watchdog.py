@@ -0,0 +1,42 @@
+from qtpy import QtCore
+
+import time
+
+from typstwriter import watchdog
+
+
+def slow_operation():
+    """Block the event loop."""
+    time.sleep(0.4)
+
+
+class TestWatchdog:
+    """Test watchdog.Watchdog."""
+
+    def test_stall(self, qtbot):
+        """Make sure a stall is reported with the stack of the GUI thread."""
+        dog = watchdog.Watchdog(threshold=100)
+        dog.start()
+        try:
+            with qtbot.waitSignal(dog.stalled, timeout=5000) as blocker:
+                QtCore.QTimer.singleShot(50, slow_operation)
+        finally:
+            dog.stop()
+
+        stall = blocker.args[0]
+        assert stall.duration > 0.3  # noqa: PLR2004
+        assert stall.stacks
+        assert "slow_operation" in "".join(stall.stacks[0][1])
+        assert list(dog.stalls) == [stall]
+
+        report = dog.report()
+        assert "Stalls longer than 100 ms: 1" in report
+        assert "in slow_operation" in report
+
+    def test_no_stall(self, qtbot):
+        """Make sure a responsive event loop is not reported."""
+        dog = watchdog.Watchdog(threshold=200)
+        dog.start()
+        qtbot.wait(300)
+        dog.stop()
+        assert not dog.stalls
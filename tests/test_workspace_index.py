@@ -0,0 +1,146 @@
+import os
+import pytest
+
+from typstwriter import workspace_index
+
+
+@pytest.fixture()
+def workspace(tmp_path):
+    """Create a working directory with some typst and bibliography files."""
+    root = tmp_path / "workspace"
+    (root / "chapters").mkdir(parents=True)
+    (root / ".git").mkdir()
+    (root / "main.typ").write_text('#include "chapters/intro.typ"\nSee @intro and @knuth.\n')
+    (root / "chapters" / "intro.typ").write_text("= Introduction <intro>\n```typ\n= Example <example>\n```\n")
+    (root / "refs.bib").write_text("@book{knuth,\n  title = {TAOCP},\n}\n@article{ turing ,\n}\n")
+    (root / "refs.yml").write_text("harry:\n  type: Book\n  title: Harry Potter\n# comment:\nzeta: {type: Web}\n")
+    (root / ".git" / "hidden.typ").write_text("<hidden>\n")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "package.typ").write_text("<package>\n")
+    return root
+
+
+@pytest.fixture()
+def index(qtbot, tmp_path, monkeypatch):
+    """Return a workspace index stored in a temporary directory."""
+    monkeypatch.setitem(workspace_index.config.config["FS Explorer"], "ignore_patterns", ".*, node_modules")
+    index = workspace_index.WorkspaceIndex(path=str(tmp_path / "data" / "index.sqlite"))
+    yield index
+    index.stop()
+
+
+def test_parse():
+    """Test workspace_index.parse for all file types."""
+    assert workspace_index.parse("a.typ", "= A <a>\n```\n<b>\n```\n<c> <d>") == [
+        ("label", "a", 0, 4),
+        ("label", "c", 4, 0),
+        ("label", "d", 4, 4),
+    ]
+    assert workspace_index.parse("a.bib", "@misc{key-1,\n}\n  @book{ other:2 , title={x}}") == [
+        ("key", "key-1", 0, 6),
+        ("key", "other:2", 2, 9),
+    ]
+    assert workspace_index.parse("a.yml", "key:\n  type: article\nother: {}\n") == [
+        ("key", "key", 0, 0),
+        ("key", "other", 2, 0),
+    ]
+    assert workspace_index.parse("a.yaml", "package:\n  name: x\ninputs:\n  type: string\n") == []
+    assert workspace_index.parse("a.txt", "<a>") == []
+
+
+class TestWorkspaceIndex:
+    """Test workspace_index.WorkspaceIndex."""
+
+    def test_definitions(self, index, workspace):
+        """Make sure labels and keys of all files below the root can be looked up."""
+        index.set_root(str(workspace))
+        index.wait()
+
+        assert index.definitions("intro") == [(str(workspace / "chapters" / "intro.typ"), 0, 15)]
+        assert index.definitions("knuth") == [(str(workspace / "refs.bib"), 0, 6)]
+        assert index.definitions("harry") == [(str(workspace / "refs.yml"), 0, 0)]
+        assert index.definitions("example") == []
+        assert index.definitions("hidden") == []
+        assert index.definitions("package") == []
+        assert index.unresolved(["intro", "turing", "zeta", "unknown"]) == {"unknown"}
+        assert index.names("") == ["harry", "intro", "knuth", "turing", "zeta"]
+        assert index.names("t") == ["turing"]
+        assert index.names("", limit=2) == ["harry", "intro"]
+
+        # Only files below the root are considered
+        index.root = str(workspace / "chapters")
+        assert index.definitions("knuth") == []
+        assert index.names("") == ["intro"]
+        assert index.unresolved(["intro", "knuth"]) == {"knuth"}
+
+    def test_incremental(self, qtbot, index, workspace):
+        """Make sure only changed files are parsed again and removed files are dropped."""
+        index.set_root(str(workspace))
+        index.wait()
+        assert workspace_index.index_directory(index.path, str(workspace), ["node_modules"]) == []
+
+        # Touching a file does not change its symbols
+        os.utime(workspace / "main.typ", ns=(0, 0))
+        assert workspace_index.index_directory(index.path, str(workspace), ["node_modules"]) == []
+
+        path = workspace / "chapters" / "intro.typ"
+        path.write_text("= Introduction <start>\n")
+        with qtbot.waitSignal(index.updated):
+            index.update_file(str(path))
+        assert index.definitions("intro") == []
+        assert index.definitions("start") == [(str(path), 0, 15)]
+
+        (workspace / "refs.bib").unlink()
+        with qtbot.waitSignal(index.updated):
+            index.scan()
+        assert index.definitions("knuth") == []
+
+    def test_directory_changed(self, qtbot, index, workspace):
+        """Make sure only the files directly in a changed directory are indexed again."""
+        index.set_root(str(workspace))
+        index.wait()
+
+        (workspace / "chapters" / "outro.typ").write_text("<outro>")
+        (workspace / "appendix.typ").write_text("<appendix>")
+        with qtbot.waitSignal(index.updated):
+            index.directory_changed(str(workspace))
+        assert index.definitions("appendix") == [(str(workspace / "appendix.typ"), 0, 0)]
+        assert index.definitions("outro") == []
+
+        # Removed subdirectories are dropped, ignored directories are not indexed
+        (workspace / "chapters" / "intro.typ").unlink()
+        (workspace / "chapters" / "outro.typ").unlink()
+        (workspace / "chapters").rmdir()
+        with qtbot.waitSignal(index.updated):
+            index.directory_changed(str(workspace))
+        assert index.definitions("intro") == []
+        index.directory_changed(str(workspace / "node_modules"))
+        assert not index.jobs.busy()
+
+    def test_home(self, index, workspace, monkeypatch):
+        """Make sure a home directory is not walked."""
+        monkeypatch.setenv("HOME", str(workspace))
+        index.set_root(str(workspace))
+        index.wait()
+        assert index.definitions("knuth") == [(str(workspace / "refs.bib"), 0, 6)]
+        assert index.definitions("intro") == []
+
+    def test_large_file(self, index, workspace, monkeypatch):
+        """Make sure large files, which are not hashed, are parsed again once they changed."""
+        monkeypatch.setattr(workspace_index.file_watcher.file_io, "chunked_loading_threshold", 4)
+        path = workspace / "main.typ"
+        assert workspace_index.update_files(index.path, [str(path)]) == [str(path)]
+        path.write_text("<first>")
+        os.utime(path, ns=(0, 0))
+        assert workspace_index.update_files(index.path, [str(path)]) == [str(path)]
+
+    def test_not_indexed(self, qtbot, index, workspace, tmp_path):
+        """Make sure files outside the root or of other types are not indexed."""
+        index.set_root(str(workspace))
+        index.wait()
+
+        other = tmp_path / "other.typ"
+        other.write_text("<other>")
+        index.update_file(str(other))
+        index.update_file(str(workspace / "notes.txt"))
+        assert not index.jobs.busy()
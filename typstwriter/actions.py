@@ -39,6 +39,11 @@ class Actions(QtCore.QObject):
         self.open_recent_File.setShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL | QtCore.Qt.SHIFT | QtCore.Qt.Key_O))
         self.open_recent_File.setText("Open Recent File")
 
+        self.go_to_file = QtWidgets.QAction(self)
+        self.go_to_file.setIcon(QtGui.QIcon.fromTheme("edit-find", QtGui.QIcon(util.icon_path("search.svg"))))
+        self.go_to_file.setShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL | QtCore.Qt.Key_P))
+        self.go_to_file.setText("Go to File")
+
         self.load_last_Session = QtWidgets.QAction(self)
         self.load_last_Session.setIcon(
             QtGui.QIcon.fromTheme("folder-open-recent", QtGui.QIcon(util.icon_path("lastSession.svg")))
@@ -87,6 +92,10 @@ class Actions(QtCore.QObject):
         self.search.setShortcut(QtGui.QKeySequence.Find)
         self.search.setText("Search")
 
+        self.go_to_definition = QtWidgets.QAction(self)
+        self.go_to_definition.setShortcut(QtGui.QKeySequence(QtCore.Qt.Key_F12))
+        self.go_to_definition.setText("Go to Definition")
+
         self.font_size_up = QtWidgets.QAction(self)
         self.font_size_up.setIcon(QtGui.QIcon.fromTheme(QtGui.QIcon.ZoomIn, QtGui.QIcon(util.icon_path("plus.svg"))))
         self.font_size_up.setText("Increase Font Size")
@@ -148,10 +157,21 @@ class Actions(QtCore.QObject):
         self.show_compiler_output.setText("Show Compiler Output")
         self.show_compiler_output.setCheckable(True)
 
+        self.show_outline = QtWidgets.QAction(self)
+        self.show_outline.setText("Show Outline")
+        self.show_outline.setCheckable(True)
+
+        self.show_problems = QtWidgets.QAction(self)
+        self.show_problems.setText("Show Problems")
+        self.show_problems.setCheckable(True)
+
         self.open_config = QtWidgets.QAction(self)
         self.open_config.setIcon(QtGui.QIcon.fromTheme("configure-symbolic"))
         self.open_config.setText("Open config file")
 
+        self.export_slow_operations = QtWidgets.QAction(self)
+        self.export_slow_operations.setText("Export slow operations report")
+
         self.run = util.TogglingAction(self)
         self.run.setIcon(
             QtGui.QIcon.fromTheme(QtGui.QIcon.MediaPlaybackStart, QtGui.QIcon(util.icon_path("start.svg"))),
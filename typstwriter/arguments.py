@@ -1,6 +1,7 @@
 import argparse
 
 import typstwriter
+from typstwriter import profiling
 
 
 class APA(argparse.ArgumentParser):
@@ -75,6 +76,15 @@ def parse_args():
         type=str,
         help="Set the working directory.",
     )
+    parser.add_argument(
+        "--profile-startup",
+        action="store",
+        nargs="?",
+        const=profiling.default_trace_path,
+        type=profiling.trace_path,
+        metavar="PATH",
+        help="Profile the startup, write a Chrome trace to PATH ending in .json and quit.",
+    )
 
     return parser.parse_args()
 
@@ -0,0 +1,121 @@
+from qtpy import QtCore
+
+import concurrent.futures
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobs(QtCore.QObject):
+    """
+    Runs jobs on a pool of worker threads and reports them on the GUI thread.
+
+    Every job is submitted with a context, e.g. the path it works on, which is handed back when it is reported. Jobs are
+    reported once the event loop is reached, even if they finished right away, or by wait in the order they were
+    submitted.
+
+    Signals:
+    finished(Future, object): Emitted with the future and the context of a finished, failed or cancelled job.
+    """
+
+    finished = QtCore.Signal(object, object)
+
+    # Emitted on the worker threads, received on the GUI thread
+    relayed = QtCore.Signal(object)
+
+    def __init__(self, name, workers=1):
+        """
+        Init with the name of the worker threads and their number.
+
+        There is no parent, which would delete the jobs along with it while a worker thread may still relay a future.
+        """
+        super().__init__()
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix=name)
+        # Ordered, so that wait reports the jobs in the order they were submitted
+        self.pending = {}
+        self.relayed.connect(self.report, QtCore.Qt.ConnectionType.QueuedConnection)
+
+    def submit(self, context, function, *args):
+        """Run function with args on a worker thread and return its future."""
+        future = self.executor.submit(function, *args)
+        self.pending[future] = context
+        future.add_done_callback(self.relay)
+        return future
+
+    def submit_after(self, previous, context, function, *args):
+        """Run function with args once the previous job finished and return its future. No worker waits meanwhile."""
+        if previous.done():
+            return self.submit(context, function, *args)
+        future = concurrent.futures.Future()
+        self.pending[future] = context
+        future.add_done_callback(self.relay)
+        previous.add_done_callback(lambda _: self.follow(future, function, args))
+        return future
+
+    def follow(self, future, function, args):
+        """Start a job whose previous job finished. Once stopped, the thread which finished the previous job runs it."""
+        try:
+            self.executor.submit(self.run, future, function, args)
+        except RuntimeError:
+            self.run(future, function, args)
+
+    @staticmethod
+    def run(future, function, args):
+        """Run function and set the result of future, unless it was cancelled."""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = function(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def relay(self, future):
+        """Hand a finished future to the GUI thread. The bound method keeps the jobs alive until this ran."""
+        self.relayed.emit(future)
+
+    @QtCore.Slot(object)
+    def report(self, future):
+        """Report a finished job, unless it was reported already."""
+        if future not in self.pending:
+            return
+        context = self.pending.pop(future)
+        self.finished.emit(future, context)
+
+    def contexts(self):
+        """Return the contexts of the pending jobs."""
+        return list(self.pending.values())
+
+    def busy(self):
+        """Return whether jobs are pending."""
+        return bool(self.pending)
+
+    def wait(self, futures=None):
+        """Block until the given jobs are finished and report them, by default until no jobs are pending anymore."""
+        if futures is not None:
+            concurrent.futures.wait(futures)
+            for future in futures:
+                self.report(future)
+            return
+
+        # Reporting a job may submit further ones
+        while self.pending:
+            futures = list(self.pending)
+            concurrent.futures.wait(futures)
+            for future in futures:
+                self.report(future)
+
+    def stop(self, wait=False, cancel=True):
+        """
+        Release the worker threads, e.g. before quitting.
+
+        If cancel is set, the jobs which did not start yet are cancelled, otherwise they still run. If wait is set, this
+        blocks until the running jobs are finished.
+        """
+        if cancel:
+            for future in list(self.pending):
+                future.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=cancel)
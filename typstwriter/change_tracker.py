@@ -0,0 +1,130 @@
+from qtpy import QtCore
+from qtpy import QtGui
+
+import collections
+import itertools
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Number of deltas kept, consumers which fell further behind have to take a snapshot
+history_length = 1000
+
+
+class Delta:
+    """
+    An edit of a document.
+
+    The edit replaced removed characters at position by text. start and end give the line and column of the replaced
+    range in the text before the edit, columns counting UTF-16 code units like positions in a QTextDocument. Both are
+    None if the whole text was replaced.
+    """
+
+    __slots__ = ("end", "position", "removed", "start", "text", "version")
+
+    def __init__(self, version, position, removed, text, *, start=None, end=None):
+        """Init."""
+        self.version = version
+        self.position = position
+        self.removed = removed
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        """Repr."""
+        return f"Delta(version={self.version}, position={self.position}, removed={self.removed}, text={self.text!r})"
+
+
+class ChangeTracker(QtCore.QObject):
+    """
+    Records the edits of a document as versioned deltas, so that consumers can follow the text without copying it.
+
+    Every edit increments the version. A consumer remembers the version it last saw and pulls the deltas since then
+    with deltas_since, or takes a snapshot of the whole text if the deltas are no longer available. Snapshots are shared
+    between consumers as long as the text does not change.
+
+    The length of every line is tracked alongside the document, which gives the lines and columns of the range an edit
+    replaced without keeping a copy of the text.
+
+    Signals:
+    changed(int): Emitted with the new version after the document was edited.
+    """
+
+    changed = QtCore.Signal(int)
+
+    def __init__(self, document, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.document = document
+        self.version = 0
+        self.deltas = collections.deque(maxlen=history_length)
+        self.line_lengths = self.block_lengths(self.document.firstBlock(), self.document.lastBlock())
+        self.snapshot_cache = None
+
+        self.document.contentsChange.connect(self.record)
+
+    @staticmethod
+    def block_lengths(first, last):
+        """Return the lengths of the blocks from first to last, both included."""
+        lengths = []
+        block = first
+        while block.isValid() and block.blockNumber() <= last.blockNumber():
+            lengths.append(block.length() - 1)
+            block = block.next()
+        return lengths
+
+    def old_end(self, line, column, removed):
+        """Return the line and column removed characters after line and column before the edit, or None if past the end."""
+        while removed > self.line_lengths[line] - column:
+            removed -= self.line_lengths[line] - column + 1
+            line += 1
+            column = 0
+            if line >= len(self.line_lengths):
+                return None
+        return (line, column + removed)
+
+    @QtCore.Slot(int, int, int)
+    def record(self, position, removed, added):
+        """Record an edit of the document."""
+        # Qt sometimes counts the final paragraph separator of the document, which holds no text
+        end = self.document.characterCount() - 1
+        position = min(position, end)
+        first = self.document.findBlock(position)
+        start = (first.blockNumber(), position - first.position())
+
+        old_end = self.old_end(*start, removed)
+        if old_end is not None:
+            last = self.document.findBlock(min(position + added, end))
+            self.line_lengths[start[0] : old_end[0] + 1] = self.block_lengths(first, last)
+
+        if old_end is None or len(self.line_lengths) != self.document.blockCount():
+            # The edit reached past the end of the text, which happens if the whole text is replaced
+            self.line_lengths = self.block_lengths(self.document.firstBlock(), self.document.lastBlock())
+            (position, added, start, old_end) = (0, end, None, None)
+
+        cursor = QtGui.QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + added, end), QtGui.QTextCursor.MoveMode.KeepAnchor)
+        text = cursor.selectedText().replace("\u2029", "\n")
+
+        self.version += 1
+        self.deltas.append(Delta(self.version, position, removed, text, start=start, end=old_end))
+        self.changed.emit(self.version)
+
+    def deltas_since(self, version):
+        """Return the deltas after version, or None if they are no longer available and a snapshot is needed."""
+        if version == self.version:
+            return []
+        if version > self.version or not self.deltas or self.deltas[0].version > version + 1:
+            return None
+        return list(itertools.islice(self.deltas, version + 1 - self.deltas[0].version, None))
+
+    def snapshot(self):
+        """Return the current version and the whole text."""
+        if self.snapshot_cache is None or self.snapshot_cache[0] != self.version:
+            self.snapshot_cache = (self.version, self.document.toPlainText())
+        return self.snapshot_cache
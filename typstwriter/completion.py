@@ -0,0 +1,336 @@
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+import bisect
+import difflib
+import functools
+import json
+import os
+import re
+import time
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+catalog_path = os.path.join(os.path.dirname(__file__), "data", "typst_catalog.json")
+
+# Maximum number of completions shown
+limit = 50
+
+# Time in seconds fuzzy matching may take per keystroke, prefix matches are always found
+budget = 0.005
+
+# Time in seconds directory listings for path completions are reused
+directory_cache_time = 2
+
+path_functions = ("image", "read", "json", "csv", "yaml", "toml", "xml", "cbor", "bibliography", "plugin")
+label_context = re.compile(r"(?<![\w@])@([\w\-:.]*)$")
+path_context = re.compile(r"(?:#?include\s+|\b(?:" + "|".join(path_functions) + r")\(\s*)\"([^\"]*)$")
+symbol_context = re.compile(r"\bsym\.([\w.\-]*)$")
+code_context = re.compile(r"#([\w\-.]*)$")
+identifier = re.compile(r"[\w\-.]*$")
+
+kind_icons = {
+    "function": "code-function",
+    "keyword": "format-text-code",
+    "constant": "code-variable",
+    "symbol": "character-set",
+    "label": "tag",
+    "file": "text-x-generic",
+    "directory": "folder",
+}
+
+
+@functools.cache
+def catalog():
+    """Return the bundled names of the Typst standard library as a dict of lists by kind."""
+    try:
+        with open(catalog_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read the completion catalog {!r}: {}", catalog_path, e)
+        return {}
+
+
+@functools.cache
+def builtins():
+    """Return a SortedIndex of the functions, keywords and constants of the Typst standard library."""
+    entries = catalog()
+    candidates = [(name, kind) for kind in ("function", "keyword", "constant") for name in entries.get(kind + "s", [])]
+    return SortedIndex(candidates)
+
+
+@functools.cache
+def symbols():
+    """Return a SortedIndex of the names in the sym module."""
+    return SortedIndex((name, "symbol") for name in catalog().get("symbols", []))
+
+
+class SortedIndex:
+    """Completion candidates sorted by their lower case text, so that prefix matches are found by bisection."""
+
+    def __init__(self, candidates=()):
+        """Init with an iterable of tuples of text and kind."""
+        entries = sorted({(text.lower(), text, kind) for (text, kind) in candidates})
+        self.keys = [key for (key, _, _) in entries]
+        self.candidates = [(text, kind) for (_, text, kind) in entries]
+
+    def __len__(self):
+        """Return the number of candidates."""
+        return len(self.candidates)
+
+    def prefixed(self, prefix):
+        """Return the candidates starting with prefix, ignoring case."""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        stop = bisect.bisect_left(self.keys, prefix + "\U0010ffff", start)
+        return self.candidates[start:stop]
+
+
+def fuzzy_score(query, text):
+    """
+    Return how well text matches query, or None if the characters of query do not appear in text in order.
+
+    Consecutive matches and matches at the start of words score higher, so that e.g. "arl" ranks "arrow.l" first.
+    """
+    query = query.lower()
+    lowered = text.lower()
+    score = 0
+    position = -1
+    for c in query:
+        found = lowered.find(c, position + 1)
+        if found == -1:
+            return None
+        if found == position + 1:
+            score += 3
+        elif found == 0 or not lowered[found - 1].isalnum():
+            score += 2
+        else:
+            score -= 1
+        position = found
+    return score - len(text) / 100
+
+
+def complete(query, indexes, extra=()):
+    """
+    Return up to limit candidates for query from the sorted indexes and the unsorted extra candidates.
+
+    Prefix matches come first and are found by bisection. The remaining slots are filled with fuzzy matches, which are
+    searched for no longer than the time budget allows.
+    """
+    deadline = time.perf_counter() + budget
+
+    results = []
+    seen = set()
+    for index in indexes:
+        for candidate in index.prefixed(query):
+            if candidate not in seen:
+                seen.add(candidate)
+                results.append(candidate)
+    results.extend(c for c in extra if c[0].lower().startswith(query.lower()) and c not in seen)
+    seen.update(results)
+    results.sort(key=lambda c: (len(c[0]), c[0].lower()))
+    if len(results) >= limit or not query:
+        return results[:limit]
+
+    fuzzy = []
+    for candidates in [*(index.candidates for index in indexes), extra]:
+        for i, candidate in enumerate(candidates):
+            if i % 64 == 0 and time.perf_counter() > deadline:
+                break
+            if candidate in seen:
+                continue
+            score = fuzzy_score(query, candidate[0])
+            if score is not None:
+                seen.add(candidate)
+                fuzzy.append((-score, candidate))
+    fuzzy.sort()
+    results.extend(candidate for (_, candidate) in fuzzy)
+    return results[:limit]
+
+
+class CompletionModel(QtCore.QAbstractListModel):
+    """A list of completions which is updated row by row instead of being reset."""
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+        self.items = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return the number of completions."""
+        if parent.isValid():
+            return 0
+        return len(self.items)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Return the data of a completion."""
+        if not index.isValid() or index.row() >= len(self.items):
+            return None
+
+        (text, kind) = self.items[index.row()]
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return text
+        if role == QtCore.Qt.DecorationRole:
+            return QtGui.QIcon.fromTheme(kind_icons.get(kind, ""))
+        if role == QtCore.Qt.ToolTipRole:
+            return kind
+        return None
+
+    def set_items(self, items):
+        """Change the completions, only inserting and removing the rows which differ."""
+        items = list(items)
+        matcher = difflib.SequenceMatcher(None, self.items, items, autojunk=False)
+        # Apply the changes from the end, so that the row numbers of earlier changes stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag in ("replace", "delete"):
+                self.beginRemoveRows(QtCore.QModelIndex(), i1, i2 - 1)
+                del self.items[i1:i2]
+                self.endRemoveRows()
+            if tag in ("replace", "insert"):
+                self.beginInsertRows(QtCore.QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self.items[i1:i1] = items[j1:j2]
+                self.endInsertRows()
+
+
+class Completion(QtCore.QObject):
+    """
+    Completion for a CodeEdit.
+
+    Depending on the text left of the cursor it completes references with the labels of the document and the workspace
+    index, file paths in include statements and data loading functions, names of the sym module and otherwise the
+    functions of the standard library and the document.
+    """
+
+    def __init__(self, edit):
+        """Init."""
+        super().__init__(edit)
+
+        self.edit = edit
+        self.directory = None
+        self.workspace_index = None
+        self.prefix = ""
+        self.directories = {}
+        # The names of the document by kind, as revision of the symbol index and SortedIndex
+        self.document_names = {}
+
+        self.model = CompletionModel(self)
+        self.completer = QtWidgets.QCompleter(self.model, self)
+        self.completer.setWidget(edit)
+        self.completer.setCompletionMode(QtWidgets.QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(QtCore.Qt.CaseSensitivity.CaseInsensitive)
+        self.completer.activated[str].connect(self.insert)
+
+    @QtCore.Slot(str)
+    def set_path(self, path):
+        """Complete paths relative to the directory of the file at path."""
+        self.directory = os.path.dirname(path) if path else None
+
+    def popup_visible(self):
+        """Return whether completions are shown."""
+        return self.completer.popup().isVisible()
+
+    def candidates(self, forced=False):
+        """Return the prefix to replace and the completions for the text left of the cursor."""
+        cursor = self.edit.textCursor()
+        text = cursor.block().text()[: cursor.positionInBlock()]
+
+        if match := label_context.search(text):
+            labels = self.names("label")
+            extra = [(name, "label") for name in self.workspace_labels(match.group(1))]
+            return (match.group(1), complete(match.group(1), [labels], extra))
+        if match := path_context.search(text):
+            return (os.path.basename(match.group(1)), self.paths(match.group(1)))
+        if match := symbol_context.search(text):
+            return (match.group(1), complete(match.group(1), [symbols()]))
+        if (match := code_context.search(text)) or (forced and (match := identifier.search(text))):
+            prefix = match.group(1) if match.re is code_context else match.group(0)
+            functions = self.names("function")
+            return (prefix, complete(prefix, [functions, builtins()]))
+        return ("", [])
+
+    def names(self, kind):
+        """Return the names of a kind of symbols defined in the document, sorted again only once they changed."""
+        revision = self.edit.symbols.revisions[kind]
+        (cached_revision, names) = self.document_names.get(kind, (None, None))
+        if cached_revision != revision:
+            names = SortedIndex((name, kind) for name in self.edit.symbols.names[kind])
+            self.document_names[kind] = (revision, names)
+        return names
+
+    def workspace_labels(self, prefix):
+        """Return the labels and bibliography keys of the workspace index starting with prefix."""
+        if self.workspace_index is None:
+            return []
+        return self.workspace_index.names(prefix, limit)
+
+    def paths(self, partial):
+        """Return the entries of the directory of a partial path, relative to the directory of the file."""
+        (head, tail) = os.path.split(partial)
+        base = self.directory if self.directory is not None else os.getcwd()
+        directory = os.path.normpath(os.path.join(base, head))
+
+        (timestamp, entries) = self.directories.get(directory, (0, None))
+        if entries is None or time.monotonic() - timestamp > directory_cache_time:
+            try:
+                with os.scandir(directory) as it:
+                    entries = SortedIndex(
+                        (e.name + "/", "directory") if e.is_dir() else (e.name, "file")
+                        for e in it
+                        if not e.name.startswith(".")
+                    )
+            except OSError:
+                entries = SortedIndex()
+            self.directories[directory] = (time.monotonic(), entries)
+
+        return complete(tail, [entries])
+
+    def update(self, forced=False):
+        """Show, update or hide the completions for the text left of the cursor."""
+        (self.prefix, items) = self.candidates(forced)
+        if not items or (len(items) == 1 and items[0][0] == self.prefix and not forced):
+            self.completer.popup().hide()
+            return
+
+        self.model.set_items(items)
+        popup = self.completer.popup()
+        if not popup.isVisible() or forced:
+            popup.setCurrentIndex(self.model.index(0, 0))
+        rect = self.edit.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+
+    @QtCore.Slot(str)
+    def insert(self, text):
+        """Replace the prefix left of the cursor by a completion."""
+        cursor = self.edit.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.Left, QtGui.QTextCursor.MoveMode.KeepAnchor, len(self.prefix))
+        cursor.insertText(text)
+        self.edit.setTextCursor(cursor)
+
+        # Continue with the entries of a completed directory
+        if text.endswith("/"):
+            QtCore.QTimer.singleShot(0, self.update)
+
+    def intercept(self, event):
+        """Return whether a key event is handled by the completion popup instead of the edit."""
+        if event.key() == QtCore.Qt.Key_Space and event.modifiers() == QtCore.Qt.ControlModifier:
+            self.update(forced=True)
+            return True
+
+        keys = (QtCore.Qt.Key_Enter, QtCore.Qt.Key_Return, QtCore.Qt.Key_Escape, QtCore.Qt.Key_Tab, QtCore.Qt.Key_Backtab)
+        if self.popup_visible() and event.key() in keys:
+            # Let the completer handle these keys
+            event.ignore()
+            return True
+        return False
+
+    def key_pressed(self, event):
+        """Update the completions after a key press changed the text left of the cursor."""
+        if (event.text() and event.text().isprintable()) or event.key() == QtCore.Qt.Key_Backspace:
+            self.update()
+        elif event.key() in (QtCore.Qt.Key_Left, QtCore.Qt.Key_Right, QtCore.Qt.Key_Home, QtCore.Qt.Key_End):
+            self.completer.popup().hide()
@@ -11,6 +11,10 @@ logger = logging.getLogger(__name__)
 default_config_path = os.path.join(platformdirs.user_config_dir("typstwriter", "typstwriter"), "typstwriter.ini")
 default_recent_files_path = os.path.join(platformdirs.user_data_dir("typstwriter", "typstwriter"), "recentFiles.txt")
 default_session_path = os.path.join(platformdirs.user_data_dir("typstwriter", "typstwriter"), "Session.txt")
+default_journal_path = os.path.join(platformdirs.user_data_dir("typstwriter", "typstwriter"), "journal")
+default_workspace_index_path = os.path.join(platformdirs.user_data_dir("typstwriter", "typstwriter"), "workspace_index.sqlite")
+default_typst_probe_path = os.path.join(platformdirs.user_cache_dir("typstwriter", "typstwriter"), "typst_probe.json")
+default_file_index_path = os.path.join(platformdirs.user_cache_dir("typstwriter", "typstwriter"), "file_index")
 
 config_paths = ["/etc/typstwriter/typstwriter.ini",
                 "/usr/local/etc/typstwriter/typstwriter.ini",
@@ -20,7 +24,8 @@ config_paths = ["/etc/typstwriter/typstwriter.ini",
 
 default_config = {"General": {"working_directory": "~/",
                               "resume_last_session": False,
-                              "theme": "default"},
+                              "theme": "default",
+                              "startup_mode": "eager"},
                   "Compiler": {"name": "typst",
                                "mode": "on_demand"},
                   "Editor": {"font_size": 10,
@@ -29,14 +34,27 @@ default_config = {"General": {"working_directory": "~/",
                              "highlight_syntax": True,
                              "show_line_numbers": True,
                              "highlight_line": True,
-                             "use_spaces": True},
+                             "use_spaces": True,
+                             "fsync_at_save": True},
                   "Layout": {"default_layout": "typewriter",
                              "show_fs_explorer": True,
                              "show_compiler_options": True,
-                             "show_compiler_output": True},
+                             "show_compiler_output": True,
+                             "show_outline": True,
+                             "show_problems": True},
+                  "FS Explorer": {"ignore_patterns": ".*, node_modules, __pycache__, build, target",
+                                  "listing_ttl": 30},
+                  "Watchdog": {"enabled": True,
+                               "threshold": 200},
+                  "LSP": {"enabled": False,
+                          "command": "tinymist lsp"},
                   "Internals": {"recent_files_path": default_recent_files_path,
                                 "recent_files_length": 16,
-                                "session_path": default_session_path}}  # fmt: skip
+                                "session_path": default_session_path,
+                                "journal_path": default_journal_path,
+                                "workspace_index_path": default_workspace_index_path,
+                                "typst_probe_path": default_typst_probe_path,
+                                "file_index_path": default_file_index_path}}  # fmt: skip
 
 
 class ConfigManager:
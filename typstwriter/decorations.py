@@ -0,0 +1,228 @@
+from qtpy import QtCore
+
+import collections
+import os
+import re
+
+from typstwriter import background
+from typstwriter import completion
+from typstwriter import enums
+from typstwriter import fs_model
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Maximum number of Typst files followed when collecting the files the main file depends on
+max_dependencies = 1000
+
+# The string arguments of include and import statements and of the functions loading files
+dependency_pattern = re.compile(
+    r"#?(?:include|import)\s+\"([^\"@][^\"]*)\"|\b(?:" + "|".join(completion.path_functions) + r")\(\s*\"([^\"]+)\""
+)
+
+
+def dependency_paths(path, text, root):
+    """Return the existing files a Typst file refers to, paths starting with a slash are relative to root."""
+    paths = []
+    for match in dependency_pattern.finditer(text):
+        reference = match.group(1) or match.group(2)
+        if reference.startswith("/"):
+            candidate = os.path.join(root, reference.lstrip("/"))
+        else:
+            candidate = os.path.join(os.path.dirname(path), reference)
+        candidate = fs_model.normalize(candidate)
+        if os.path.isfile(candidate):
+            paths.append(candidate)
+    return paths
+
+
+def dependency_closure(main):
+    """Return the files the main file includes, imports or loads, directly or through other files. Runs on a worker thread."""
+    root = os.path.dirname(main)
+    closure = set()
+    queue = collections.deque([main])
+    followed = 0
+    while queue and followed < max_dependencies:
+        path = queue.popleft()
+        followed += 1
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            continue
+        for dependency in dependency_paths(path, text, root):
+            if dependency not in closure and dependency != main:
+                closure.add(dependency)
+                if dependency.endswith(".typ"):
+                    queue.append(dependency)
+    return closure
+
+
+class Decorations(QtCore.QObject):
+    """
+    The states files are decorated with in the file system explorer, kept in a dict keyed by path.
+
+    The main file, the files it depends on, files with unsaved changes and files with problems are fed in by signals.
+    Changes are collected and reported once the event loop is reached, only for the paths whose decoration differs.
+
+    Signals:
+    changed(list): Emitted with the paths whose decoration changed.
+    """
+
+    changed = QtCore.Signal(list)
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.decorations = {}
+        self.main_file = None
+        self.dependencies = set()
+        self.unsaved = set()
+        self.compiler_problems = {}
+        self.language_server_problems = {}
+
+        self.dirty = set()
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+
+        self.jobs = background.BackgroundJobs("Decorations")
+        self.jobs.finished.connect(self.finish_job)
+
+    def decoration(self, path):
+        """Return the decoration of path."""
+        return self.decorations.get(path, enums.file_decoration(0))
+
+    def problems(self, path):
+        """Return the number of problems of path."""
+        return len(self.compiler_problems.get(path, ())) + len(self.language_server_problems.get(path, ()))
+
+    def describe(self, path):
+        """Return a line describing each decoration of path."""
+        decoration = self.decoration(path)
+        lines = []
+        if enums.file_decoration.main_file in decoration:
+            lines.append("Main file")
+        if enums.file_decoration.dependency in decoration:
+            lines.append("Used by the main file")
+        if enums.file_decoration.unsaved in decoration:
+            lines.append("Unsaved changes")
+        if enums.file_decoration.problems in decoration:
+            count = self.problems(path)
+            lines.append(f"{count} problem{'s' if count != 1 else ''}")
+        return lines
+
+    def mark(self, paths):
+        """Report the decorations of paths once the event loop is reached, if they changed."""
+        self.dirty.update(paths)
+        self.timer.start()
+
+    @QtCore.Slot()
+    def flush(self):
+        """Update the decorations of the marked paths and report the ones which changed."""
+        changed = []
+        for path in self.dirty:
+            decoration = self.compute(path)
+            if decoration != self.decoration(path):
+                changed.append(path)
+                if decoration:
+                    self.decorations[path] = decoration
+                else:
+                    del self.decorations[path]
+        self.dirty.clear()
+        if changed:
+            self.changed.emit(changed)
+
+    def compute(self, path):
+        """Return the decoration of path according to the current states."""
+        decoration = enums.file_decoration(0)
+        if path == self.main_file:
+            decoration |= enums.file_decoration.main_file
+        if path in self.dependencies:
+            decoration |= enums.file_decoration.dependency
+        if path in self.unsaved:
+            decoration |= enums.file_decoration.unsaved
+        if path in self.compiler_problems or path in self.language_server_problems:
+            decoration |= enums.file_decoration.problems
+        return decoration
+
+    @QtCore.Slot(object)
+    def set_main_file(self, path):
+        """Mark the main file and the files it depends on."""
+        path = fs_model.normalize(path) if path else None
+        self.mark(p for p in (self.main_file, path) if p is not None)
+        self.main_file = path
+        # The previous dependencies are kept until the new ones are collected, so that files in both are not repainted
+        if path is None:
+            self.mark(self.dependencies)
+            self.dependencies = set()
+        else:
+            self.update_dependencies()
+
+    @QtCore.Slot(str)
+    def file_changed(self, path):
+        """Collect the dependencies again if the main file or one of its dependencies changed."""
+        path = fs_model.normalize(path)
+        if path == self.main_file or (path in self.dependencies and path.endswith(".typ")):
+            self.update_dependencies()
+
+    def update_dependencies(self):
+        """Collect the dependencies of the main file on the worker thread."""
+        if self.main_file is None:
+            return
+        self.jobs.submit(self.main_file, dependency_closure, self.main_file)
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, main_file):
+        """Mark the collected dependencies, if no newer collection was started since."""
+        if future.cancelled() or self.jobs.busy():
+            return
+
+        if future.exception() is not None:
+            logger.warning("Could not collect the dependencies of {!r}: {}", main_file, future.exception())
+            return
+        dependencies = future.result()
+        self.mark(self.dependencies ^ dependencies)
+        self.dependencies = dependencies
+
+    def wait(self):
+        """Block until the dependencies are collected."""
+        self.jobs.wait()
+
+    def stop(self):
+        """Abort pending jobs, e.g. before quitting."""
+        self.jobs.stop()
+
+    @QtCore.Slot(list)
+    def set_unsaved(self, paths):
+        """Mark the files with unsaved changes."""
+        unsaved = {fs_model.normalize(path) for path in paths}
+        self.mark(self.unsaved ^ unsaved)
+        self.unsaved = unsaved
+
+    @QtCore.Slot()
+    def clear_compiler_problems(self):
+        """Remove the problems of the previous compilation."""
+        self.mark(self.compiler_problems)
+        self.compiler_problems = {}
+
+    @QtCore.Slot(collections.defaultdict)
+    def set_compiler_problems(self, report):
+        """Mark the files with errors of a compilation, given as dict of path and errors."""
+        problems = {fs_model.normalize(path): errors for (path, errors) in report.items() if errors}
+        self.mark(self.compiler_problems.keys() ^ problems.keys())
+        self.compiler_problems = problems
+
+    @QtCore.Slot(str, list)
+    def set_language_server_problems(self, path, diagnostics):
+        """Mark a file with the diagnostics published by the language server."""
+        path = fs_model.normalize(path)
+        if diagnostics:
+            self.language_server_problems[path] = diagnostics
+        else:
+            self.language_server_problems.pop(path, None)
+        self.mark([path])
@@ -0,0 +1,168 @@
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+import bisect
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticStore:
+    """
+    Diagnostics of a document sorted by line, so that the diagnostics of a range of lines are found by bisection.
+
+    Every diagnostic is a tuple of line (0-based), column, length and message.
+    """
+
+    def __init__(self):
+        """Init."""
+        self.lines = []
+        self.entries = []
+
+    def __len__(self):
+        """Return the number of diagnostics."""
+        return len(self.entries)
+
+    def set(self, entries):
+        """Replace all diagnostics."""
+        self.entries = sorted(entries, key=lambda e: e[0])
+        self.lines = [e[0] for e in self.entries]
+
+    def clear(self):
+        """Remove all diagnostics."""
+        self.set([])
+
+    def between(self, first, last):
+        """Return the diagnostics in the lines from first to last, both included."""
+        return self.entries[bisect.bisect_left(self.lines, first) : bisect.bisect_right(self.lines, last)]
+
+    def shift(self, line, delta):
+        """Move the diagnostics after line by delta lines, e.g. after lines were inserted or removed below line."""
+        start = bisect.bisect_right(self.lines, line)
+        # Diagnostics in removed lines end up in line, which keeps the lines sorted
+        shifted = [(max(e[0] + delta, line), *e[1:]) for e in self.entries[start:]]
+        self.entries[start:] = shifted
+        self.lines[start:] = [e[0] for e in shifted]
+
+
+class DiagnosticsOverlay(QtCore.QObject):
+    """
+    Shows the diagnostics of a CodeEdit.
+
+    Only the diagnostics of the lines in the viewport are turned into extra selections, which are rebuilt when the view
+    scrolls or resizes. This keeps documents with thousands of diagnostics responsive. Diagnostics move along when
+    lines are inserted or removed above them.
+    """
+
+    def __init__(self, edit):
+        """Init."""
+        super().__init__(edit)
+
+        self.edit = edit
+        self.store = DiagnosticStore()
+        self.rendered_range = None
+        self.block_count = edit.document().blockCount()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.render)
+
+        edit.verticalScrollBar().valueChanged.connect(self.schedule)
+        edit.document().contentsChange.connect(self.contents_changed)
+
+    def set(self, errors):
+        """Show diagnostics given as tuples of message, line (1-based), column and length."""
+        self.store.set((line - 1, column, length, message) for (message, line, column, length) in errors)
+        self.render(force=True)
+        self.update_markers()
+
+    def clear(self):
+        """Remove all diagnostics."""
+        if len(self.store) == 0:
+            return
+        self.store.clear()
+        self.render(force=True)
+        self.update_markers()
+
+    @QtCore.Slot()
+    def schedule(self):
+        """Render once control returns to the event loop, e.g. after scrolling or resizing."""
+        self.timer.start()
+
+    def visible_lines(self):
+        """Return the numbers of the first and the last line in the viewport."""
+        block = self.edit.firstVisibleBlock()
+        first = block.blockNumber()
+        last = first
+        offset = self.edit.contentOffset()
+        height = self.edit.viewport().height()
+        while block.isValid() and self.edit.blockBoundingGeometry(block).translated(offset).top() <= height:
+            last = block.blockNumber()
+            block = block.next()
+        return (first, last)
+
+    @QtCore.Slot()
+    def render(self, force=False):
+        """Turn the diagnostics in the viewport into extra selections of the edit."""
+        visible = self.visible_lines()
+        if visible == self.rendered_range and not force:
+            return
+        self.rendered_range = visible
+
+        document = self.edit.document()
+        end = document.characterCount() - 1
+        line_color = QtGui.QColor(self.edit.highlighter.error_highlight_color)
+        underline_color = QtGui.QColor(self.edit.highlighter.error_font_color)
+
+        highlights = []
+        for line, column, length, _ in self.store.between(*visible):
+            block = document.findBlockByNumber(line)
+            if not block.isValid():
+                continue
+            cursor = QtGui.QTextCursor(document)
+            position = block.position() + min(column, block.length() - 1)
+            cursor.setPosition(position)
+
+            mark_line = QtWidgets.QTextEdit.ExtraSelection()
+            mark_line.format.setBackground(line_color)
+            mark_line.format.setProperty(QtGui.QTextFormat.FullWidthSelection, True)
+            mark_line.cursor = QtGui.QTextCursor(cursor)
+            highlights.append(mark_line)
+
+            cursor.setPosition(min(position + length, end), QtGui.QTextCursor.MoveMode.KeepAnchor)
+            mark_span = QtWidgets.QTextEdit.ExtraSelection()
+            mark_span.format.setUnderlineStyle(QtGui.QTextCharFormat.DashUnderline)
+            mark_span.format.setUnderlineColor(underline_color)
+            mark_span.cursor = cursor
+            highlights.append(mark_span)
+
+        self.edit.selections.set("errors", highlights)
+
+    def update_markers(self):
+        """Mark the lines with diagnostics next to the line numbers."""
+        if not self.edit.line_numbers:
+            return
+        if len(self.store) == 0:
+            self.edit.line_numbers.clear_markers("errors")
+        else:
+            color = QtGui.QColor(self.edit.highlighter.error_font_color)
+            self.edit.line_numbers.set_markers("errors", dict.fromkeys(self.store.lines, color))
+
+    @QtCore.Slot(int, int, int)
+    def contents_changed(self, position, _removed, _added):
+        """Move the diagnostics below an edit which inserted or removed lines."""
+        block_count = self.edit.document().blockCount()
+        delta = block_count - self.block_count
+        self.block_count = block_count
+        if delta == 0 or len(self.store) == 0:
+            return
+
+        line = self.edit.document().findBlock(position).blockNumber()
+        self.store.shift(line, delta)
+        self.update_markers()
+        # Render once the layout of the edit caught up with the change
+        self.rendered_range = None
+        self.schedule()
@@ -7,7 +7,16 @@ import collections
 
 from typstwriter import util
 from typstwriter import enums
-from typstwriter import syntax_highlighting
+from typstwriter import change_tracker
+from typstwriter import completion
+from typstwriter import diagnostics
+from typstwriter import file_io
+from typstwriter import file_watcher
+from typstwriter import folding
+from typstwriter import journal
+from typstwriter import lazy
+from typstwriter import outline
+from typstwriter import selections
 
 from typstwriter import logging
 from typstwriter import configuration
@@ -17,6 +26,9 @@ logger = logging.getLogger(__name__)
 config = configuration.Config
 state = globalstate.State
 
+# Imports pygments, which takes a while
+syntax_highlighting = lazy.module("typstwriter.syntax_highlighting")
+
 
 class Editor(QtWidgets.QFrame):
     """A tabbed text editor."""
@@ -24,8 +36,9 @@ class Editor(QtWidgets.QFrame):
     text_changed = QtCore.Signal()
     recent_files_changed = QtCore.Signal(list)
     active_file_changed = QtCore.Signal(str)
+    unsaved_files_changed = QtCore.Signal(list)
 
-    def __init__(self):
+    def __init__(self, watcher=None, index=None, language_server=None):
         """Initialize and display welcome page."""
         QtWidgets.QFrame.__init__(self)
         self.setFrameStyle(QtWidgets.QFrame.Shape.StyledPanel)
@@ -50,6 +63,23 @@ class Editor(QtWidgets.QFrame):
         self.TabWidget.tabBar().customContextMenuRequested.connect(self.tab_bar_rightclicked)
 
         self.recentFiles = util.RecentFiles()
+        self.save_service = file_io.SaveService(self)
+        self.file_watcher = watcher if watcher is not None else file_watcher.FileWatcher(self)
+
+        # Resolves labels and bibliography keys defined in other files, if available
+        self.workspace_index = index
+        self.reference_timer = QtCore.QTimer(self)
+        self.reference_timer.setSingleShot(True)
+        self.reference_timer.setInterval(500)
+        self.reference_timer.timeout.connect(self.check_references)
+        if index is not None:
+            index.updated.connect(self.reference_timer.start)
+
+        # Receives the text of opened Typst files and reports diagnostics while typing, if available
+        self.language_server = language_server
+        if language_server is not None:
+            language_server.diagnostics_published.connect(self.apply_diagnostics)
+            self.save_service.saved.connect(language_server.document_saved)
 
         self.font_size = config.get("Editor", "font_size", typ="int")
 
@@ -57,7 +87,7 @@ class Editor(QtWidgets.QFrame):
         """Handle right click on the tab bar."""
         tab_index = self.TabWidget.tabBar().tabAt(event)
         tab = self.TabWidget.widget(tab_index)
-        if isinstance(tab, EditorPage):
+        if isinstance(tab, (EditorPage, EditorPagePlaceholder)):
             cm = EditorPageBarContextMenu(self, tab_index)
             cm.popup(QtGui.QCursor.pos())
         elif isinstance(tab, WelcomePage):
@@ -66,7 +96,7 @@ class Editor(QtWidgets.QFrame):
 
     def new_file(self):
         """Open a new, empty file."""
-        editorpage = EditorPage(font_size=self.font_size)
+        editorpage = EditorPage(font_size=self.font_size, save_service=self.save_service, watcher=self.file_watcher)
         name = "*new*"
         icon = QtGui.QIcon.fromTheme(QtGui.QIcon.DocumentNew, QtGui.QIcon(util.icon_path("newFile.svg")))
         self.TabWidget.addTab(editorpage, icon, name)
@@ -74,29 +104,115 @@ class Editor(QtWidgets.QFrame):
         self.TabWidget.tabBar().setTabTextColor(self.TabWidget.count() - 1, QtGui.QColor("green"))
 
         editorpage.edit.textChanged.connect(self.childtext_changed)
+        editorpage.edit.symbols.changed.connect(self.reference_timer.start)
+        editorpage.edit.completion.workspace_index = self.workspace_index
         editorpage.savestatechanged.connect(self.childsavedstate_changed)
         editorpage.pathchanged.connect(self.childpath_changed)
 
     def open_file(self, path):
         """Open an existing file or switch to it if it is already open."""
         if path not in self.openfiles_list():
-            editorpage = EditorPage(path, self.font_size)
+            editorpage = self.create_page(path)
             name = os.path.relpath(path, start=state.working_directory.Value)
             icon = util.FileIconProvider().icon(QtCore.QFileInfo(path))
             self.TabWidget.addTab(editorpage, icon, name)
             self.TabWidget.setCurrentIndex(self.TabWidget.count() - 1)
             self.TabWidget.tabBar().setTabTextColor(self.TabWidget.count() - 1, QtGui.QColor("black"))
+        else:
+            self.TabWidget.setCurrentIndex(self.tab_index(path))
+
+    def open_location(self, path, line, column=0, errors=None):
+        """Open a file at a line (1-based) and column and show errors given in the format of CodeEdit.highlight_errors."""
+        self.open_file(path)
+        if errors:
+            self.apply_errors({path: errors})
+
+        page = self.TabWidget.widget(self.tab_index(path))
+        if isinstance(page, EditorPage):
+            page.go_to(line - 1, column)
+
+    def open_files_lazily(self, files):
+        """
+        Open files as placeholders which are only loaded once their tab is activated.
+
+        files is a list of dicts holding the path, the scroll position and the folded lines of each file. The last file
+        is activated.
+        """
+        with QtCore.QSignalBlocker(self.TabWidget):
+            for f in files:
+                if f["path"] in self.openfiles_list():
+                    continue
+                placeholder = EditorPagePlaceholder(f["path"], f["scroll"], f["folds"])
+                name = os.path.relpath(f["path"], start=state.working_directory.Value)
+                icon = util.FileIconProvider().icon(QtCore.QFileInfo(f["path"]))
+                self.TabWidget.addTab(placeholder, icon, name)
+                self.TabWidget.tabBar().setTabTextColor(self.TabWidget.count() - 1, QtGui.QColor("black"))
+            self.TabWidget.setCurrentIndex(self.TabWidget.count() - 1)
+        self.tab_changed(self.TabWidget.currentIndex())
 
-            editorpage.edit.textChanged.connect(self.childtext_changed)
-            editorpage.savestatechanged.connect(self.childsavedstate_changed)
-            editorpage.pathchanged.connect(self.childpath_changed)
+    def create_page(self, path):
+        """Create an editor page for an existing file."""
+        editorpage = EditorPage(path, self.font_size, self.save_service, self.file_watcher)
 
-            if editorpage.isloaded is True:
-                self.recentFiles.append(path)
-                self.recent_files_changed.emit(self.recentFiles.list())
+        editorpage.edit.textChanged.connect(self.childtext_changed)
+        editorpage.edit.symbols.changed.connect(self.reference_timer.start)
+        editorpage.edit.completion.workspace_index = self.workspace_index
+        editorpage.savestatechanged.connect(self.childsavedstate_changed)
+        editorpage.pathchanged.connect(self.childpath_changed)
+
+        # Large files are still loading at this point and will announce when they are done
+        if editorpage.isloaded is True:
+            self.add_recent_file(path)
+            self.sync_document(editorpage)
+        elif editorpage.isloading is True:
+            editorpage.loaded.connect(self.add_recent_file)
+
+        return editorpage
+
+    def materialize(self, index):
+        """Replace the placeholder at index by an editor page and return the page."""
+        placeholder = self.TabWidget.widget(index)
+        editorpage = self.create_page(placeholder.path)
+        editorpage.fold_lines(placeholder.folds)
+        editorpage.scroll_to(placeholder.scroll)
+        if placeholder.errors:
+            editorpage.edit.highlight_errors(placeholder.errors)
+
+        name = self.TabWidget.tabText(index)
+        icon = self.TabWidget.tabIcon(index)
+        with QtCore.QSignalBlocker(self.TabWidget):
+            current = self.TabWidget.currentIndex()
+            self.TabWidget.removeTab(index)
+            self.TabWidget.insertTab(index, editorpage, icon, name)
+            self.TabWidget.tabBar().setTabTextColor(index, QtGui.QColor("black"))
+            self.TabWidget.setCurrentIndex(current)
+        placeholder.deleteLater()
+
+        return editorpage
+
+    def tab_index(self, path):
+        """Return the index of the tab showing path."""
+        for i, t in enumerate(self.tabs_list()):
+            if t.path == path:
+                return i
+        return -1
+
+    def restore(self, path, text):
+        """Open path, or a new file if path is None, and replace its text by text recovered from a journal."""
+        if path is not None and os.path.exists(path):
+            self.open_file(path)
         else:
-            index = self.openfiles_list().index(path)
-            self.TabWidget.setCurrentIndex(index)
+            if path is not None:
+                logger.warning("Could not find {!r}, recovering its changes into a new file.", path)
+            self.new_file()
+
+        self.TabWidget.currentWidget().restore(text)
+
+    @QtCore.Slot(str)
+    def add_recent_file(self, path):
+        """Add a file to the recent files list."""
+        self.recentFiles.append(path)
+        self.recent_files_changed.emit(self.recentFiles.list())
 
     def open_file_dialog(self):
         """Open a dialog to open an existing file."""
@@ -110,8 +226,12 @@ class Editor(QtWidgets.QFrame):
         editorpage = self.TabWidget.widget(index)
         e = editorpage.tryclose()
         if e:
+            if self.language_server is not None and isinstance(editorpage, EditorPage) and editorpage.path:
+                self.language_server.close_document(editorpage.path)
             editorpage.deleteLater()
             self.TabWidget.removeTab(index)
+            if isinstance(editorpage, EditorPage) and not editorpage.issaved:
+                self.unsaved_files_changed.emit(self.unsaved_files())
 
         if len(self.tabs_list()) == 0:
             self.welcome()
@@ -152,20 +272,30 @@ class Editor(QtWidgets.QFrame):
         """Return (ordered) list of opened files."""
         return [t.path for t in self.tabs_list() if t.path]
 
+    def unsaved_files(self):
+        """Return the paths of the opened files with unsaved changes."""
+        return [t.path for t in self.tabs_list() if isinstance(t, EditorPage) and t.path and not t.issaved]
+
+    def session(self):
+        """Return the path, scroll position and folded lines of all opened files, see open_files_lazily."""
+        return [{"path": t.path, "scroll": t.scroll_position(), "folds": t.folded_lines()} for t in self.tabs_list() if t.path]
+
     def tryclose(self):
         """Try closing the editor, i.e. close all tabs and save the recent files."""
         for t in self.tabs_list():
             s = t.tryclose()
             if not s:
                 return False
+        if not self.save_service.wait():
+            return False
         self.recentFiles.write()
         return True
 
     @QtCore.Slot()
     def save_all(self):
-        """Save all tabs."""
+        """Save all modified tabs. The files are written in parallel in the background."""
         for t in self.tabs_list():
-            if isinstance(t, EditorPage):
+            if isinstance(t, EditorPage) and not t.issaved:
                 t.save()
 
     @QtCore.Slot()
@@ -198,6 +328,44 @@ class Editor(QtWidgets.QFrame):
             page.search_bar.edit_search.setSelection(0, len(page.search_bar.edit_search.text()))
             # page.search_bar.edit_search.setFocus()
 
+    @QtCore.Slot()
+    def go_to_definition(self):
+        """Jump to the definition of the label or bibliography key under the cursor of the active tab."""
+        page = self.TabWidget.currentWidget()
+        if not isinstance(page, EditorPage):
+            return
+
+        name = page.edit.reference_under_cursor()
+        if name is None:
+            return
+
+        symbol = page.edit.symbols.definition(name)
+        if symbol is not None:
+            page.edit.jump_to(symbol.position())
+            return
+
+        locations = self.workspace_index.definitions(name) if self.workspace_index is not None else []
+        if not locations:
+            logger.info("Could not find the definition of {!r}.", name)
+            return
+
+        (path, line, column) = locations[0]
+        self.open_file(path)
+        page = self.TabWidget.currentWidget()
+        if isinstance(page, EditorPage) and page.path == path:
+            page.go_to(line, column)
+
+    @QtCore.Slot()
+    def check_references(self):
+        """Mark the references of the active tab which can neither be resolved in the file nor in the workspace."""
+        page = self.TabWidget.currentWidget()
+        if not isinstance(page, EditorPage) or self.workspace_index is None:
+            return
+
+        symbols = page.edit.symbols
+        names = [name for name in symbols.names["reference"] if symbols.definition(name) is None]
+        page.edit.mark_unresolved_references(self.workspace_index.unresolved(names))
+
     @QtCore.Slot()
     def childtext_changed(self):
         """Trigger textChanged."""
@@ -211,6 +379,7 @@ class Editor(QtWidgets.QFrame):
             self.TabWidget.tabBar().setTabTextColor(i, QtGui.QColor("black"))
         else:
             self.TabWidget.tabBar().setTabTextColor(i, QtGui.QColor("red"))
+        self.unsaved_files_changed.emit(self.unsaved_files())
 
     @QtCore.Slot(str)
     def childpath_changed(self, path):
@@ -221,6 +390,14 @@ class Editor(QtWidgets.QFrame):
         self.TabWidget.tabBar().setTabText(i, name)
         self.TabWidget.tabBar().setTabIcon(i, icon)
 
+        self.sync_document(self.sender())
+        self.unsaved_files_changed.emit(self.unsaved_files())
+
+    def sync_document(self, page):
+        """Keep the language server in sync with the text of a page showing a Typst file, if a language server is used."""
+        if self.language_server is not None and page.path and page.path.endswith(".typ"):
+            self.language_server.open_document(page.path, page.changes)
+
     @QtCore.Slot()
     def update_tab_names(self):
         """Update all tab names according to the current working directory."""
@@ -231,17 +408,29 @@ class Editor(QtWidgets.QFrame):
 
     @QtCore.Slot(int)
     def tab_changed(self, i):
-        """Emit active_file_changed signal."""
+        """Load placeholders once they are activated and emit active_file_changed signal."""
         page = self.TabWidget.widget(i)
+        if isinstance(page, EditorPagePlaceholder):
+            page = self.materialize(i)
         if page:
             self.active_file_changed.emit(page.path)
+        self.reference_timer.start()
 
     @QtCore.Slot(collections.defaultdict)
     def apply_errors(self, errors):
         """Apply all compiler errors."""
         for t in self.tabs_list():
-            if t.path in errors:
+            if isinstance(t, EditorPage) and t.path in errors:
                 t.edit.highlight_errors(errors[t.path])
+            elif isinstance(t, EditorPagePlaceholder) and t.path in errors:
+                t.errors = errors[t.path]
+
+    @QtCore.Slot(str, list)
+    def apply_diagnostics(self, path, errors):
+        """Apply the diagnostics of a language server to the tab showing path."""
+        for t in self.tabs_list():
+            if isinstance(t, EditorPage) and t.path == path:
+                t.edit.highlight_errors(errors)
 
     @QtCore.Slot()
     def clear_errors(self):
@@ -249,6 +438,8 @@ class Editor(QtWidgets.QFrame):
         for t in self.tabs_list():
             if isinstance(t, EditorPage):
                 t.edit.clear_errors()
+            elif isinstance(t, EditorPagePlaceholder):
+                t.errors = None
 
     @QtCore.Slot()
     def increase_font_size(self):
@@ -329,8 +520,9 @@ class EditorPage(QtWidgets.QFrame):
 
     savestatechanged = QtCore.Signal(bool)
     pathchanged = QtCore.Signal(str)
+    loaded = QtCore.Signal(str)
 
-    def __init__(self, path=None, font_size=None):
+    def __init__(self, path=None, font_size=None, save_service=None, watcher=None):
         """Set up and load file if path is given."""
         QtWidgets.QFrame.__init__(self)
         self.setFrameStyle(QtWidgets.QFrame.Shape.StyledPanel)
@@ -365,74 +557,225 @@ class EditorPage(QtWidgets.QFrame):
         self.verticalLayout.addWidget(self.status_bar)
 
         self.file_changed_warning = None
+        self.loader = None
+        self.progress_bar = None
 
-        self.filesystemwatcher = QtCore.QFileSystemWatcher()
-        self.filesystemwatcher.fileChanged.connect(self.show_file_changed_warning)
+        self.file_watcher = watcher if watcher is not None else file_watcher.FileWatcher(self)
+        self.file_watcher.file_changed.connect(self.show_file_changed_warning)
+        self.watched_path = None
 
         self.status_bar.syntax_changed.connect(self.edit.set_syntax)
 
+        # Pages opened on their own have a save service of their own, which is stopped when they are closed
+        self.owns_save_service = save_service is None
+        self.save_service = save_service if save_service is not None else file_io.SaveService(self)
+        self.save_service.saved.connect(self.file_saved)
+        self.save_service.failed.connect(self.file_save_failed)
+
         self.path = path
+        self.edit.completion.set_path(path)
+        self.pathchanged.connect(self.edit.completion.set_path)
         self.issaved = True
         self.isloaded = False
+        self.isloading = False
         self.changed_on_disk = False
-        self.justsaved = False
+        # Version of the text being saved, so that a finished save only marks the page as saved if nothing was typed in between
+        self.saving_version = None
+        # Identity of the file as last loaded or saved by us, used to tell our own writes apart from external changes
+        self.saved_identity = None
+        self.change_during_save = False
         self.any_match_found = False
+        self.restored_text = None
+        self.restored_scroll = None
+        self.restored_folds = None
+        self.restored_cursor = None
+
+        # Lets consumers of the text follow its edits without copying it
+        self.changes = change_tracker.ChangeTracker(self.edit.document(), self)
+
+        # Records unsaved edits so that they can be recovered after a crash
+        self.journal = journal.Journal(self.edit.document(), self)
+
         if path:
             self.load(path)
+        else:
+            self.journal.start(None, None)
 
     def load(self, path):
-        """Load file."""
+        """Load file. Large files are streamed in the background, see load_chunked."""
+        self.journal.stop()
         try:
+            if os.path.getsize(path) > file_io.chunked_loading_threshold:
+                self.load_chunked(path)
+                return
+
             with open(path, "r", encoding="utf-8") as file:
                 filecontent = file.read()
 
             self.edit.setPlainText(filecontent)
-            self.issaved = True
-            self.path = path
-            self.pathchanged.emit(self.path)
-            self.isloaded = True
-            self.changed_on_disk = False
+            self.loading_finished(path)
 
-            if self.filesystemwatcher.files():
-                self.filesystemwatcher.removePaths(self.filesystemwatcher.files())
-            self.filesystemwatcher.addPath(path)
+        except (UnicodeError, OSError) as e:
+            self.loading_failed(path, e)
 
-            self.savestatechanged.emit(self.issaved)
+    def load_chunked(self, path):
+        """Load a file block by block without blocking the GUI, showing the loading progress."""
+        self.cancel_loading()
 
-        except UnicodeError:
-            msg = f"{path!r} is not a text file."
-            logger.warning(msg)
-            self.show_error(msg)
-            self.isloaded = False
+        self.isloading = True
+        self.isloaded = False
+        self.edit.setReadOnly(True)
+        self.edit.document().setUndoRedoEnabled(False)
+        self.edit.clear()
+
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.progress_bar.setRange(0, max(os.path.getsize(path), 1))
+        self.progress_bar.setFormat("Loading %p%")
+        self.verticalLayout.insertWidget(self.verticalLayout.indexOf(self.edit) + 1, self.progress_bar)
+
+        self.loader = file_io.ChunkedFileLoader(path, self)
+        self.loader.chunk_loaded.connect(self.append_loaded_chunk)
+        self.loader.progress.connect(self.progress_bar.setValue)
+        self.loader.finished.connect(self.chunked_loading_finished)
+        self.loader.failed.connect(self.chunked_loading_failed)
+        self.loader.start()
+
+    @QtCore.Slot(str)
+    def append_loaded_chunk(self, text):
+        """Append a block of text to the end of the document."""
+        cursor = QtGui.QTextCursor(self.edit.document())
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
 
-        except OSError:
+    @QtCore.Slot()
+    def chunked_loading_finished(self):
+        """Make the page editable once the file is loaded completely."""
+        path = self.loader.path
+        self.end_chunked_loading()
+        self.loading_finished(path)
+
+    @QtCore.Slot(object)
+    def chunked_loading_failed(self, exception):
+        """Discard the partially loaded file."""
+        path = self.loader.path
+        self.end_chunked_loading()
+        self.edit.clear()
+        self.loading_failed(path, exception)
+
+    def end_chunked_loading(self):
+        """Remove the loader and the progress bar."""
+        self.isloading = False
+        self.edit.setReadOnly(False)
+        self.edit.document().setUndoRedoEnabled(True)
+
+        self.loader.deleteLater()
+        self.loader = None
+        self.verticalLayout.removeWidget(self.progress_bar)
+        self.progress_bar.deleteLater()
+        self.progress_bar = None
+
+    def cancel_loading(self):
+        """Cancel loading a file, if a file is currently being loaded."""
+        if self.isloading:
+            self.loader.cancel()
+            self.end_chunked_loading()
+
+    def loading_finished(self, path):
+        """Update the page state after the file at path was loaded."""
+        self.issaved = True
+        self.path = path
+        self.pathchanged.emit(self.path)
+        self.isloaded = True
+        self.changed_on_disk = False
+        self.saved_identity = file_io.file_identity(path)
+
+        # Reloading a watched file makes its current content the accepted one
+        if path == self.watched_path:
+            self.file_watcher.acknowledge(path)
+        else:
+            self.watch(path)
+
+        self.savestatechanged.emit(self.issaved)
+        self.journal.start(path, self.saved_identity)
+        self.loaded.emit(path)
+
+        if self.restored_text is not None:
+            self.restore(self.restored_text)
+            self.restored_text = None
+        if self.restored_folds is not None:
+            self.fold_lines(self.restored_folds)
+            self.restored_folds = None
+        if self.restored_scroll is not None:
+            self.scroll_to(self.restored_scroll)
+            self.restored_scroll = None
+        if self.restored_cursor is not None:
+            self.go_to(*self.restored_cursor)
+            self.restored_cursor = None
+
+    def loading_failed(self, path, exception):
+        """Show an error after the file at path could not be loaded."""
+        if isinstance(exception, UnicodeError):  # noqa: SIM108
+            msg = f"{path!r} is not a text file."
+        else:
             msg = f"{path!r} is not a valid file."
-            logger.warning(msg)
-            self.show_error(msg)
-            self.isloaded = False
+        logger.warning(msg)
+        self.show_error(msg)
+        self.isloaded = False
+
+    def write(self, wait=False):
+        """
+        Write file to disk.
 
-    def write(self):
-        """Write file to disk."""
+        The text is snapshotted and written in the background by the save service. If wait is set, block until the
+        file was written and return whether that succeeded.
+        """
         logger.debug("Saving to: {!r}.", self.path)
 
-        try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                f.write(self.edit.document().toPlainText())
+        (self.saving_version, text) = self.changes.snapshot()
+        future = self.save_service.save(self.path, text)
 
-            self.justsaved = True
-            self.issaved = True
-            self.changed_on_disk = False
-            self.savestatechanged.emit(self.issaved)
+        if wait:
+            return self.save_service.wait(future)
+        return True
 
-            return True
-        except OSError:
-            logger.info("Could not saved file {!r}", self.path)
-            return False
+    @QtCore.Slot(str, object)
+    def file_saved(self, path, identity):
+        """Update the page state after the save service wrote the file at path."""
+        if path != self.path:
+            return
+
+        self.saved_identity = identity
+
+        # Only the last of several queued saves carries the current text
+        if not self.save_service.is_saving(path):
+            self.journal.start(path, identity)
+            if self.changes.version == self.saving_version:
+                self.issaved = True
+                self.changed_on_disk = False
+                self.savestatechanged.emit(self.issaved)
+            else:
+                self.journal.compact()
+
+        self.file_watcher.acknowledge(path)
+
+        if self.change_during_save and not self.save_service.is_saving(path):
+            self.change_during_save = False
+            if file_io.file_identity(path) != identity:
+                self.show_file_changed_warning(path)
+
+    @QtCore.Slot(str, str)
+    def file_save_failed(self, path, msg):
+        """Keep the page unsaved after the save service failed to write the file at path."""
+        if path != self.path:
+            return
 
-    def save(self):
+        self.issaved = False
+        self.savestatechanged.emit(self.issaved)
+
+    def save(self, wait=False):
         """Save file."""
         if not self.path:
-            return self.save_as()
+            return self.save_as(wait)
 
         if self.changed_on_disk:
             ans = QtWidgets.QMessageBox.question(
@@ -443,27 +786,26 @@ class EditorPage(QtWidgets.QFrame):
             if ans == QtWidgets.QMessageBox.StandardButton.No:
                 return False
 
-        self.write()
-        return True
+        return self.write(wait)
 
-    def save_as(self):
+    def save_as(self, wait=False):
         """Save file under a new name."""
         path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save File", state.working_directory.Value)
 
         if os.path.exists(path) or os.access(os.path.dirname(path), os.W_OK):
             self.path = path
-            self.filesystemwatcher.removePaths(self.filesystemwatcher.files())
-            self.filesystemwatcher.addPath(path)
+            self.watch(path)
             self.pathchanged.emit(self.path)
 
-            self.write()
-            return True
+            return self.write(wait)
         else:
             logger.info("Attempted to save file but {!r} is not a valid path", path)
             return False
 
     def tryclose(self):
         """Try closing the page. Succeeds if file is or can be saved or is discarded, fails otherwise."""
+        self.cancel_loading()
+
         if not self.issaved:
             name = os.path.basename(self.path) if self.path else "*new*"
 
@@ -475,25 +817,99 @@ class EditorPage(QtWidgets.QFrame):
 
             match box.exec():
                 case QtWidgets.QMessageBox.Save:
-                    return self.save()
+                    if not self.save(wait=True):
+                        return False
                 case QtWidgets.QMessageBox.Discard:
-                    return True
+                    pass
                 case QtWidgets.QMessageBox.Cancel:
                     return False
 
+        self.journal.stop()
+        self.watch(None)
+        if self.owns_save_service:
+            self.save_service.stop()
         return True
 
+    def restore(self, text):
+        """Replace the text by text recovered from a journal. The replacement can be undone."""
+        if self.isloading:
+            self.restored_text = text
+            return
+
+        cursor = QtGui.QTextCursor(self.edit.document())
+        cursor.select(QtGui.QTextCursor.SelectionType.Document)
+        cursor.insertText(text)
+        self.journal.compact()
+
+    def scroll_to(self, position):
+        """Scroll to a position returned by scroll_position, once the file is loaded."""
+        if self.isloading:
+            self.restored_scroll = position
+            return
+
+        self.edit.verticalScrollBar().setValue(position)
+
+    def scroll_position(self):
+        """Return the current scroll position."""
+        if self.isloading:
+            return self.restored_scroll or 0
+        return self.edit.verticalScrollBar().value()
+
+    def go_to(self, line, column=0):
+        """Move the cursor to a line and column, once the file is loaded."""
+        if self.isloading:
+            self.restored_cursor = (line, column)
+            return
+
+        block = self.edit.document().findBlockByNumber(line)
+        if block.isValid():
+            self.edit.jump_to(block.position() + min(column, block.length() - 1))
+
+    def fold_lines(self, lines):
+        """Fold the regions starting at lines returned by folded_lines, once the file is loaded."""
+        if self.isloading:
+            self.restored_folds = lines
+            return
+
+        self.edit.folding.fold_blocks(lines)
+
+    def folded_lines(self):
+        """Return the lines starting folded regions."""
+        if self.isloading:
+            return self.restored_folds or []
+        return self.edit.folding.folded()
+
     def modified(self):
         """Set status to unsaved."""
+        if self.isloading:
+            return
+
         self.issaved = False
         self.savestatechanged.emit(self.issaved)
 
+    def watch(self, path):
+        """Watch path for changes instead of the previously watched path. Stop watching if path is None."""
+        if path == self.watched_path:
+            return
+        if self.watched_path is not None:
+            self.file_watcher.unsubscribe(self.watched_path)
+        if path is not None:
+            self.file_watcher.subscribe(path)
+        self.watched_path = path
+
     @QtCore.Slot(str)
     def show_file_changed_warning(self, path):
         """Show the file changed warning."""
-        # Abort if the file was just saved before
-        if self.justsaved:
-            self.justsaved = False
+        if path != self.path:
+            return
+
+        # Decide once our own save has finished, see file_saved
+        if self.save_service.is_saving(path):
+            self.change_during_save = True
+            return
+
+        # Abort if the file on disk is the one we wrote or loaded
+        if file_io.file_identity(path) == self.saved_identity:
             return
 
         self.changed_on_disk = True
@@ -718,6 +1134,32 @@ class EditorStatusBar(QtWidgets.QWidget):
         self.Layout.addWidget(self.syntax_combo_box)
 
 
+class EditorPagePlaceholder(QtWidgets.QFrame):
+    """Stands in for an editor page restored from a session until its tab is activated, see Editor.materialize."""
+
+    def __init__(self, path, scroll=0, folds=()):
+        """Init."""
+        QtWidgets.QFrame.__init__(self)
+
+        self.path = path
+        self.scroll = scroll
+        self.folds = list(folds)
+        self.errors = None
+        self.issaved = True
+
+    def scroll_position(self):
+        """Return the scroll position the page will be restored to."""
+        return self.scroll
+
+    def folded_lines(self):
+        """Return the lines which will be folded once the page is restored."""
+        return self.folds
+
+    def tryclose(self):
+        """Close placeholder."""
+        return True
+
+
 class WelcomePage(QtWidgets.QFrame):
     """Welcome Page."""
 
@@ -796,9 +1238,9 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
         palette.setColor(QtGui.QPalette.Text, QtGui.QColor(self.highlighter.font_color))
         self.setPalette(palette)
 
-        self.line_highlight = []
-        self.error_highlight = []
-        self.search_highlights = []
+        self.selections = selections.SelectionLayers(self)
+        self.highlight_line = highlight_line
+        self.highlighted_line = None
 
         if font_size:
             self.set_font_size(font_size)
@@ -811,8 +1253,14 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
         else:
             self.line_numbers = None
 
+        self.folding = folding.Folding(self)
+        self.symbols = outline.SymbolIndex(self.document(), self)
+        self.completion = completion.Completion(self)
+        self.diagnostics = diagnostics.DiagnosticsOverlay(self)
+
         if highlight_line:
             self.cursorPositionChanged.connect(self.highlight_current_line)
+            self.selectionChanged.connect(self.highlight_current_line)
             self.highlight_current_line()
 
         self.use_spaces = use_spaces
@@ -827,8 +1275,14 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
             rect = QtCore.QRect(cr.left(), cr.top(), width, cr.height())
             self.line_numbers.setGeometry(rect)
 
+        self.diagnostics.schedule()
+
     def keyPressEvent(self, e):  # This is an overriding function # noqa: N802
         """Intercept, modify and forward keyPressEvent."""
+        # Let the completion popup handle accepting and dismissing completions, complete if Ctrl+Space pressed
+        if self.completion.intercept(e):
+            return
+
         # Indent if Tab pressed
         if e.key() == QtCore.Qt.Key_Tab and e.modifiers() == QtCore.Qt.NoModifier:
             if self.textCursor().hasSelection():
@@ -850,11 +1304,16 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
             self.toggle_comment()
             return
 
+        # Fold if Ctrl+Shift+[ and unfold if Ctrl+Shift+] pressed
+        if e.modifiers() == QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier and self.fold_shortcut(e.key()):
+            return
+
         # Avoid inserting line break characters
         if e.key() == QtCore.Qt.Key_Return and e.modifiers() == QtCore.Qt.ShiftModifier:
             e = QtGui.QKeyEvent(QtCore.QEvent.KeyPress, QtCore.Qt.Key_Return, QtCore.Qt.NoModifier, "\r")
 
         super().keyPressEvent(e)
+        self.completion.key_pressed(e)
 
     def set_font_size(self, font_size):
         """Set the font size."""
@@ -870,58 +1329,110 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
             self.highlighter = syntax_highlighting.CodeSyntaxHighlight(self.document(), lexer, highlight_style)
             self.highlighter.rehighlight()
 
-    def apply_extra_selections(self):
-        """Apply line, error and search highlight extra selections."""
-        self.setExtraSelections(self.line_highlight + self.error_highlight + self.search_highlights)
+    def jump_to(self, position):
+        """Move the cursor to a position, show it in the middle of the view and focus the edit."""
+        cursor = self.textCursor()
+        cursor.setPosition(min(position, self.document().characterCount() - 1))
+        self.setTextCursor(cursor)
+        self.centerCursor()
+        self.setFocus()
+
+    def reference_under_cursor(self):
+        """Return the name of the label reference or label under the cursor, or None."""
+        cursor = self.textCursor()
+        text = cursor.block().text()
+        column = cursor.positionInBlock()
+        for pattern in (outline.reference_pattern, outline.label_pattern):
+            for match in pattern.finditer(text):
+                if match.start() <= column <= match.end():
+                    return match.group(1)
+        return None
+
+    def mark_unresolved_references(self, names):
+        """Mark the lines of references to the given names next to the line numbers."""
+        if self.line_numbers:
+            color = QtGui.QColor(self.highlighter.error_highlight_color)
+            markers = {s.line(): color for name in names for s in self.symbols.references(name)}
+            self.line_numbers.set_markers("references", markers)
+
+    def fold_shortcut(self, key):
+        """Fold or unfold depending on the bracket key pressed and return whether the key was handled."""
+        if key in (QtCore.Qt.Key_BracketLeft, QtCore.Qt.Key_BraceLeft):
+            self.fold()
+            return True
+        if key in (QtCore.Qt.Key_BracketRight, QtCore.Qt.Key_BraceRight):
+            self.unfold()
+            return True
+        return False
+
+    def fold(self):
+        """Fold the innermost region containing the cursor."""
+        block = self.textCursor().block()
+        while block.isValid():
+            end = self.folding.region(block)
+            if end is not None and end >= self.textCursor().blockNumber():
+                self.folding.fold(block)
+                return
+            block = block.previous()
+
+    def unfold(self):
+        """Unfold the region starting at the line of the cursor."""
+        self.folding.unfold(self.textCursor().block())
+
+    @property
+    def error_highlight(self):
+        """Return the extra selections highlighting errors."""
+        return self.selections.get("errors")
+
+    @property
+    def search_highlights(self):
+        """Return the extra selections highlighting search matches."""
+        return self.selections.get("search")
+
+    def line_rect(self, cursor):
+        """Return the rect of the line of cursor in the viewport."""
+        rect = self.cursorRect(cursor)
+        return QtCore.QRect(0, rect.top(), self.viewport().width(), rect.height())
+
+    def current_line_rect(self):
+        """Return the rect of the highlighted current line in the viewport, or None if no line is highlighted."""
+        cursor = self.textCursor()
+        if not self.highlight_line or cursor.hasSelection():
+            return None
+        return self.line_rect(cursor)
 
     @QtCore.Slot()
     def highlight_current_line(self):
-        """Highlight the current line, unless some text is selected."""
-        if not self.textCursor().hasSelection():
-            highlight = QtWidgets.QTextEdit.ExtraSelection()
-            highlight.format.setBackground(QtGui.QColor(self.highlighter.highlight_color))
-            highlight.format.setProperty(QtGui.QTextFormat.FullWidthSelection, True)
-            highlight.cursor = self.textCursor()
-            self.line_highlight = [highlight]
-        else:
-            self.line_highlight = []
+        """Repaint the previously and the currently highlighted line, unless they are the same."""
+        cursor = None if self.textCursor().hasSelection() else self.textCursor()
+        old = self.line_rect(self.highlighted_line) if self.highlighted_line is not None else None
+        new = self.line_rect(cursor) if cursor is not None else None
+        if old == new:
+            return
 
-        self.apply_extra_selections()
+        # The copy of the cursor follows edits, so the rect of the old line is still found after the text changed
+        self.highlighted_line = QtGui.QTextCursor(cursor) if cursor is not None else None
+        for rect in (old, new):
+            if rect is not None:
+                self.viewport().update(rect)
+
+    def paintEvent(self, event):  # This is an overriding function # noqa: N802
+        """Paint the current line highlight below the text."""
+        rect = self.current_line_rect()
+        if rect is not None and rect.intersects(event.rect()):
+            painter = QtGui.QPainter(self.viewport())
+            painter.fillRect(rect, QtGui.QColor(self.highlighter.highlight_color))
+            painter.end()
+
+        super().paintEvent(event)
 
-    @QtCore.Slot()
     def highlight_errors(self, errors):
-        """Highlight compiler errors."""
-        highlights = []
-        for e in errors:
-            (_, line, col, length) = e
-            # the error code is not currently used but it may be displayed in the editor in the future
-
-            cursor = QtGui.QTextCursor(self.document())
-            cursor.movePosition(QtGui.QTextCursor.MoveOperation.NextBlock, QtGui.QTextCursor.MoveMode.MoveAnchor, line - 1)
-            cursor.movePosition(QtGui.QTextCursor.MoveOperation.Right, QtGui.QTextCursor.MoveMode.MoveAnchor, col)
-            cursor.movePosition(QtGui.QTextCursor.MoveOperation.Right, QtGui.QTextCursor.MoveMode.KeepAnchor, length)
-
-            mark_line = QtWidgets.QTextEdit.ExtraSelection()
-            mark_line.format.setBackground(QtGui.QColor(self.highlighter.error_highlight_color))
-            mark_line.format.setProperty(QtGui.QTextFormat.FullWidthSelection, True)
-            mark_line.cursor = cursor
-            mark_line.cursor.clearSelection()
-            highlights.append(mark_line)
-
-            mark_span = QtWidgets.QTextEdit.ExtraSelection()
-            mark_span.format.setUnderlineStyle(QtGui.QTextCharFormat.DashUnderline)
-            mark_span.format.setUnderlineColor(QtGui.QColor(self.highlighter.error_font_color))
-            mark_span.cursor = cursor
-            highlights.append(mark_span)
-
-        self.error_highlight = highlights
-        self.apply_extra_selections()
+        """Highlight compiler errors given as tuples of error code, line (1-based), column and length."""
+        self.diagnostics.set(errors)
 
     def clear_errors(self):
         """Clear all error highlights."""
-        if self.error_highlight:
-            self.error_highlight = []
-            self.apply_extra_selections()
+        self.diagnostics.clear()
 
     def _insert_tab(self, cursor):
         """Insert a tab (or four spaces) right of the cursor."""
@@ -1063,16 +1574,13 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
                 highlight.format.setBackground(QtGui.QColor(self.highlighter.highlight_color).darker(120))
                 highlights.append(highlight)
 
-        self.search_highlights = highlights
         self.any_match_found = bool(highlights)
-
-        self.apply_extra_selections()
+        self.selections.set("search", highlights)
 
     def clear_search_highlights(self):
         """Clear all search highlights."""
-        self.search_highlights = []
         self.any_match_found = False
-        self.apply_extra_selections()
+        self.selections.clear("search")
 
     def jump_to_match(self, query, mode, direction=enums.search_direction.next):
         """Jump to the next/previous match of the search query."""
@@ -1123,41 +1631,127 @@ class CodeEdit(QtWidgets.QPlainTextEdit):
 
 
 class LineNumberWidget(QtWidgets.QWidget):
-    """A widget supposed to be attached to a QPlainTextEdit showing line numbers."""
+    """
+    A widget supposed to be attached to a QPlainTextEdit showing line numbers.
+
+    The line numbers are drawn from a cache of laid out static texts. Markers, e.g. for errors, are stored per kind
+    and line and drawn as colored bars in the left spacing. Foldable regions are marked in the right spacing and
+    clicking a line folds or unfolds the region starting there.
+    """
 
     left_spacing = 10
     right_spacing = 10
+    marker_width = 4
+    fold_marker_size = 6
+
+    # Number of laid out line numbers to keep
+    cache_size = 2048
 
     def __init__(self, parent):
         """Init."""
         QtWidgets.QWidget.__init__(self, parent)
 
+        self.digits = 0
+        self.glyphs = {}
+        self.markers = {}
+
+    def glyph(self, line_number):
+        """Return the laid out text of a line number."""
+        glyph = self.glyphs.get(line_number)
+        if glyph is None:
+            if len(self.glyphs) >= self.cache_size:
+                self.glyphs.clear()
+            glyph = QtGui.QStaticText(str(line_number))
+            glyph.setTextFormat(QtCore.Qt.TextFormat.PlainText)
+            glyph.prepare(font=self.font())
+            self.glyphs[line_number] = glyph
+        return glyph
+
     def paintEvent(self, event):  # This is an overriding function # noqa: N802
-        """Paint the widget."""
+        """Paint the line numbers of the blocks within the event rect."""
+        edit = self.parentWidget()
         painter = QtGui.QPainter(self)
 
         # paint background
-        painter.fillRect(event.rect(), QtGui.QColor(self.parentWidget().highlighter.line_number_background_color))
+        painter.fillRect(event.rect(), QtGui.QColor(edit.highlighter.line_number_background_color))
 
         # paint line numbers
-        painter.setPen(QtGui.QColor(self.parentWidget().highlighter.line_number_color))
-        block = self.parentWidget().firstVisibleBlock()
-
-        while block and block.isValid():
-            offset = self.parentWidget().contentOffset()
-            y = int(self.parentWidget().blockBoundingGeometry(block).translated(offset).top())
-            line_number = str(block.blockNumber() + 1)
-            text_width = self.width() - self.right_spacing
-            text_height = self.fontMetrics().height()
-            painter.drawText(0, y, text_width, text_height, QtCore.Qt.AlignRight, line_number)
-
-            if y <= event.rect().bottom():  # noqa: SIM108
-                block = block.next()
-            else:
-                block = None
+        painter.setPen(QtGui.QColor(edit.highlighter.line_number_color))
+        block = edit.firstVisibleBlock()
+        top = edit.blockBoundingGeometry(block).translated(edit.contentOffset()).top()
+        right = self.width() - self.right_spacing
+        markers = [m for m in self.markers.values() if m]
+        line_height = self.fontMetrics().height()
+
+        while block.isValid() and top <= event.rect().bottom():
+            height = edit.blockBoundingRect(block).height()
+
+            if block.isVisible() and top + height >= event.rect().top():
+                number = block.blockNumber()
+                glyph = self.glyph(number + 1)
+                painter.drawStaticText(QtCore.QPointF(right - glyph.size().width(), top), glyph)
+
+                for m in markers:
+                    color = m.get(number)
+                    if color is not None:
+                        painter.fillRect(QtCore.QRectF(0, top, self.marker_width, height), color)
+
+                if edit.folding.is_folded(block):
+                    self.paint_fold_marker(painter, QtCore.QPointF(right + 2, top + line_height / 2), folded=True)
+                elif edit.folding.kind(block):
+                    self.paint_fold_marker(painter, QtCore.QPointF(right + 2, top + line_height / 2), folded=False)
+
+            top += height
+            block = block.next()
 
         painter.end()
 
+    def paint_fold_marker(self, painter, left, folded):
+        """Paint a triangle pointing right for folded regions and down for foldable ones, starting at left."""
+        size = self.fold_marker_size
+        (x, y) = (left.x(), left.y())
+        if folded:
+            points = [QtCore.QPointF(x, y - size / 2), QtCore.QPointF(x + size / 2, y), QtCore.QPointF(x, y + size / 2)]
+        else:
+            points = [
+                QtCore.QPointF(x, y - size / 4),
+                QtCore.QPointF(x + size, y - size / 4),
+                QtCore.QPointF(x + size / 2, y + size / 4),
+            ]
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        painter.setBrush(painter.pen().color())
+        painter.drawPolygon(points)
+        painter.restore()
+
+    def mousePressEvent(self, event):  # This is an overriding function # noqa: N802
+        """Fold or unfold the region starting at the clicked line."""
+        edit = self.parentWidget()
+        block = edit.cursorForPosition(QtCore.QPoint(0, int(event.position().y()))).block()
+        if edit.folding.is_folded(block) or edit.folding.kind(block):
+            edit.folding.toggle(block)
+        else:
+            super().mousePressEvent(event)
+
+    def set_markers(self, kind, markers):
+        """Set the markers of a kind, given as a dict mapping block numbers to colors."""
+        self.markers[kind] = markers
+        self.update()
+
+    def clear_markers(self, kind):
+        """Remove all markers of a kind."""
+        if self.markers.pop(kind, None):
+            self.update()
+
+    def changeEvent(self, event):  # This is an overriding function # noqa: N802
+        """Drop the cached line numbers if the font changed."""
+        if event.type() == QtCore.QEvent.Type.FontChange:
+            self.glyphs.clear()
+            self.digits = 0
+            self.update_width()
+        super().changeEvent(event)
+
     @QtCore.Slot(QtCore.QRect, int)
     def update_requested(self, rect, dy):
         """Update."""
@@ -1168,8 +1762,13 @@ class LineNumberWidget(QtWidgets.QWidget):
 
     @QtCore.Slot()
     def update_width(self):
-        """Update the Line Number Widget to take the width required to display all digits."""
-        text_width = self.fontMetrics().horizontalAdvance(str(self.parentWidget().blockCount()))
+        """Update the Line Number Widget to take the width required to display all digits, if their number changed."""
+        digits = len(str(self.parentWidget().blockCount()))
+        if digits == self.digits:
+            return
+
+        self.digits = digits
+        text_width = self.fontMetrics().horizontalAdvance("9" * digits)
         width = self.left_spacing + text_width + self.right_spacing
         self.setFixedWidth(width)
         self.parentWidget().setViewportMargins(width, 0, 0, 0)
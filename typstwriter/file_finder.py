@@ -0,0 +1,93 @@
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+import os
+
+from typstwriter import completion
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FileFinder(QtWidgets.QFrame):
+    """
+    A popup to go to a file of the working directory by typing parts of its path.
+
+    The matches are searched in a FileIndex on every keystroke and listed best first.
+
+    Signals:
+    open_file(str): Emitted with the path of the chosen file.
+    """
+
+    open_file = QtCore.Signal(str)
+
+    def __init__(self, file_index, parent=None):
+        """Init."""
+        super().__init__(parent, QtCore.Qt.WindowType.Popup)
+
+        self.file_index = file_index
+        self.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
+
+        self.line_edit = QtWidgets.QLineEdit(self)
+        self.line_edit.setPlaceholderText("Go to file")
+        self.line_edit.textChanged.connect(self.update_matches)
+        self.line_edit.returnPressed.connect(self.open_current)
+
+        self.model = completion.CompletionModel(self)
+        self.list_view = QtWidgets.QListView(self)
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setFocusPolicy(QtCore.Qt.FocusPolicy.NoFocus)
+        self.list_view.activated.connect(self.open_current)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.line_edit)
+        layout.addWidget(self.list_view)
+
+        self.file_index.updated.connect(self.refresh)
+
+    def popup(self):
+        """Show the finder at the top of its parent with the previous query selected."""
+        parent = self.parentWidget()
+        if parent is not None:
+            width = min(600, parent.width() - 40)
+            self.resize(width, 400)
+            self.move(parent.mapToGlobal(QtCore.QPoint((parent.width() - width) // 2, 40)))
+        self.file_index.refresh()
+        self.update_matches(self.line_edit.text())
+        self.line_edit.selectAll()
+        self.show()
+        self.line_edit.setFocus()
+
+    @QtCore.Slot()
+    def refresh(self):
+        """Search again once the index changed."""
+        if self.isVisible():
+            self.update_matches(self.line_edit.text())
+
+    @QtCore.Slot(str)
+    def update_matches(self, query):
+        """List the files matching query and select the best one."""
+        root = self.file_index.root
+        paths = self.file_index.search(query.strip())
+        self.model.set_items((os.path.relpath(path, root), "file") for path in paths)
+        if self.model.rowCount():
+            self.list_view.setCurrentIndex(self.model.index(0, 0))
+
+    @QtCore.Slot()
+    def open_current(self):
+        """Open the selected file and close the finder."""
+        index = self.list_view.currentIndex()
+        if index.isValid():
+            self.open_file.emit(os.path.join(self.file_index.root, self.model.items[index.row()][0]))
+            self.hide()
+
+    def keyPressEvent(self, event):  # This is an overriding function # noqa: N802
+        """Move the selection with the arrow and page keys while typing."""
+        keys = (QtCore.Qt.Key_Up, QtCore.Qt.Key_Down, QtCore.Qt.Key_PageUp, QtCore.Qt.Key_PageDown)
+        if event.key() in keys:
+            QtWidgets.QApplication.sendEvent(self.list_view, event)
+        else:
+            super().keyPressEvent(event)
@@ -0,0 +1,453 @@
+from qtpy import QtCore
+
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+from typstwriter import background
+from typstwriter import fs_model
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Maximum number of files indexed below a root, so that e.g. a home directory does not take forever
+max_files = 200_000
+
+# Maximum number of matches returned by a search
+limit = 50
+
+# Time in seconds a search may take before the subsequence matching stops, matches containing the query are always found
+budget = 0.008
+
+# Number of characters the subsequence matching searches between checks of the time budget
+chunk_size = 1 << 17
+
+# Time in seconds after which the tree is walked again when Go to File is opened, as only watched directories are updated
+rescan_interval = 60
+
+
+def translate(pattern):
+    """Translate a gitignore glob to a regular expression matching paths relative to the directory of the .gitignore."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and (end := pattern.find("]", i + 2)) != -1:
+            content = pattern[i + 1 : end].replace("\\", "\\\\")
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            regex.append(f"[{content}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+def parse_gitignore(text):
+    """Return the rules of a .gitignore as tuples of the compiled pattern, whether it negates and is directory only."""
+    rules = []
+    for line in text.splitlines():
+        pattern = line.rstrip()
+        if not pattern or pattern.startswith("#"):
+            continue
+
+        negated = pattern.startswith("!")
+        directory_only = pattern.endswith("/")
+        pattern = pattern.removeprefix("!").rstrip("/")
+        if not pattern:
+            continue
+
+        # Patterns with a slash are relative to the .gitignore, others match at any depth
+        regex = translate(pattern.lstrip("/")) if "/" in pattern else "(?:.*/)?" + translate(pattern)
+        try:
+            rules.append((re.compile(regex), negated, directory_only))
+        except re.error:
+            logger.debug("Invalid .gitignore pattern {!r}.", pattern)
+    return rules
+
+
+class GitIgnore:
+    """The rules of the .gitignore files applying to a directory, the last matching rule decides."""
+
+    def __init__(self, rules=()):
+        """Init with tuples of the directory of a .gitignore relative to the root, any of its patterns and its rules."""
+        self.rules = tuple(rules)
+
+    def extended(self, directory, path):
+        """Return the rules extended by the .gitignore at path, which lies in directory relative to the root."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                rules = parse_gitignore(f.read())
+        except OSError:
+            return self
+        if not rules:
+            return self
+        # Most paths match none of the patterns, which one regular expression rules out at once
+        combined = re.compile("|".join(f"(?:{regex.pattern})" for (regex, _, _) in rules))
+        return GitIgnore((*self.rules, (directory, combined, rules)))
+
+    def ignored(self, path, is_dir):
+        """Return whether path, relative to the root and separated by slashes, is ignored."""
+        result = False
+        for directory, combined, rules in self.rules:
+            relative = path[len(directory) + 1 :] if directory else path
+            if not combined.fullmatch(relative):
+                continue
+            for regex, negated, directory_only in rules:
+                if (is_dir or not directory_only) and regex.fullmatch(relative):
+                    result = not negated
+        return result
+
+
+def child(directory, name):
+    """Return the path of an entry of a directory relative to the root, separated by slashes."""
+    return f"{directory}/{name}" if directory else name
+
+
+def list_entries(root, directory, gitignore, patterns):
+    """
+    List a directory relative to the root.
+
+    Return the names of the subdirectories and files which are neither ignored by the patterns nor by .gitignore, and
+    the rules applying to the subdirectories.
+    """
+    subdirectories = []
+    files = []
+    try:
+        with os.scandir(os.path.join(root, directory)) as it:
+            entries = [(e.name, e.is_dir(follow_symlinks=False)) for e in it]
+    except OSError:
+        return ([], [], gitignore)
+
+    if any(name == ".gitignore" and not is_dir for (name, is_dir) in entries):
+        gitignore = gitignore.extended(directory, os.path.join(root, directory, ".gitignore"))
+
+    for name, is_dir in entries:
+        if fs_model.is_ignored(name, patterns) or gitignore.ignored(child(directory, name), is_dir):
+            continue
+        (subdirectories if is_dir else files).append(name)
+    return (sorted(subdirectories), sorted(files), gitignore)
+
+
+def rules_for(root, directory):
+    """Return the .gitignore rules applying to the entries of a directory relative to the root."""
+    gitignore = GitIgnore()
+    parts = directory.split("/") if directory else []
+    # The .gitignore of the directory itself is read when it is listed
+    for depth in range(len(parts)):
+        parent = "/".join(parts[:depth])
+        gitignore = gitignore.extended(parent, os.path.join(root, parent, ".gitignore"))
+    return gitignore
+
+
+def walk(root, directory, gitignore, patterns, stop=None):
+    """
+    Walk the tree below a directory relative to the root.
+
+    Return a dict mapping the walked directories to their subdirectories and files. Runs on a worker thread.
+    """
+    tree = {}
+    count = 0
+    stack = [(directory, gitignore)]
+    while stack:
+        if stop is not None and stop.is_set():
+            break
+        (current, rules) = stack.pop()
+        (subdirectories, files, rules) = list_entries(root, current, rules, patterns)
+        tree[current] = (subdirectories, files)
+        count += len(files)
+        if count >= max_files:
+            logger.warning("Only indexing the first {} files in {!r}.", max_files, root)
+            break
+        stack.extend((child(current, name), rules) for name in reversed(subdirectories))
+    return tree
+
+
+def remove_subtree(tree, directory):
+    """Remove a directory and all directories below it from the tree."""
+    entry = tree.pop(directory, None)
+    if entry is not None:
+        for name in entry[0]:
+            remove_subtree(tree, child(directory, name))
+
+
+def files_of(tree):
+    """Return the paths of all files in the tree, relative to the root."""
+    return [child(directory, name) for directory, (_, files) in tree.items() for name in files]
+
+
+def cache_path(root):
+    """Return the path where the index of root is persisted."""
+    directory = os.path.expanduser(config.get("Internals", "file_index_path"))
+    return os.path.join(directory, hashlib.sha1(root.encode("utf-8")).hexdigest() + ".json")
+
+
+def read_cache(root):
+    """Return the persisted tree of root, or None if there is none."""
+    path = cache_path(root)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except OSError:
+        return None
+    except ValueError:
+        logger.warning("Invalid file index cache {!r}.", path)
+        return None
+
+    if not isinstance(cache, dict) or cache.get("root") != root:
+        return None
+    return {directory: tuple(entry) for directory, entry in cache["tree"].items()}
+
+
+def write_cache(root, tree):
+    """Persist the tree of root."""
+    path = cache_path(root)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"root": root, "tree": tree}, f)
+    except OSError:
+        logger.info("Could not write file {!r}.", path)
+
+
+class Matcher:
+    """
+    Fuzzy matching of a fixed list of paths, fast enough to search 100 000 paths per keystroke.
+
+    The paths are sorted by length and joined into one lower case string per tier, so that the matches of a tier are
+    found by str.find and a single regular expression in C, shortest first, and the search stops once enough are found
+    or the time budget is spent.
+    Paths whose file name contains the query rank first, then paths containing the query and finally paths containing
+    the characters of the query in order.
+    """
+
+    def __init__(self, paths=()):
+        """Init."""
+        self.paths = sorted(paths, key=lambda p: (len(p), p))
+        lowered = [p.lower() for p in self.paths]
+        names = [p[p.rfind("/") + 1 :] for p in lowered]
+        self.text = "\n".join(lowered) + "\n"
+        self.names = "\n".join(names) + "\n"
+        self.starts = list(itertools.accumulate((len(p) + 1 for p in lowered), initial=0))
+        self.name_starts = list(itertools.accumulate((len(n) + 1 for n in names), initial=0))
+
+    def __len__(self):
+        """Return the number of paths."""
+        return len(self.paths)
+
+    @staticmethod
+    def find(text, starts, query, found, limit):
+        """Add the lines of text containing query to found, until it holds limit lines."""
+        position = text.find(query)
+        while position != -1 and len(found) < limit:
+            line = bisect.bisect_right(starts, position) - 1
+            found[line] = None
+            position = text.find(query, starts[line + 1])
+
+    @staticmethod
+    def subsequence(query):
+        """Return a regular expression matching the characters of query in order within a line."""
+        # Skipping everything up to the next character with a negated class does not need backtracking to match
+        parts = [re.escape(query[0])]
+        for c in query[1:]:
+            excluded = "\\" + c if c in "\\]^-" else c
+            parts.append(f"[^{excluded}\\n]*{re.escape(c)}")
+        return re.compile("".join(parts))
+
+    def search(self, query, limit=limit):
+        """Return up to limit paths matching query, best first."""
+        query = query.lower()
+        if not query:
+            return self.paths[:limit]
+
+        deadline = time.perf_counter() + budget
+        found = {}
+        self.find(self.names, self.name_starts, query, found, limit)
+        self.find(self.text, self.starts, query, found, limit)
+
+        pattern = self.subsequence(query)
+        position = 0
+        while len(found) < limit and position < len(self.text) and time.perf_counter() < deadline:
+            # Search up to a line start a chunk further, so that the deadline is checked in between
+            end = self.starts[min(bisect.bisect_left(self.starts, position + chunk_size), len(self.starts) - 1)]
+            match = pattern.search(self.text, position, end)
+            if match is None:
+                position = end
+                continue
+            line = bisect.bisect_right(self.starts, match.start()) - 1
+            found[line] = None
+            position = self.starts[line + 1]
+
+        return [self.paths[line] for line in found]
+
+
+class FileIndex(QtCore.QObject):
+    """
+    An index of the paths of all files below the working directory, for finding files by fuzzy matching.
+
+    The tree is walked on a worker thread, skipping entries matching the ignore patterns of the file system explorer or
+    a .gitignore. It is persisted between sessions, so that it can be searched right away while it is walked again,
+    and updated one directory at a time when the file watcher reports changed entries. The watcher only watches the
+    root and the directories expanded in the file system explorer, so changes elsewhere are only found by walking the
+    tree again, which refresh does once the last walk is older than the rescan interval.
+
+    Signals:
+    updated(): Emitted when the indexed paths changed.
+    """
+
+    updated = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.root = None
+        self.matcher = Matcher()
+        # Time of the last walk of the tree
+        self.scanned = None
+        # Set once the root changes or before quitting, which stops the walks of the current root
+        self.cancel_event = threading.Event()
+
+        # Only accessed by the jobs, which run one after the other on the worker thread
+        self.tree_root = None
+        self.tree = {}
+
+        self.jobs = background.BackgroundJobs("FileIndex")
+        self.jobs.finished.connect(self.finish_job)
+
+    @QtCore.Slot(object)
+    def set_root(self, root):
+        """Index the files below root, starting with the persisted index of the previous session."""
+        root = fs_model.normalize(root) if root else None
+        if root == self.root:
+            return
+
+        self.cancel_event.set()
+        self.cancel_event = threading.Event()
+        self.root = root
+        self.matcher = Matcher()
+        self.updated.emit()
+        if self.root is not None:
+            self.jobs.submit(None, self.load, self.root)
+            self.rescan()
+
+    def rescan(self):
+        """Walk the tree below the root again."""
+        self.scanned = time.monotonic()
+        self.jobs.submit(None, self.scan, self.root, fs_model.ignore_patterns(), self.cancel_event)
+
+    @QtCore.Slot()
+    def refresh(self):
+        """Walk the tree again if the last walk is older than the rescan interval, e.g. when Go to File is opened."""
+        if self.root is not None and time.monotonic() - self.scanned > rescan_interval:
+            self.rescan()
+
+    @QtCore.Slot(str)
+    def directory_changed(self, path):
+        """Update the entries of a directory below the root."""
+        if self.root is None:
+            return
+        path = fs_model.normalize(path)
+        if path == self.root:
+            directory = ""
+        elif path.startswith(os.path.join(self.root, "")):
+            directory = os.path.relpath(path, self.root).replace(os.sep, "/")
+        else:
+            return
+        self.jobs.submit(None, self.update_directory, self.root, directory, fs_model.ignore_patterns(), self.cancel_event)
+
+    @QtCore.Slot(str)
+    def file_saved(self, path):
+        """Add a saved file to the index if it is new."""
+        self.directory_changed(os.path.dirname(path))
+
+    def load(self, root):
+        """Load the persisted tree of root. Runs on the worker thread."""
+        tree = read_cache(root)
+        if tree is None:
+            return None
+        (self.tree_root, self.tree) = (root, tree)
+        return (root, Matcher(files_of(tree)))
+
+    def scan(self, root, patterns, cancel):
+        """Walk the whole tree below root and persist it, unless cancel is set. Runs on the worker thread."""
+        tree = walk(root, "", GitIgnore(), patterns, cancel)
+        if cancel.is_set():
+            return None
+        (self.tree_root, self.tree) = (root, tree)
+        write_cache(root, tree)
+        return (root, Matcher(files_of(tree)))
+
+    def update_directory(self, root, directory, patterns, cancel):
+        """List a changed directory again and walk its new subdirectories. Runs on the worker thread."""
+        if self.tree_root != root or directory not in self.tree:
+            return None
+
+        (subdirectories, files, gitignore) = list_entries(root, directory, rules_for(root, directory), patterns)
+        (known_subdirectories, known_files) = self.tree[directory]
+        if (subdirectories, files) == (list(known_subdirectories), list(known_files)):
+            return None
+
+        for name in set(known_subdirectories) - set(subdirectories):
+            remove_subtree(self.tree, child(directory, name))
+        self.tree[directory] = (subdirectories, files)
+        for name in set(subdirectories) - set(known_subdirectories):
+            self.tree.update(walk(root, child(directory, name), gitignore, patterns, cancel))
+        if cancel.is_set():
+            return None
+
+        write_cache(root, self.tree)
+        return (root, Matcher(files_of(self.tree)))
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, _):
+        """Search the paths of a finished job from now on."""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.warning("Could not update the file index: {}", future.exception())
+        elif future.result() is not None:
+            (root, matcher) = future.result()
+            if root == self.root:
+                logger.debug("Indexed {} files in {!r}.", len(matcher), root)
+                self.matcher = matcher
+                self.updated.emit()
+
+    def wait(self):
+        """Block until all pending jobs are finished."""
+        self.jobs.wait()
+
+    def stop(self):
+        """Abort pending jobs, e.g. before quitting."""
+        self.cancel_event.set()
+        self.jobs.stop()
+
+    def search(self, query, limit=limit):
+        """Return the absolute paths of up to limit files matching query, best first."""
+        if self.root is None:
+            return []
+        return [os.path.join(self.root, *path.split("/")) for path in self.matcher.search(query, limit)]
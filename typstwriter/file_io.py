@@ -0,0 +1,252 @@
+from qtpy import QtCore
+
+import codecs
+import contextlib
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from typstwriter import background
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Files larger than this are streamed into the editor instead of being read in one go
+chunked_loading_threshold = 1 << 20
+chunk_size = 1 << 16
+
+# The number of files that may be written in parallel
+save_workers = 4
+
+# The umask can only be read by setting it, which is not thread safe, so read it once on import
+umask = os.umask(0)
+os.umask(umask)
+
+
+class ChunkedFileLoader(QtCore.QObject):
+    """
+    Load a utf-8 text file in fixed-size blocks without blocking the GUI.
+
+    The file is read and decoded on a worker thread. The decoded blocks are handed to the GUI thread through a bounded
+    queue which is drained by a timer, so that every block is delivered in its own turn of the event loop.
+
+    Signals:
+    chunk_loaded(str): Emitted for every decoded block of text.
+    progress(int): Emitted with the number of bytes loaded so far.
+    finished(): Emitted once the whole file has been loaded.
+    failed(object): Emitted with the exception if reading or decoding the file fails.
+    """
+
+    chunk_loaded = QtCore.Signal(str)
+    progress = QtCore.Signal(int)
+    finished = QtCore.Signal()
+    failed = QtCore.Signal(object)
+
+    # Time in seconds the GUI thread may spend on delivering blocks per turn of the event loop
+    time_budget = 0.01
+
+    def __init__(self, path, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.path = path
+        self.queue = queue.Queue(maxsize=16)
+        self.cancelled = threading.Event()
+        self.thread = None
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.deliver)
+
+    def start(self):
+        """Start reading the file."""
+        self.thread = threading.Thread(target=self.read, name="ChunkedFileLoader", daemon=True)
+        self.thread.start()
+        self.timer.start()
+
+    def cancel(self):
+        """Stop reading the file and discard everything not yet delivered."""
+        self.cancelled.set()
+        self.timer.stop()
+
+    def read(self):
+        """Read and decode the file block by block. Runs on the worker thread."""
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+        bytes_read = 0
+        try:
+            with open(self.path, "rb") as file:
+                while not self.cancelled.is_set():
+                    data = file.read(chunk_size)
+                    bytes_read += len(data)
+                    text = decoder.decode(data, final=not data)
+                    if not self.put(("chunk", text, bytes_read)):
+                        return
+                    if not data:
+                        break
+            self.put(("finished", None, bytes_read))
+        except (UnicodeError, OSError) as e:
+            self.put(("failed", e, bytes_read))
+
+    def put(self, item):
+        """Put an item into the queue, giving up if loading was cancelled."""
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @QtCore.Slot()
+    def deliver(self):
+        """Deliver decoded blocks to the GUI thread until the time budget of this turn is used up."""
+        deadline = time.perf_counter() + self.time_budget
+        while time.perf_counter() < deadline and not self.cancelled.is_set():
+            try:
+                kind, payload, bytes_read = self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+            match kind:
+                case "chunk":
+                    if payload:
+                        self.chunk_loaded.emit(payload)
+                    self.progress.emit(bytes_read)
+                case "finished":
+                    self.timer.stop()
+                    self.finished.emit()
+                    return
+                case "failed":
+                    self.timer.stop()
+                    self.failed.emit(payload)
+                    return
+
+
+def file_identity(path):
+    """Return a tuple identifying the current version of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def atomic_write(path, text, fsync=True):
+    """
+    Write text to path atomically and return the identity of the written file.
+
+    The text is written to a temporary file in the same directory which then replaces the target, so that a crash
+    leaves either the old or the new file behind but never a truncated one. If fsync is set, the data is flushed to
+    the disk before replacing the target, and the directory entry afterwards.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o666 & ~umask)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+    if fsync and os.name == "posix":
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    return file_identity(path)
+
+
+class SaveService(QtCore.QObject):
+    """
+    Write files atomically on a thread pool.
+
+    Saves of the same path are written in the order they were requested, saves of different paths run in parallel.
+
+    Signals:
+    saved(str, object): Emitted with the path and the identity of the written file when a save succeeds.
+    failed(str, str): Emitted with the path and an error message when a save fails.
+    idle(): Emitted when all requested saves have finished.
+    """
+
+    saved = QtCore.Signal(str, object)
+    failed = QtCore.Signal(str, str)
+    idle = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.jobs = background.BackgroundJobs("SaveService", save_workers)
+        self.jobs.finished.connect(self.finish_job)
+        self.last_job = {}
+
+    def save(self, path, text, fsync=None):
+        """Request to write text to path. The text must be a snapshot which is not modified afterwards."""
+        if fsync is None:
+            fsync = config.get("Editor", "fsync_at_save", "bool")
+
+        # A save of the same path starts once the previous one finished, so that they are written in order
+        previous = self.last_job.get(path)
+        if previous is None:
+            future = self.jobs.submit(path, atomic_write, path, text, fsync)
+        else:
+            future = self.jobs.submit_after(previous, path, atomic_write, path, text, fsync)
+        self.last_job[path] = future
+        return future
+
+    def busy(self):
+        """Return whether any saves are pending."""
+        return self.jobs.busy()
+
+    def is_saving(self, path):
+        """Return whether a save of path is pending."""
+        return path in self.last_job
+
+    def wait(self, future=None):
+        """Block until the given or all pending saves are finished. Return whether they succeeded."""
+        futures = [future] if future is not None else list(self.jobs.pending)
+        self.jobs.wait(futures)
+        return all(f.exception() is None for f in futures)
+
+    def stop(self):
+        """Release the worker threads once the pending saves are written."""
+        self.jobs.stop(cancel=False)
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, path):
+        """Report the result of a finished save."""
+        if self.last_job.get(path) is future:
+            del self.last_job[path]
+
+        success = future.exception() is None
+        if success:
+            logger.debug("Saved {!r}.", path)
+            self.saved.emit(path, future.result())
+        else:
+            logger.warning("Could not save file {!r}: {}", path, future.exception())
+            self.failed.emit(path, str(future.exception()))
+
+        if not self.jobs.busy():
+            self.idle.emit()
@@ -0,0 +1,356 @@
+from qtpy import QtCore
+
+import errno
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+from typstwriter import background
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Number of operations running at the same time, so that e.g. trashing a file does not wait for a large copy
+max_workers = 2
+
+# Number of bytes copied between checks for cancellation and updates of the progress
+chunk_size = 8 * 1024 * 1024
+
+# Interval in ms in which the progress of running operations is reported
+progress_interval = 100
+
+# Errors of copy_file_range and sendfile meaning they cannot copy between the given files, so the next method is tried
+unsupported_errors = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF}
+
+
+def copy_file_range(source, destination, offset, count):
+    """Copy within the kernel, or on file systems supporting it by sharing the blocks."""
+    return os.copy_file_range(source, destination, count, offset)
+
+
+def sendfile(source, destination, offset, count):
+    """Copy within the kernel."""
+    return os.sendfile(destination, source, offset, count)
+
+
+def read_write(source, destination, offset, count):
+    """Copy through a buffer in user space."""
+    data = memoryview(os.pread(source, count, offset))
+    written = 0
+    # Writes may be partial, e.g. when interrupted by a signal
+    while written < len(data):
+        written += os.write(destination, data[written:])
+    return written
+
+
+def copy_methods():
+    """Return the available copy methods, fastest first. Each reads from an offset and writes at the current position."""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(copy_file_range)
+    if hasattr(os, "sendfile"):
+        methods.append(sendfile)
+    if hasattr(os, "pread"):
+        methods.append(read_write)
+    return methods
+
+
+def copy_data(source, destination, size, operation):
+    """Copy size bytes between file descriptors in chunks, stopping early if the operation is cancelled."""
+    methods = copy_methods()
+    offset = 0
+    while offset < size and not operation.cancelled():
+        count = min(chunk_size, size - offset)
+        try:
+            copied = methods[0](source, destination, offset, count)
+        except OSError as e:
+            if e.errno not in unsupported_errors or len(methods) == 1:
+                raise
+            copied = 0
+        if copied == 0:
+            # Some file systems report nothing copied instead of an error
+            if len(methods) == 1:
+                break
+            methods.pop(0)
+            continue
+        offset += copied
+        operation.bytes_done += copied
+
+
+def copy_file(source, destination, operation):
+    """
+    Copy a file with its metadata.
+
+    The data is written to a temporary file next to the destination, which only replaces the destination once it is
+    complete, so that a cancelled or failed copy leaves the destination untouched.
+    """
+    directory = os.path.dirname(destination)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(destination)}.", suffix=".tmp", dir=directory)
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            copy_data(src.fileno(), dst.fileno(), os.fstat(src.fileno()).st_size, operation)
+        if operation.cancelled():
+            os.remove(tmp_path)
+            return
+        shutil.copystat(source, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def plan_file(source, destination):
+    """Return the step copying a file, links which point nowhere are linked again."""
+    try:
+        return ("file", source, destination, os.stat(source).st_size)
+    except FileNotFoundError:
+        if not os.path.islink(source):
+            raise
+        return ("link", source, destination, 0)
+
+
+def plan_copy(source, destination, operation):
+    """Return the steps copying source to destination as tuples of kind, source, destination and size."""
+    if not os.path.isdir(source):
+        return [plan_file(source, destination)]
+
+    steps = [("directory", source, destination, 0)]
+    for directory, subdirectories, files in os.walk(source):
+        # Walking a large tree takes a while, cancelling must not wait for it
+        if operation.cancelled():
+            break
+        target = os.path.join(destination, os.path.relpath(directory, source))
+        for name in subdirectories:
+            path = os.path.join(directory, name)
+            # Linked directories are linked again instead of being followed, which could copy them endlessly
+            kind = "link" if os.path.islink(path) else "directory"
+            steps.append((kind, path, os.path.join(target, name), 0))
+        steps.extend(plan_file(os.path.join(directory, name), os.path.join(target, name)) for name in files)
+    return steps
+
+
+class FileOperation:
+    """
+    A copy, move or trash operation of some paths, run by a FileOperationQueue.
+
+    The progress is counted in bytes and items by the worker thread and read by the GUI thread.
+    """
+
+    def __init__(self, kind, pairs):
+        """Init with the kind, one of copy, move and trash, and tuples of source and destination paths."""
+        self.kind = kind
+        self.pairs = list(pairs)
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.items_total = len(self.pairs)
+        self.items_done = 0
+        self.started = None
+        self.error = None
+        self.cancel_event = threading.Event()
+
+    def __repr__(self):
+        """Return a readable representation."""
+        return f"FileOperation({self.kind!r}, {len(self.pairs)} items)"
+
+    def cancel(self):
+        """Stop the operation as soon as possible, undoing the unfinished copies."""
+        self.cancel_event.set()
+
+    def cancelled(self):
+        """Return whether the operation was cancelled."""
+        return self.cancel_event.is_set()
+
+    def throughput(self):
+        """Return the bytes per second copied so far."""
+        if self.started is None:
+            return 0
+        return self.bytes_done / max(time.perf_counter() - self.started, 1e-3)
+
+    def run(self):
+        """Run the operation. Runs on a worker thread."""
+        self.started = time.perf_counter()
+        match self.kind:
+            case "copy":
+                self.copy(self.pairs)
+            case "move":
+                self.move()
+            case "trash":
+                self.trash()
+        return self
+
+    def copy(self, pairs):
+        """Copy the sources to the destinations, removing what was created if cancelled."""
+        plans = [plan_copy(source, destination, self) for (source, destination) in pairs]
+        self.bytes_total += sum(size for plan in plans for (_, _, _, size) in plan)
+
+        created = []
+        try:
+            for plan in plans:
+                for kind, source, destination, _ in plan:
+                    if self.cancelled():
+                        break
+                    if not os.path.lexists(destination):
+                        created.append(destination)
+                    self.copy_step(kind, source, destination)
+                if self.cancelled():
+                    break
+                # Copying the contents changed the modification times of the directories
+                for kind, source, destination, _ in reversed(plan):
+                    if kind == "directory":
+                        shutil.copystat(source, destination)
+                self.items_done += 1
+        finally:
+            if self.cancelled():
+                self.remove_created(created)
+
+    def copy_step(self, kind, source, destination):
+        """Create a directory, link or file of a copy."""
+        match kind:
+            case "directory":
+                os.makedirs(destination, exist_ok=True)
+            case "link":
+                os.symlink(os.readlink(source), destination, target_is_directory=os.path.isdir(source))
+            case "file":
+                copy_file(source, destination, self)
+
+    @staticmethod
+    def remove_created(created):
+        """Remove the files and directories created by a cancelled copy, the most recent first."""
+        for path in reversed(created):
+            try:
+                mode = os.lstat(path).st_mode
+                if stat.S_ISDIR(mode):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def move(self):
+        """Move the sources to the destinations, copying them if they are on another file system."""
+        for source, destination in self.pairs:
+            if self.cancelled():
+                return
+            try:
+                os.rename(source, destination)
+                self.items_done += 1
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Renaming only works within a file system, otherwise the copy counts the item
+                self.copy([(source, destination)])
+                if self.cancelled():
+                    return
+                if os.path.isdir(source) and not os.path.islink(source):
+                    shutil.rmtree(source)
+                else:
+                    os.remove(source)
+
+    def trash(self):
+        """Move the sources to the trash."""
+        failed = []
+        for source, _ in self.pairs:
+            if self.cancelled():
+                break
+            if not QtCore.QFile.moveToTrash(source):
+                failed.append(source)
+            self.items_done += 1
+        if failed:
+            raise OSError(f"Could not move {', '.join(repr(p) for p in failed)} to the trash.")
+
+
+class FileOperationQueue(QtCore.QObject):
+    """
+    Runs file operations on a pool of worker threads, so that copying large directories does not block the GUI.
+
+    Signals:
+    started(FileOperation): Emitted when an operation was queued.
+    progress(): Emitted in regular intervals while operations are running.
+    finished(FileOperation): Emitted when an operation finished, failed or was cancelled.
+    idle(): Emitted once all operations finished.
+    """
+
+    started = QtCore.Signal(object)
+    progress = QtCore.Signal()
+    finished = QtCore.Signal(object)
+    idle = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.jobs = background.BackgroundJobs("FileOperations", max_workers)
+        self.jobs.finished.connect(self.finish_job)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(progress_interval)
+        self.timer.timeout.connect(self.progress)
+
+    def copy(self, pairs):
+        """Copy files or directories, given as tuples of source and destination path."""
+        return self.submit(FileOperation("copy", pairs))
+
+    def move(self, pairs):
+        """Move files or directories, given as tuples of source and destination path."""
+        return self.submit(FileOperation("move", pairs))
+
+    def trash(self, paths):
+        """Move files or directories to the trash."""
+        return self.submit(FileOperation("trash", ((path, None) for path in paths)))
+
+    def submit(self, operation):
+        """Run an operation on a worker thread and return it."""
+        self.jobs.submit(operation, operation.run)
+        self.timer.start()
+        self.started.emit(operation)
+        return operation
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, operation):
+        """Report a finished operation."""
+        if future.cancelled():
+            operation.cancel()
+        elif future.exception() is not None:
+            operation.error = future.exception()
+            logger.warning("Could not {} {}: {}", operation.kind, [s for (s, _) in operation.pairs], operation.error)
+        else:
+            logger.debug(
+                "Finished {} of {} items, {} bytes in {:.2f} s.",
+                operation.kind,
+                operation.items_done,
+                operation.bytes_done,
+                time.perf_counter() - operation.started,
+            )
+        self.finished.emit(operation)
+
+        if not self.jobs.busy():
+            self.timer.stop()
+            self.idle.emit()
+
+    def operations(self):
+        """Return the queued and running operations, in the order they were queued."""
+        return self.jobs.contexts()
+
+    def busy(self):
+        """Return whether operations are queued or running."""
+        return self.jobs.busy()
+
+    def cancel(self):
+        """Cancel all queued and running operations."""
+        for operation in self.operations():
+            operation.cancel()
+
+    def wait(self):
+        """Block until all operations finished."""
+        self.jobs.wait()
+
+    def stop(self):
+        """Cancel all operations, e.g. before quitting, and wait for the running copies to clean up."""
+        self.cancel()
+        self.jobs.stop(wait=True)
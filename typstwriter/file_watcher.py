@@ -0,0 +1,141 @@
+from qtpy import QtCore
+
+import collections
+import hashlib
+import os
+
+from typstwriter import logging
+from typstwriter import file_io
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path):
+    """Return a hash of the content of the file at path, or None if it cannot be read or is too large to hash."""
+    digest = hashlib.blake2b()
+    try:
+        with open(path, "rb") as f:
+            # Hashing large files would block the GUI thread, their changes are detected by their identity only
+            if os.fstat(f.fileno()).st_size > file_io.chunked_loading_threshold:
+                return None
+            while data := f.read(file_io.chunk_size):
+                digest.update(data)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class FileWatcher(QtCore.QObject):
+    """
+    A file system watcher shared by all parts of typstwriter.
+
+    Paths are watched for as long as at least one subscription to them exists. Bursts of change events are collected
+    and reported once things have calmed down. Changes to files are only reported if their content changed, so touching
+    a file or writing the same content again goes unnoticed. Large files are not hashed, any change of them is reported.
+
+    Signals:
+    file_changed(str): Emitted with the path of a watched file whose content changed or which was removed.
+    directory_changed(str): Emitted with the path of a watched directory whose entries changed.
+    """
+
+    file_changed = QtCore.Signal(str)
+    directory_changed = QtCore.Signal(str)
+
+    # Time in milliseconds to wait for further events before reporting changes
+    debounce_interval = 100
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watcher.directoryChanged.connect(self.schedule)
+
+        self.subscriptions = collections.Counter()
+        self.directories = set()
+        self.versions = {}
+        self.pending = set()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.debounce_interval)
+        self.timer.timeout.connect(self.process)
+
+    def subscribe(self, path):
+        """Start watching path, or add another subscription if it is already watched."""
+        self.subscriptions[path] += 1
+        if self.subscriptions[path] == 1:
+            if os.path.isdir(path):
+                self.directories.add(path)
+            else:
+                self.versions[path] = self.version(path)
+            self.add_watch(path)
+
+    def unsubscribe(self, path):
+        """Remove a subscription of path. The path is no longer watched once all subscriptions are removed."""
+        if self.subscriptions[path] <= 0:
+            return
+
+        self.subscriptions[path] -= 1
+        if self.subscriptions[path] == 0:
+            del self.subscriptions[path]
+            self.directories.discard(path)
+            self.versions.pop(path, None)
+            self.pending.discard(path)
+            if path in self.watcher.files() or path in self.watcher.directories():
+                self.watcher.removePath(path)
+
+    def acknowledge(self, path):
+        """Accept the current content of path, e.g. after writing it, so that it is not reported as a change."""
+        if path in self.subscriptions and path not in self.directories:
+            self.versions[path] = self.version(path)
+            self.pending.discard(path)
+            self.add_watch(path)
+
+    def watched(self):
+        """Return the list of watched paths."""
+        return list(self.subscriptions)
+
+    def add_watch(self, path):
+        """Watch path unless it is already watched. Files replaced by a rename are silently dropped by the watcher."""
+        if os.path.exists(path) and path not in self.watcher.files() and path not in self.watcher.directories():
+            self.watcher.addPath(path)
+
+    @staticmethod
+    def version(path):
+        """Return the identity and content hash of a file."""
+        return (file_io.file_identity(path), file_digest(path))
+
+    @QtCore.Slot(str)
+    def schedule(self, path):
+        """Collect an event and delay reporting it until no further events arrive."""
+        self.pending.add(path)
+        self.timer.start()
+
+    @QtCore.Slot()
+    def process(self):
+        """Report all collected changes."""
+        pending, self.pending = self.pending, set()
+        for path in sorted(pending):
+            if path not in self.subscriptions:
+                continue
+
+            self.add_watch(path)
+
+            if path in self.directories:
+                self.directory_changed.emit(path)
+                continue
+
+            (identity, digest) = self.versions[path]
+            new_identity = file_io.file_identity(path)
+            if new_identity is not None and new_identity == identity:
+                continue
+
+            new_digest = file_digest(path) if new_identity is not None else None
+            self.versions[path] = (new_identity, new_digest)
+            if new_digest is not None and new_digest == digest:
+                logger.debug("Ignoring change of {!r} as its content did not change.", path)
+                continue
+
+            self.file_changed.emit(path)
@@ -0,0 +1,320 @@
+from qtpy import QtCore
+from qtpy import QtGui
+
+import bisect
+import re
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+heading_pattern = re.compile(r"\s*(=+)\s")
+fence_pattern = re.compile(r"\s*(`{3,})")
+
+
+def strip_literals(text):
+    """Remove strings, inline raw text, comments and escaped characters from a line of Typst code."""
+    code = []
+    in_string = False
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_string:
+            in_string = c != '"'
+        elif c == '"':
+            in_string = True
+        elif c == "`":
+            # Inline raw text ends with the same number of backticks it started with
+            n = len(text[i:]) - len(text[i:].lstrip("`"))
+            end = text.find("`" * n, i + n)
+            if end == -1:
+                break
+            i = end + n
+            continue
+        elif text.startswith("//", i):
+            break
+        else:
+            code.append(c)
+        i += 1
+    return "".join(code)
+
+
+def bracket_balance(text):
+    """
+    Return the number of brackets closed and opened by a line of Typst code.
+
+    Closing brackets which do not match an opening bracket of the same line count as closed, opening brackets which are
+    left open count as opened. Brackets in strings, inline raw text, comments and escaped brackets are ignored.
+    """
+    depth = 0
+    closed = 0
+    for c in strip_literals(text):
+        if c in "([{":
+            depth += 1
+        elif c in ")]}":
+            if depth:
+                depth -= 1
+            else:
+                closed += 1
+    return (closed, depth)
+
+
+def is_fence(text):
+    """Return whether a line starts or ends a raw block."""
+    match = fence_pattern.match(text)
+    return match is not None and text.find(match.group(1), match.end()) == -1
+
+
+def heading_level(text):
+    """Return the level of a heading, or 0 if the line is not a heading."""
+    match = heading_pattern.match(text)
+    return len(match.group(1)) if match else 0
+
+
+class Folding(QtCore.QObject):
+    """
+    Structural code folding for a CodeEdit.
+
+    Regions start at raw block fences, headings and lines leaving brackets open. They are computed on demand, only when
+    a line is painted or folded. Folded blocks are set invisible, so they are skipped by the document layout, which
+    makes relayouts and scrolling cheaper the more is folded. A folded region is therefore just a run of invisible
+    blocks after a visible one, which keeps fold state consistent with edits without any bookkeeping.
+    """
+
+    folds_changed = QtCore.Signal()
+
+    fence_expression = QtCore.QRegularExpression(r"^\s*`{3,}")
+
+    def __init__(self, edit):
+        """Init."""
+        super().__init__(edit)
+
+        self.edit = edit
+        self.document = edit.document()
+        # Block numbers of the fences, found once and then updated from the edited blocks
+        self.fence_blocks = None
+        self.block_count = self.document.blockCount()
+
+        self.document.contentsChange.connect(self.contents_changed)
+        self.edit.cursorPositionChanged.connect(self.reveal_cursor)
+
+    def fences(self):
+        """Return the sorted block numbers of all raw block fences."""
+        if self.fence_blocks is not None:
+            return self.fence_blocks
+
+        fences = []
+        cursor = QtGui.QTextCursor(self.document)
+        while not (cursor := self.document.find(self.fence_expression, cursor)).isNull():
+            block = cursor.block()
+            if is_fence(block.text()):
+                fences.append(block.blockNumber())
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.NextBlock)
+            if cursor.block().blockNumber() == block.blockNumber():
+                break
+        self.fence_blocks = fences
+        return fences
+
+    def update_fences(self, first, last, lines_added):
+        """Update the fences after an edit of the blocks first to last, which added lines_added lines."""
+        if self.fence_blocks is None:
+            return
+
+        edited = []
+        block = first
+        while block.isValid() and block.blockNumber() <= last.blockNumber():
+            if is_fence(block.text()):
+                edited.append(block.blockNumber())
+            block = block.next()
+
+        # Fences before the edited blocks stay, the ones after them move by the added lines
+        fences = self.fence_blocks
+        start = bisect.bisect_left(fences, first.blockNumber())
+        end = bisect.bisect_right(fences, last.blockNumber() - lines_added)
+        if lines_added or fences[start:end] != edited:
+            self.fence_blocks = fences[:start] + edited + [n + lines_added for n in fences[end:]]
+
+    def raw_state(self, number):
+        """Return whether block number is a fence opening a raw block (1), inside one or closing it (-1) or neither (0)."""
+        fences = self.fences()
+        index = bisect.bisect_left(fences, number)
+        if index < len(fences) and fences[index] == number:
+            # Only opening fences which are closed later on start a raw block
+            return 1 if index % 2 == 0 and index + 1 < len(fences) else -1
+        return -1 if index % 2 else 0
+
+    def kind(self, block):
+        """Return the kind of region starting at block, i.e. "raw", "heading" or "bracket", or None."""
+        raw = self.raw_state(block.blockNumber())
+        if raw:
+            return "raw" if raw > 0 else None
+
+        text = block.text()
+        if heading_level(text):
+            return "heading"
+        if bracket_balance(text)[1]:
+            return "bracket"
+        return None
+
+    def region(self, block):
+        """Return the number of the last block hidden when folding at block, or None if nothing can be folded."""
+        match self.kind(block):
+            case "raw":
+                end = self.raw_end(block)
+            case "heading":
+                end = self.heading_end(block)
+            case "bracket":
+                end = self.bracket_end(block)
+            case _:
+                end = None
+
+        if end is None or end <= block.blockNumber():
+            return None
+        return end
+
+    def raw_end(self, block):
+        """Return the number of the last block of the raw block opened at block."""
+        fences = self.fences()
+        return fences[bisect.bisect_right(fences, block.blockNumber())] - 1
+
+    def heading_end(self, block):
+        """Return the number of the last non-empty block before the next heading of the same or a higher level."""
+        level = heading_level(block.text())
+        end = self.document.blockCount() - 1
+        b = block.next()
+        while b.isValid():
+            if 0 < heading_level(b.text()) <= level and not self.raw_state(b.blockNumber()):
+                end = b.blockNumber() - 1
+                break
+            b = b.next()
+
+        # Keep the empty lines in front of the next heading visible
+        while end > block.blockNumber() and not self.document.findBlockByNumber(end).text().strip():
+            end -= 1
+        return end
+
+    def bracket_end(self, block):
+        """Return the number of the block before the one closing the brackets left open at block, or None."""
+        depth = bracket_balance(block.text())[1]
+        b = block.next()
+        while b.isValid():
+            if not self.raw_state(b.blockNumber()):
+                (closed, opened) = bracket_balance(b.text())
+                depth -= closed
+                if depth <= 0:
+                    # The line closing the region stays visible
+                    return b.blockNumber() - 1
+                depth += opened
+            b = b.next()
+        return None
+
+    def is_folded(self, block):
+        """Return whether the region starting at block is folded."""
+        return block.isVisible() and block.next().isValid() and not block.next().isVisible()
+
+    def set_visible(self, first, last, visible):
+        """Show or hide the blocks from first to last and relayout them."""
+        block = first
+        while block.isValid():
+            block.setVisible(visible)
+            if block == last:
+                break
+            block = block.next()
+
+        self.document.markContentsDirty(first.position(), last.position() + last.length() - first.position())
+        self.edit.viewport().update()
+        if self.edit.line_numbers:
+            self.edit.line_numbers.update()
+        self.folds_changed.emit()
+
+    def fold(self, block):
+        """Fold the region starting at block and return whether there was anything to fold."""
+        if not block.isVisible():
+            return False
+
+        end = self.region(block)
+        if end is None:
+            return False
+
+        last = self.document.findBlockByNumber(end)
+        self.set_visible(block.next(), last, False)
+
+        # Do not leave the cursor in a hidden block
+        if block.blockNumber() < self.edit.textCursor().blockNumber() <= end:
+            cursor = self.edit.textCursor()
+            cursor.setPosition(block.position() + block.length() - 1)
+            self.edit.setTextCursor(cursor)
+        return True
+
+    def unfold(self, block):
+        """Unfold the region starting at block and return whether it was folded."""
+        if not self.is_folded(block):
+            return False
+
+        first = last = block.next()
+        while last.next().isValid() and not last.next().isVisible():
+            last = last.next()
+        self.set_visible(first, last, True)
+        return True
+
+    def toggle(self, block):
+        """Fold or unfold the region starting at block."""
+        if not self.unfold(block):
+            self.fold(block)
+
+    def visible_start(self, block):
+        """Return the visible block a hidden block is folded into."""
+        while block.isValid() and not block.isVisible():
+            block = block.previous()
+        return block
+
+    def folded(self):
+        """Return the numbers of the blocks starting folded regions."""
+        folds = []
+        block = self.document.firstBlock()
+        while block.isValid():
+            if self.is_folded(block):
+                folds.append(block.blockNumber())
+            block = block.next()
+        return folds
+
+    def fold_blocks(self, numbers):
+        """Fold the regions starting at the given block numbers, e.g. the ones returned by folded."""
+        # Fold inner regions first, as the start of a region hidden by an outer fold cannot be folded anymore
+        for number in sorted(numbers, reverse=True):
+            block = self.document.findBlockByNumber(number)
+            if block.isValid():
+                self.fold(block)
+
+    @QtCore.Slot(int, int, int)
+    def contents_changed(self, position, removed, added):
+        """Unfold regions touched by an edit, unless it only changed the text of a line that still starts a region."""
+        block_count = self.document.blockCount()
+        lines_added = block_count - self.block_count
+        lines_changed = lines_added != 0
+        self.block_count = block_count
+
+        first = self.document.findBlock(position)
+        last = self.document.findBlock(position + added)
+        if not last.isValid():
+            last = self.document.lastBlock()
+        self.update_fences(first, last, lines_added)
+
+        block = self.visible_start(first)
+        while block.isValid():
+            if not block.isVisible() or (self.is_folded(block) and (lines_changed or self.kind(block) is None)):
+                self.unfold(self.visible_start(block))
+            if block == last or block.blockNumber() > last.blockNumber():
+                break
+            block = block.next()
+
+    @QtCore.Slot()
+    def reveal_cursor(self):
+        """Unfold the region the cursor was moved into, e.g. by a search."""
+        block = self.edit.textCursor().block()
+        if not block.isVisible():
+            self.unfold(self.visible_start(block))
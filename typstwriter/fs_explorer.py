@@ -3,9 +3,11 @@ from qtpy import QtCore
 from qtpy import QtWidgets
 
 import os
-import shutil
 
 from typstwriter import util
+from typstwriter import file_watcher
+from typstwriter import file_operations
+from typstwriter import fs_model
 
 from typstwriter import logging
 from typstwriter import configuration
@@ -15,6 +17,12 @@ logger = logging.getLogger(__name__)
 config = configuration.Config
 state = globalstate.State
 
+# Maximum number of paths listed when asking whether a selection should be deleted
+max_listed_paths = 10
+
+# The verbs describing the kinds of file operations in progress
+operation_verbs = {"copy": "Copying", "move": "Moving", "trash": "Moving to trash"}
+
 
 class FSContextMenu(QtWidgets.QMenu):
     """
@@ -143,16 +151,83 @@ class SelectionContextMenu(FSContextMenu):
         self.addAction(self.action_copy)
 
 
+class FileOperationsBar(QtWidgets.QWidget):
+    """Shows the progress and throughput of the running file operations and allows cancelling them."""
+
+    def __init__(self, queue, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.queue = queue
+
+        self.label = QtWidgets.QLabel(self)
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setMaximumHeight(self.label.sizeHint().height())
+        self.cancel_button = QtWidgets.QToolButton(self)
+        self.cancel_button.setIcon(QtGui.QIcon.fromTheme(QtGui.QIcon.ProcessStop))
+        self.cancel_button.setToolTip("Cancel")
+        self.cancel_button.setAutoRaise(True)
+        self.cancel_button.clicked.connect(self.queue.cancel)
+
+        layout = QtWidgets.QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+        layout.addWidget(self.label, 0, 0)
+        layout.addWidget(self.progress_bar, 1, 0)
+        layout.addWidget(self.cancel_button, 0, 1, 2, 1)
+
+        self.queue.started.connect(self.show_progress)
+        self.queue.progress.connect(self.show_progress)
+        self.queue.finished.connect(self.show_progress)
+        self.hide()
+
+    @QtCore.Slot()
+    def show_progress(self):
+        """Show the progress of all running operations, or hide once there are none."""
+        operations = self.queue.operations()
+        if not operations:
+            self.hide()
+            return
+
+        bytes_total = sum(o.bytes_total for o in operations)
+        bytes_done = sum(o.bytes_done for o in operations)
+        items_total = sum(o.items_total for o in operations)
+        items_done = sum(o.items_done for o in operations)
+
+        locale = QtCore.QLocale()
+        kinds = {o.kind for o in operations}
+        verb = operation_verbs[kinds.pop()] if len(kinds) == 1 else "Processing"
+        text = f"{verb} {items_total - items_done} of {items_total} items"
+        if bytes_total:
+            throughput = sum(o.throughput() for o in operations)
+            text += (
+                f", {locale.formattedDataSize(bytes_done)} of {locale.formattedDataSize(bytes_total)}"
+                f" at {locale.formattedDataSize(int(throughput))}/s"
+            )
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(1000 * bytes_done / bytes_total))
+        else:
+            self.progress_bar.setRange(0, items_total)
+            self.progress_bar.setValue(items_done)
+        self.label.setText(text)
+        self.show()
+
+
 class FSExplorer(QtWidgets.QWidget):
     """A filesystem explorer widget."""
 
     # directoryChanged = QtCore.Signal(str)
     open_file = QtCore.Signal(str)
 
-    def __init__(self):
+    def __init__(self, watcher=None, decorations=None):
         """Populate widget and set initial state."""
         QtWidgets.QWidget.__init__(self)
 
+        self.root = None
+        self.file_watcher = watcher if watcher is not None else file_watcher.FileWatcher(self)
+        self.file_watcher.directory_changed.connect(self.watched_directory_changed)
+
         # Populate Widget
         self.Layout = QtWidgets.QVBoxLayout(self)
         self.Layout.setContentsMargins(4, 4, 4, 4)
@@ -174,10 +249,15 @@ class FSExplorer(QtWidgets.QWidget):
         self.parentAction.triggered.connect(self.goto_parent_directory)
         self.pathBar.addAction(self.parentAction, QtWidgets.QLineEdit.TrailingPosition)
 
+        # The tree view and the completer are served from the same directory listings
+        self.scanner = fs_model.DirectoryScanner(self)
+
         self.tree_view = QtWidgets.QTreeView()
-        self.filesystem_model = QtWidgets.QFileSystemModel(self.tree_view)
-        self.filesystem_model.setIconProvider(util.FileIconProvider())
+        self.filesystem_model = fs_model.FileSystemModel(self.scanner, self.file_watcher, self.tree_view)
+        if decorations is not None:
+            self.filesystem_model.set_decorations(decorations)
         self.tree_view.setModel(self.filesystem_model)
+        self.tree_view.setUniformRowHeights(True)
         self.tree_view.setRootIsDecorated(True)
         self.tree_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.tree_view.hideColumn(1)
@@ -188,17 +268,19 @@ class FSExplorer(QtWidgets.QWidget):
         self.tree_view.header().setSectionResizeMode(3, QtWidgets.QHeaderView.ResizeMode.ResizeToContents)
         self.tree_view.doubleClicked.connect(self.doubleclicked)
 
-        # A second filesystem model is needed for the completer because only directories should be shown as completions
-        # while both files and directories should be shown in the tree view.
-        # This duplication is somewhat unsatisfying but it was decently simple to implement and the overhead is acceptable.
-        self.completer_filesystem_model = QtWidgets.QFileSystemModel()
-        self.completer_filesystem_model.setFilter(QtCore.QDir.AllDirs | QtCore.QDir.NoDotAndDotDot)
-        self.completer = QtWidgets.QCompleter()
-        self.completer.setModel(self.completer_filesystem_model)
+        # Only directories are offered as completions
+        self.completer = fs_model.DirectoryCompleter(self.scanner, self)
         self.pathBar.setCompleter(self.completer)
+        self.pathBar.textEdited.connect(self.completer.update_directory)
+
+        # Copies and deletions run in the background, their progress is shown below the tree view
+        self.file_operations = file_operations.FileOperationQueue(self)
+        self.file_operations.finished.connect(self.operation_finished)
+        self.file_operations_bar = FileOperationsBar(self.file_operations, self)
 
         self.Layout.addWidget(self.pathBar)
         self.Layout.addWidget(self.tree_view)
+        self.Layout.addWidget(self.file_operations_bar)
 
         # Add Context Menu
         self.tree_view.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
@@ -231,14 +313,28 @@ class FSExplorer(QtWidgets.QWidget):
     @QtCore.Slot(str)
     def root_changed(self, root):
         """Update root directory."""
+        if self.root is not None:
+            self.file_watcher.unsubscribe(self.root)
+        self.file_watcher.subscribe(root)
+
         self.root = root
-        self.filesystem_model.setRootPath(root)
-        self.tree_view.setRootIndex(self.filesystem_model.index(root))
-        self.completer_filesystem_model.setRootPath(root)
+        self.tree_view.setRootIndex(self.filesystem_model.setRootPath(root))
         self.pathBar.setText(root)
         logger.debug("Change Working Directory to {!r}.", root)
         # self.directoryChanged.emit(root)
 
+    @QtCore.Slot(str)
+    def watched_directory_changed(self, path):
+        """Move up to the closest existing directory if the root directory was removed."""
+        if path != self.root or os.path.isdir(path):
+            return
+
+        parent = os.path.dirname(path)
+        while not os.path.isdir(parent) and parent != os.path.dirname(parent):
+            parent = os.path.dirname(parent)
+        logger.info("The working directory {!r} was removed, changing to {!r}.", path, parent)
+        self.set_root(parent)
+
     @QtCore.Slot()
     def line_edited(self):
         """Handle LineEdits editingFinished signal. Change root directory if path is valid and resets otherwise."""
@@ -391,6 +487,7 @@ class FSExplorer(QtWidgets.QWidget):
         """Paste a file or folder from cliboard into path."""
         mime_data = QtGui.QGuiApplication.clipboard().mimeData()
 
+        pairs = []
         if mime_data.hasUrls():
             for uri in mime_data.data("text/uri-list").data().decode().split():
                 fs = QtCore.QUrl(uri).toLocalFile()
@@ -406,38 +503,57 @@ class FSExplorer(QtWidgets.QWidget):
                             QtWidgets.QLineEdit.Normal,
                             text=tail,
                         )
-                        path_to = os.path.join(path, new_tail)
                         if not ok:
-                            return
+                            continue
+                        path_to = os.path.join(path, new_tail)
 
-                    self.copy_from_to(fs, path_to)
+                    if self.can_copy(fs, path_to):
+                        pairs.append((fs, path_to))
 
-    def copy_from_to(self, path_from, path_to, overwrite=False):
-        """Copy a file or folder from path_from to path_to."""
+        # All pasted items are copied by one operation, which is cancelled as a whole
+        if pairs:
+            self.file_operations.copy(pairs)
+
+    def can_copy(self, path_from, path_to, overwrite=False):
+        """Return whether path_from can be copied to path_to, warning if path_to exists."""
         if not os.path.isdir(os.path.split(path_to)[0]):
-            return
+            return False
 
         if not os.path.exists(path_from):
-            return
+            return False
 
         if not overwrite and os.path.exists(path_to):
             logger.warning("{!r} already exists. Will not overwrite.", path_to)
             QtWidgets.QMessageBox.warning(self, "Typstwriter", f"'{path_to}' already exists.\nWill not overwrite.")
-            return
+            return False
+        return True
 
-        if os.path.isdir(path_from):
-            shutil.copytree(path_from, path_to, dirs_exist_ok=overwrite)
-        else:
-            shutil.copy2(path_from, path_to)
+    def copy_from_to(self, path_from, path_to, overwrite=False):
+        """Copy a file or folder from path_from to path_to in the background."""
+        if self.can_copy(path_from, path_to, overwrite):
+            self.file_operations.copy([(path_from, path_to)])
 
     def delete(self, paths):
-        """Delete a folder or file."""
+        """Move folders or files to the trash in the background, after asking once for all of them."""
         if not isinstance(paths, list):
             paths = [paths]
+        if not paths:
+            return
 
-        for path in paths:
-            msg = QtWidgets.QMessageBox.question(self, "Typstwriter", f"Should '{path}' be deleted?")
-            if msg == QtWidgets.QMessageBox.StandardButton.Yes:
-                deletion_succeeded = QtCore.QFile.moveToTrash(path)
-                if not deletion_succeeded:
-                    logger.warning("Could not move {!r} to trash.", path)
+        if len(paths) == 1:
+            question = f"Should '{paths[0]}' be deleted?"
+        else:
+            names = [os.path.basename(path) for path in paths[:max_listed_paths]]
+            if len(paths) > max_listed_paths:
+                names.append(f"and {len(paths) - max_listed_paths} more")
+            question = f"Should these {len(paths)} items be deleted?\n\n" + "\n".join(names)
+
+        msg = QtWidgets.QMessageBox.question(self, "Typstwriter", question)
+        if msg == QtWidgets.QMessageBox.StandardButton.Yes:
+            self.file_operations.trash(paths)
+
+    @QtCore.Slot(object)
+    def operation_finished(self, operation):
+        """Report a failed file operation."""
+        if operation.error is not None:
+            QtWidgets.QMessageBox.warning(self, "Typstwriter", str(operation.error))
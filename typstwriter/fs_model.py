@@ -0,0 +1,579 @@
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+import collections
+import fnmatch
+import os
+import time
+
+from typstwriter import background
+from typstwriter import enums
+from typstwriter import util
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Maximum number of directory listings kept in the cache, the least recently used ones are dropped first
+max_cached_directories = 1000
+
+# The columns of the model, the same as the ones of QFileSystemModel
+columns = ("Name", "Size", "Type", "Date Modified")
+
+# The roles showing the decorations of files, which are updated when they change
+decoration_roles = (
+    QtCore.Qt.ItemDataRole.FontRole,
+    QtCore.Qt.ItemDataRole.ForegroundRole,
+    QtCore.Qt.ItemDataRole.ToolTipRole,
+)
+
+
+def ignore_patterns():
+    """Return the configured patterns of the names which are not listed."""
+    return [p.strip() for p in config.get("FS Explorer", "ignore_patterns").split(",") if p.strip()]
+
+
+def is_ignored(name, patterns):
+    """Return whether name matches one of the ignore patterns."""
+    return any(fnmatch.fnmatchcase(name, p) for p in patterns)
+
+
+def normalize(path):
+    """Return the absolute, normalized path, which is used as key of the listings."""
+    return os.path.normpath(os.path.abspath(os.path.expanduser(path)))
+
+
+def list_directory(path, patterns):
+    """
+    Return the path and the entries of the directory at path which are not ignored. Runs on the scanner thread.
+
+    The entries are tuples of name, whether it is a directory, size and modification time, directories first and
+    sorted by name.
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if is_ignored(entry.name, patterns):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name, is_dir, stat.st_size, stat.st_mtime))
+    except OSError as e:
+        logger.debug("Could not list {!r}: {}", path, e)
+
+    entries.sort(key=lambda e: (not e[1], e[0].casefold(), e[0]))
+    return (path, entries)
+
+
+class DirectoryScanner(QtCore.QObject):
+    """
+    Lists directories on a single worker thread and caches the listings.
+
+    A cached listing is served right away. If it is older than the configured time to live, the directory is listed
+    again in the background and listed is emitted once that finished. The tree model and the completer of the FS
+    explorer share one scanner, so every directory is only listed once.
+
+    Signals:
+    listed(str, object): Emitted with the normalized path and the entries of a directory once it was listed.
+    """
+
+    listed = QtCore.Signal(str, object)
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.cache = collections.OrderedDict()
+        # The paths of the pending listings
+        self.pending = set()
+        self.outdated = set()
+
+        self.jobs = background.BackgroundJobs("DirectoryScanner")
+        self.jobs.finished.connect(self.finish_job)
+
+    def listing(self, path):
+        """Return the cached entries of the directory at path, or None. Lists it again if the cache is missing or stale."""
+        path = normalize(path)
+        cached = self.cache.get(path)
+        if cached is None or time.monotonic() - cached[0] > config.get("FS Explorer", "listing_ttl", typ="float"):
+            self.request(path)
+        if cached is None:
+            return None
+
+        self.cache.move_to_end(path)
+        return cached[1]
+
+    def request(self, path):
+        """List the directory at path in the background, unless that is already pending."""
+        path = normalize(path)
+        if path in self.pending:
+            return
+
+        self.pending.add(path)
+        self.jobs.submit(path, list_directory, path, ignore_patterns())
+
+    def invalidate(self, path):
+        """List the directory at path again, e.g. after it changed."""
+        path = normalize(path)
+        if path in self.pending:
+            # The pending listing may predate the change
+            self.outdated.add(path)
+        else:
+            self.request(path)
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, path):
+        """Cache a finished listing and report it."""
+        self.pending.discard(path)
+        if future.cancelled():
+            return
+        (_, entries) = future.result()
+
+        self.cache[path] = (time.monotonic(), entries)
+        self.cache.move_to_end(path)
+        while len(self.cache) > max_cached_directories:
+            self.cache.popitem(last=False)
+
+        if path in self.outdated:
+            self.outdated.discard(path)
+            self.request(path)
+
+        self.listed.emit(path, entries)
+
+    def wait(self):
+        """Block until all pending listings are finished and reported."""
+        self.jobs.wait()
+
+    def stop(self):
+        """Abort pending listings, e.g. before quitting."""
+        self.jobs.stop()
+
+
+class Node:
+    """An entry of the file system model. The children of a directory and their names are None until it was fetched."""
+
+    __slots__ = ("children", "is_dir", "mtime", "name", "names", "parent", "path", "row", "size")
+
+    def __init__(self, path, is_dir, size=0, mtime=0, parent=None):
+        """Init."""
+        self.path = path
+        self.name = os.path.basename(path)
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.parent = parent
+        self.row = 0
+        self.children = None
+        # The children by name, for looking up paths without scanning the siblings
+        self.names = None
+
+
+class FileSystemModel(QtCore.QAbstractItemModel):
+    """
+    A lazy tree model of the directories below a root path, filled from the listings of a DirectoryScanner.
+
+    Directories are listed once they are expanded and only the listed directories are watched. When a watched directory
+    changes, it is listed again and only the rows which changed are updated. Provides the parts of the interface of
+    QFileSystemModel used by the FS explorer.
+    """
+
+    def __init__(self, scanner, watcher=None, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.scanner = scanner
+        self.scanner.listed.connect(self.directory_listed)
+        self.watcher = watcher
+        if self.watcher is not None:
+            self.watcher.directory_changed.connect(self.watched_directory_changed)
+
+        self.icon_provider = util.FileIconProvider()
+        self.icons = {}
+
+        self.decorations = None
+        self.fonts = {}
+
+        self.root = None
+        self.directories = {}
+
+    def set_decorations(self, decorations):
+        """Show the decorations of the files, repainting the rows whose decoration changed."""
+        self.decorations = decorations
+        self.decorations.changed.connect(self.decorations_changed)
+
+    @QtCore.Slot(list)
+    def decorations_changed(self, paths):
+        """Repaint the listed rows of paths."""
+        for path in paths:
+            parent = self.directories.get(os.path.dirname(path))
+            if parent is None:
+                continue
+            node = parent.names.get(os.path.basename(path))
+            if node is not None:
+                first = self.createIndex(node.row, 0, node)
+                last = self.createIndex(node.row, len(columns) - 1, node)
+                self.dataChanged.emit(first, last, list(decoration_roles))
+
+    def setRootPath(self, path):  # This is an overriding function # noqa: N802
+        """Show the directories below path and return the index of the root, which is the invalid index."""
+        self.beginResetModel()
+        for directory in self.directories:
+            self.unwatch(directory)
+        self.directories = {}
+        self.root = Node(normalize(path), True)
+        # Views must not fetch the root while the model is reset
+        self.root.children = []
+        self.root.names = {}
+        self.endResetModel()
+
+        self.fetch(self.root)
+        return QtCore.QModelIndex()
+
+    def rootPath(self):  # This is an overriding function # noqa: N802
+        """Return the root path."""
+        return self.root.path if self.root is not None else ""
+
+    def node(self, index):
+        """Return the node of index, the root node for the invalid index."""
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column=0, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: B008
+        """Return the index of row and column below parent, or the index of a path like QFileSystemModel.index."""
+        if isinstance(row, str):
+            return self.path_index(row, column)
+
+        node = self.node(parent)
+        if node is None or node.children is None or not 0 <= row < len(node.children) or parent.column() > 0:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def path_index(self, path, column=0):
+        """Return the index of the listed path, or the invalid index."""
+        if self.root is None:
+            return QtCore.QModelIndex()
+        path = normalize(path)
+        relative = os.path.relpath(path, self.root.path)
+        if relative == "." or relative.startswith(os.pardir):
+            return QtCore.QModelIndex()
+
+        node = self.root
+        for name in relative.split(os.sep):
+            node = node.names.get(name) if node.names is not None else None
+            if node is None:
+                return QtCore.QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def node_index(self, node):
+        """Return the index of node."""
+        if node is self.root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def parent(self, index=None):  # This is an overriding function
+        """Return the parent of index, or the parent QObject if no index is given."""
+        if index is None:
+            return super().parent()
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self.node_index(index.internalPointer().parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return the number of listed entries below parent."""
+        node = self.node(parent)
+        if node is None or node.children is None or parent.column() > 0:
+            return 0
+        return len(node.children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return the number of columns."""
+        return len(columns)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return whether parent is a directory which is not known to be empty."""
+        node = self.node(parent)
+        if node is None or not node.is_dir or parent.column() > 0:
+            return False
+        return node.children is None or bool(node.children)
+
+    def canFetchMore(self, parent):  # This is an overriding function # noqa: N802
+        """Return whether parent is a directory which was not listed yet."""
+        node = self.node(parent)
+        return node is not None and node.is_dir and node.children is None
+
+    def fetchMore(self, parent):  # This is an overriding function # noqa: N802
+        """List the directory parent."""
+        node = self.node(parent)
+        if node is not None and node.is_dir and node.children is None:
+            self.fetch(node)
+
+    def fetch(self, node):
+        """Show the cached listing of the directory node and watch it. Rows are added once it is listed."""
+        node.children = []
+        node.names = {}
+        self.directories[node.path] = node
+        if self.watcher is not None:
+            self.watcher.subscribe(node.path)
+
+        entries = self.scanner.listing(node.path)
+        if entries is not None:
+            self.update_children(node, entries)
+
+    def unwatch(self, path):
+        """Stop watching the directory at path."""
+        if self.watcher is not None:
+            self.watcher.unsubscribe(path)
+
+    def release(self, node):
+        """Forget the fetched directories below and including node after it was removed."""
+        if node.children is None:
+            return
+        for child in node.children:
+            self.release(child)
+        if self.directories.get(node.path) is node:
+            del self.directories[node.path]
+            self.unwatch(node.path)
+
+    @QtCore.Slot(str, object)
+    def directory_listed(self, path, entries):
+        """Update the rows of a fetched directory once it was listed."""
+        node = self.directories.get(path)
+        if node is not None:
+            self.update_children(node, entries)
+
+    @QtCore.Slot(str)
+    def watched_directory_changed(self, path):
+        """List a fetched directory again once it changed."""
+        if normalize(path) in self.directories:
+            self.scanner.invalidate(path)
+
+    def update_children(self, node, entries):
+        """Change the rows below node to match the entries, removing, inserting and updating only what changed."""
+        parent = self.node_index(node)
+        self.remove_vanished(node, parent, {name: is_dir for (name, is_dir, _, _) in entries})
+        for row in self.insert_new(node, parent, entries):
+            self.dataChanged.emit(self.index(row, 1, parent), self.index(row, len(columns) - 1, parent))
+
+    def remove_vanished(self, node, parent, kinds):
+        """Remove the rows of the children of node which are not among kinds, consecutive rows at once."""
+
+        def kept(child):
+            return kinds.get(child.name) is child.is_dir
+
+        last = len(node.children) - 1
+        while last >= 0:
+            if kept(node.children[last]):
+                last -= 1
+                continue
+            first = last
+            while first > 0 and not kept(node.children[first - 1]):
+                first -= 1
+            self.beginRemoveRows(parent, first, last)
+            for child in node.children[first : last + 1]:
+                self.release(child)
+                del node.names[child.name]
+            del node.children[first : last + 1]
+            self.renumber(node, first)
+            self.endRemoveRows()
+            last = first - 1
+
+    def insert_new(self, node, parent, entries):
+        """
+        Insert rows for the entries which are not children of node yet and return the rows whose data changed.
+
+        Both lists are sorted the same way, so new entries are inserted where the names differ.
+        """
+        changed = []
+        position = 0
+        while position < len(entries):
+            (name, _, size, mtime) = entries[position]
+            if position < len(node.children) and node.children[position].name == name:
+                child = node.children[position]
+                if (child.size, child.mtime) != (size, mtime):
+                    (child.size, child.mtime) = (size, mtime)
+                    changed.append(position)
+                position += 1
+                continue
+
+            following = node.children[position].name if position < len(node.children) else None
+            end = position
+            while end < len(entries) and entries[end][0] != following:
+                end += 1
+            self.beginInsertRows(parent, position, end - 1)
+            children = [
+                Node(os.path.join(node.path, name), is_dir, size, mtime, node)
+                for (name, is_dir, size, mtime) in entries[position:end]
+            ]
+            node.children[position:position] = children
+            node.names.update((child.name, child) for child in children)
+            self.renumber(node, position)
+            self.endInsertRows()
+            position = end
+        return changed
+
+    @staticmethod
+    def renumber(node, start):
+        """Update the rows of the children of node from start on."""
+        for row in range(start, len(node.children)):
+            node.children[row].row = row
+
+    def icon(self, node):
+        """Return the icon of node, cached by type."""
+        key = True if node.is_dir else os.path.splitext(node.name)[1]
+        if key not in self.icons:
+            self.icons[key] = self.icon_provider.icon(QtCore.QFileInfo(node.path))
+        return self.icons[key]
+
+    @staticmethod
+    def text(node, column):
+        """Return the text shown for node in column."""
+        match column:
+            case 0:
+                return node.name
+            case 1:
+                return "" if node.is_dir else QtCore.QLocale().formattedDataSize(node.size)
+            case 2:
+                return "Folder" if node.is_dir else f"{os.path.splitext(node.name)[1][1:]} File".lstrip()
+            case _:
+                date = QtCore.QDateTime.fromMSecsSinceEpoch(int(1000 * node.mtime))
+                return QtCore.QLocale().toString(date, QtCore.QLocale.FormatType.ShortFormat)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        """Return the data of index."""
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+
+        match role:
+            case QtCore.Qt.ItemDataRole.DisplayRole:
+                return self.text(node, index.column())
+            case QtCore.Qt.ItemDataRole.EditRole if index.column() == 0:
+                return node.name
+            case QtCore.Qt.ItemDataRole.DecorationRole if index.column() == 0:
+                return self.icon(node)
+            case _ if role in decoration_roles:
+                return self.decoration_data(node, index.column(), role)
+            case _:
+                return None
+
+    def decoration_data(self, node, column, role):
+        """Return the tooltip, font or color showing the decoration of node."""
+        if role == QtCore.Qt.ItemDataRole.ToolTipRole:
+            return self.tooltip(node)
+        if self.decorations is None or column != 0:
+            return None
+        decoration = self.decorations.decoration(node.path)
+        if not decoration:
+            return None
+        if role == QtCore.Qt.ItemDataRole.FontRole:
+            return self.font(decoration)
+        return self.foreground(decoration)
+
+    def font(self, decoration):
+        """Return the font of a decoration, the main file is bold and unsaved files are italic, cached by decoration."""
+        key = (enums.file_decoration.main_file in decoration, enums.file_decoration.unsaved in decoration)
+        if not any(key):
+            return None
+        if key not in self.fonts:
+            font = QtGui.QFont()
+            font.setBold(key[0])
+            font.setItalic(key[1])
+            self.fonts[key] = font
+        return self.fonts[key]
+
+    @staticmethod
+    def foreground(decoration):
+        """Return the color of a decoration, files with problems are red and dependencies of the main file are links."""
+        if enums.file_decoration.problems in decoration:
+            return QtGui.QColor("red")
+        if enums.file_decoration.dependency in decoration:
+            return QtGui.QGuiApplication.palette().color(QtGui.QPalette.ColorRole.Link)
+        return None
+
+    def tooltip(self, node):
+        """Return the path of node followed by its decorations."""
+        if self.decorations is None or not self.decorations.decoration(node.path):
+            return node.path
+        return "\n".join([node.path, *self.decorations.describe(node.path)])
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):  # This is an overriding function # noqa: N802
+        """Return the column names."""
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return columns[section]
+        return None
+
+    def flags(self, index):
+        """Return the item flags, files never have children."""
+        flags = super().flags(index)
+        if index.isValid() and not index.internalPointer().is_dir:
+            flags |= QtCore.Qt.ItemFlag.ItemNeverHasChildren
+        return flags
+
+    def filePath(self, index):  # This is an overriding function # noqa: N802
+        """Return the path of index, or an empty string for the invalid index."""
+        return index.internalPointer().path if index.isValid() else ""
+
+    def isDir(self, index):  # This is an overriding function # noqa: N802
+        """Return whether index is a directory."""
+        node = self.node(index)
+        return node is not None and node.is_dir
+
+
+class DirectoryCompleter(QtWidgets.QCompleter):
+    """
+    Completes paths of directories, served from the listings of a DirectoryScanner.
+
+    The completions are the subdirectories of the directory of the typed path, which is listed once the path is edited.
+    """
+
+    def __init__(self, scanner, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.scanner = scanner
+        self.scanner.listed.connect(self.directory_listed)
+        self.directory = None
+
+        self.list_model = QtCore.QStringListModel(self)
+        self.setModel(self.list_model)
+
+    @QtCore.Slot(str)
+    def update_directory(self, text):
+        """Complete the subdirectories of the directory of text."""
+        directory = os.path.dirname(text)
+        if directory == self.directory:
+            return
+
+        self.directory = directory
+        self.list_model.setStringList([])
+        if not os.path.isabs(os.path.expanduser(directory)):
+            return
+
+        entries = self.scanner.listing(directory)
+        if entries is not None:
+            self.set_entries(entries)
+
+    def set_entries(self, entries):
+        """Offer the subdirectories among entries as completions."""
+        self.list_model.setStringList([os.path.join(self.directory, name) for (name, is_dir, _, _) in entries if is_dir])
+        widget = self.widget()
+        if widget is not None and widget.hasFocus():
+            self.setCompletionPrefix(widget.text())
+            self.complete()
+
+    @QtCore.Slot(str, object)
+    def directory_listed(self, path, entries):
+        """Update the completions once the directory of the typed path was listed."""
+        if self.directory and os.path.isabs(os.path.expanduser(self.directory)) and normalize(self.directory) == path:
+            self.set_entries(entries)
+
+    def completions(self):
+        """Return the offered completions."""
+        return self.list_model.stringList()
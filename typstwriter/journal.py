@@ -0,0 +1,245 @@
+from qtpy import QtCore
+from qtpy import QtGui
+
+import glob
+import json
+import os
+import uuid
+
+from typstwriter import logging
+from typstwriter import configuration
+from typstwriter import file_io
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Time in milliseconds edits are collected before they are appended to the journal
+flush_interval = 1000
+
+# Number of recorded edits after which the journal is rewritten as a single snapshot
+compaction_threshold = 2000
+
+
+def journal_directory():
+    """Return the directory journals are stored in."""
+    return os.path.expanduser(config.get("Internals", "journal_path"))
+
+
+class Journal(QtCore.QObject):
+    """
+    An append-only journal of the edits made to a document since it was last loaded or saved.
+
+    The journal is a file of json lines. The first line is a header naming the file the document was loaded from and
+    the identity of that file. Every following line either records an edit as position, number of removed characters
+    and added text, or holds a snapshot of the whole text which supersedes all lines before it.
+    The journal file is only created once the first edit is flushed and removed again by stop().
+    """
+
+    def __init__(self, document, parent=None, directory=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.document = document
+        self.directory = directory if directory is not None else journal_directory()
+
+        self.file = None
+        self.lock = None
+        self.header = None
+        self.recording = False
+        self.buffer = []
+        self.edits_since_snapshot = 0
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(flush_interval)
+        self.timer.timeout.connect(self.flush)
+
+        self.document.contentsChange.connect(self.record)
+
+    def start(self, path, identity):
+        """Start a fresh journal for a document whose text matches the file at path with the given identity."""
+        self.stop()
+        self.header = {"type": "header", "path": path, "identity": identity}
+        self.recording = True
+
+    def stop(self):
+        """Stop recording and remove the journal file."""
+        self.recording = False
+        self.timer.stop()
+        self.buffer.clear()
+        self.edits_since_snapshot = 0
+
+        if self.file is not None:
+            discard(self.file)
+            self.lock.unlock()
+            self.file = None
+            self.lock = None
+
+    @QtCore.Slot(int, int, int)
+    def record(self, position, removed, added):
+        """Record an edit of the document."""
+        if not self.recording:
+            return
+
+        # Qt sometimes counts the final paragraph separator of the document, which holds no text
+        end = self.document.characterCount() - 1
+        position = min(position, end)
+
+        cursor = QtGui.QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + added, end), QtGui.QTextCursor.MoveMode.KeepAnchor)
+        text = cursor.selectedText().replace("\u2029", "\n")
+
+        if not removed and not text:
+            return
+
+        self.buffer.append({"type": "edit", "position": position, "removed": removed, "text": text})
+        self.edits_since_snapshot += 1
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @QtCore.Slot()
+    def flush(self):
+        """Append the collected edits to the journal, or compact it if it grew too long."""
+        if not self.buffer:
+            return
+
+        if self.edits_since_snapshot >= compaction_threshold:
+            self.compact()
+            return
+
+        try:
+            if self.file is None:
+                self.create()
+            with open(self.file, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in self.buffer)
+            self.buffer.clear()
+        except OSError as e:
+            logger.warning("Could not write journal {!r}: {}", self.file, e)
+
+    def compact(self):
+        """Replace the journal by a snapshot of the current text."""
+        if not self.recording:
+            return
+
+        self.timer.stop()
+        lines = [self.header, {"type": "snapshot", "text": self.document.toPlainText()}]
+        try:
+            if self.file is None:
+                self.create()
+            file_io.atomic_write(self.file, "".join(json.dumps(line) + "\n" for line in lines), fsync=False)
+            self.buffer.clear()
+            self.edits_since_snapshot = 0
+        except OSError as e:
+            logger.warning("Could not write journal {!r}: {}", self.file, e)
+
+    def create(self):
+        """Create and lock a new journal file containing the header."""
+        os.makedirs(self.directory, exist_ok=True)
+        file = os.path.join(self.directory, f"{uuid.uuid4().hex}.journal")
+
+        # The lock tells other instances that this journal is in use
+        lock = QtCore.QLockFile(file + ".lock")
+        lock.setStaleLockTime(0)
+        lock.tryLock(0)
+
+        with open(file, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.header) + "\n")
+
+        self.file = file
+        self.lock = lock
+        logger.debug("Created journal {!r} for {!r}.", file, self.header["path"])
+
+
+def orphaned_journals(directory=None):
+    """Return the journals left behind by instances which did not shut down properly."""
+    if directory is None:
+        directory = journal_directory()
+
+    journals = []
+    for file in sorted(glob.glob(os.path.join(glob.escape(directory), "*.journal"))):
+        lock = QtCore.QLockFile(file + ".lock")
+        lock.setStaleLockTime(0)
+        if lock.tryLock(0):
+            lock.unlock()
+            journals.append(file)
+    return journals
+
+
+def read(file):
+    """Read a journal and return its header and entries, or None if it cannot be read."""
+    try:
+        with open(file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # The last line may be incomplete after a crash
+                    break
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read journal {!r}: {}", file, e)
+        return None
+    return (header, entries)
+
+
+def replay(file):
+    """
+    Replay a journal.
+
+    Return a tuple of the path the journal belongs to (None for new files) and the recovered text, or None if the
+    journal cannot be replayed or does not contain any changes.
+    """
+    journal = read(file)
+    if journal is None:
+        return None
+    (header, entries) = journal
+
+    path = header["path"]
+    base = ""
+    if path is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                base = f.read()
+        except (OSError, UnicodeError):
+            base = None
+
+    # Edits before the last snapshot are superseded by it
+    start = 0
+    text = None
+    for i, entry in enumerate(entries):
+        if entry["type"] == "snapshot":
+            start = i + 1
+            text = entry["text"]
+
+    if text is None:
+        identity = tuple(header["identity"]) if header["identity"] is not None else None
+        if path is not None and file_io.file_identity(path) != identity:
+            logger.warning("Could not replay journal {!r}: {!r} was changed in the meantime.", file, path)
+            return None
+        text = base
+
+    document = QtGui.QTextDocument()
+    document.setPlainText(text)
+    cursor = QtGui.QTextCursor(document)
+    for entry in entries[start:]:
+        end = document.characterCount() - 1
+        position = min(entry["position"], end)
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + entry["removed"], end), QtGui.QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(entry["text"])
+
+    text = document.toPlainText()
+    if text == base:
+        return None
+    return (path, text)
+
+
+def discard(file):
+    """Remove a journal file."""
+    try:
+        os.remove(file)
+    except OSError as e:
+        logger.info("Could not remove journal {!r}: {}", file, e)
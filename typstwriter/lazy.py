@@ -0,0 +1,98 @@
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+import importlib
+import sys
+import time
+import types
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds it took to import the modules which were imported lazily, in the order they were imported
+import_times = {}
+
+
+class LazyModule(types.ModuleType):
+    """A module which is only imported once one of its attributes is used."""
+
+    def __getattr__(self, name):
+        """Import the module and return the attribute name of it."""
+        start = time.perf_counter()
+        module = importlib.import_module(self.__name__)
+        import_times[self.__name__] = time.perf_counter() - start
+        logger.debug("Imported {} lazily in {:.1f} ms", self.__name__, 1000 * import_times[self.__name__])
+
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def module(name):
+    """Return the module name, which is imported once it is used unless it is imported already."""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+class PaintWatcher(QtCore.QObject):
+    """Calls callback once control returns to the event loop after widget was painted for the first time."""
+
+    def __init__(self, widget, callback):
+        """Init."""
+        super().__init__(widget)
+
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):  # This is an overriding function # noqa: N802
+        """Wait for the first paint event."""
+        if event.type() == QtCore.QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            QtCore.QTimer.singleShot(0, self.callback)
+            self.deleteLater()
+        return False
+
+
+def after_first_paint(widget, callback):
+    """Call callback once widget was painted for the first time."""
+    PaintWatcher(widget, callback)
+
+
+class LazyDockWidget(QtWidgets.QDockWidget):
+    """
+    A dock widget which only constructs its widget when it is shown for the first time.
+
+    factory is called without arguments and returns the widget. It is called after the empty dock was painted, so that
+    docks which are visible on startup do not delay showing the window.
+
+    Signals:
+    built(QWidget): Emitted with the widget once it was constructed.
+    """
+
+    built = QtCore.Signal(QtWidgets.QWidget)
+
+    def __init__(self, title, factory, parent=None, lazy=True):
+        """Init."""
+        super().__init__(title, parent)
+
+        self.factory = factory
+        self.content = None
+        if not lazy:
+            self.build()
+
+    @QtCore.Slot()
+    def build(self):
+        """Construct the widget, unless it was constructed already, and return it."""
+        if self.content is None:
+            self.content = self.factory()
+            self.setWidget(self.content)
+            self.built.emit(self.content)
+        return self.content
+
+    def showEvent(self, event):  # This is an overriding function # noqa: N802
+        """Construct the widget after the dock was painted."""
+        super().showEvent(event)
+        if self.content is None:
+            after_first_paint(self, self.build)
@@ -0,0 +1,453 @@
+from qtpy import QtCore
+
+import contextlib
+import json
+import os
+import pathlib
+import queue
+import shlex
+import subprocess
+import threading
+import urllib.parse
+import urllib.request
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Time in seconds the server is given to exit after it was asked to shut down
+shutdown_timeout = 2
+
+# LSP DiagnosticSeverity
+severities = {1: "error", 2: "warning", 3: "information", 4: "hint"}
+
+# LSP TextDocumentSyncKind
+sync_full = 1
+sync_incremental = 2
+
+# The token types the client understands, see semantic_tokens
+token_types = [
+    "namespace",
+    "type",
+    "function",
+    "variable",
+    "parameter",
+    "property",
+    "keyword",
+    "string",
+    "number",
+    "operator",
+    "comment",
+    "escape",
+    "marker",
+    "label",
+    "ref",
+    "heading",
+    "bool",
+    "punct",
+    "raw",
+    "link",
+    "pol",
+    "error",
+    "text",
+]
+
+
+def server_command():
+    """Return the configured command starting the language server as a list of arguments."""
+    return shlex.split(config.get("LSP", "command"))
+
+
+def path_to_uri(path):
+    """Return the file URI of a path."""
+    return pathlib.Path(os.path.abspath(path)).as_uri()
+
+
+def uri_to_path(uri):
+    """Return the path of a file URI."""
+    return urllib.request.url2pathname(urllib.parse.urlparse(uri).path)
+
+
+def encode(message):
+    """Return a JSON-RPC message framed with its header."""
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+
+
+def read_message(stream):
+    """Read one framed JSON-RPC message from a binary stream. Return None at the end of the stream."""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        (name, _, value) = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+
+    if length is None:
+        raise ValueError("Message without Content-Length header")
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def read_messages(stream, deliver):
+    """Pass every message read from a stream to deliver, and None once the stream ended. Runs on the reader thread."""
+    try:
+        while (message := read_message(stream)) is not None:
+            deliver(message)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read from the language server: {}", e)
+    deliver(None)
+
+
+def write_messages(stream, outbox):
+    """Write the messages put into outbox to a binary stream until None is put. Runs on the writer thread."""
+    try:
+        while (message := outbox.get()) is not None:
+            stream.write(encode(message))
+            stream.flush()
+    except OSError as e:
+        logger.warning("Could not write to the language server: {}", e)
+    finally:
+        with contextlib.suppress(OSError):
+            stream.close()
+
+
+def semantic_tokens(data, legend):
+    """Decode the relative integer encoding of semantic tokens into tuples of line, column, length and type."""
+    tokens = []
+    line = 0
+    column = 0
+    for i in range(0, len(data) - 4, 5):
+        (delta_line, delta_column, length, token_type, _) = data[i : i + 5]
+        line += delta_line
+        column = column + delta_column if delta_line == 0 else delta_column
+        name = legend[token_type] if token_type < len(legend) else None
+        tokens.append((line, column, length, name))
+    return tokens
+
+
+class SyncedDocument(QtCore.QObject):
+    """
+    A document opened on the language server, which is kept in sync by sending its edits as incremental changes.
+
+    The edits are pulled from the ChangeTracker of the document once control returns to the event loop, so that all
+    edits made in the meantime are sent in a single notification.
+    """
+
+    def __init__(self, server, path, changes, version):
+        """Init with the version of the text the server was sent when the document was opened."""
+        super().__init__(server)
+
+        self.server = server
+        self.path = path
+        self.uri = path_to_uri(path)
+        self.changes = changes
+        self.document = changes.document
+        self.version = version
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.send_changes)
+        self.changes.changed.connect(self.timer.start)
+
+    def close(self):
+        """Stop syncing the document."""
+        self.changes.changed.disconnect(self.timer.start)
+        self.timer.stop()
+
+    def position(self, line, column):
+        """Return the position in the document of an LSP line and column."""
+        block = self.document.findBlockByNumber(min(line, self.document.blockCount() - 1))
+        return block.position() + min(column, block.length() - 1)
+
+    @QtCore.Slot()
+    def send_changes(self):
+        """Send the edits since the last sent version to the server."""
+        deltas = self.changes.deltas_since(self.version)
+        if deltas == []:
+            return
+
+        if deltas is None or self.server.sync != sync_incremental or any(d.start is None for d in deltas):
+            (self.version, text) = self.changes.snapshot()
+            changes = [{"text": text}]
+        else:
+            self.version = deltas[-1].version
+            changes = [
+                {
+                    "range": {
+                        "start": {"line": d.start[0], "character": d.start[1]},
+                        "end": {"line": d.end[0], "character": d.end[1]},
+                    },
+                    "text": d.text,
+                }
+                for d in deltas
+            ]
+
+        self.server.notify(
+            "textDocument/didChange",
+            {"textDocument": {"uri": self.uri, "version": self.version}, "contentChanges": changes},
+        )
+
+
+class LanguageServer(QtCore.QObject):
+    """
+    A client for a Typst language server, e.g. tinymist, started as a subprocess and spoken to over stdio.
+
+    Messages are written and read by two threads, so that the GUI never blocks on the server. Read messages are relayed
+    to the GUI thread, where responses are passed to the callback given with their request.
+
+    Signals:
+    started(): Emitted when the server finished initializing.
+    stopped(): Emitted when the server exited.
+    diagnostics_published(str, list): Emitted with a path and its diagnostics as tuples of severity, line (1-based),
+        column and length, the format used by CodeEdit.highlight_errors.
+    """
+
+    started = QtCore.Signal()
+    stopped = QtCore.Signal()
+    diagnostics_published = QtCore.Signal(str, list)
+
+    # Relays messages from the reader thread to the GUI thread
+    message_received = QtCore.Signal(object)
+
+    def __init__(self, parent=None, command=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.command = command if command is not None else server_command()
+        self.process = None
+        self.outbox = queue.Queue()
+        self.initialized = False
+        # Messages sent before the server finished initializing
+        self.queued = []
+        self.next_id = 1
+        self.callbacks = {}
+        self.capabilities = {}
+        self.sync = sync_incremental
+        self.documents = {}
+
+        self.message_received.connect(self.handle_message, QtCore.Qt.ConnectionType.QueuedConnection)
+
+    def start(self, root=None):
+        """Start the server for the workspace at root. Return whether it could be started."""
+        try:
+            self.process = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=root
+            )
+        except OSError as e:
+            logger.warning("Could not start the language server {!r}: {}", self.command, e)
+            return False
+
+        self.outbox = queue.Queue()
+        threading.Thread(target=read_messages, args=(self.process.stdout, self.relay), daemon=True).start()
+        threading.Thread(target=write_messages, args=(self.process.stdin, self.outbox), daemon=True).start()
+
+        params = {
+            "processId": os.getpid(),
+            "rootUri": path_to_uri(root) if root else None,
+            "workspaceFolders": [{"uri": path_to_uri(root), "name": os.path.basename(root)}] if root else None,
+            "capabilities": {
+                "general": {"positionEncodings": ["utf-16"]},
+                "textDocument": {
+                    "synchronization": {"didSave": True},
+                    "publishDiagnostics": {},
+                    "completion": {"completionItem": {"snippetSupport": False}},
+                    "semanticTokens": {
+                        "requests": {"full": True},
+                        "tokenTypes": token_types,
+                        "tokenModifiers": [],
+                        "formats": ["relative"],
+                    },
+                },
+            },
+        }
+        self.request("initialize", params, self.initialize_finished, queue_until_initialized=False)
+        return True
+
+    def running(self):
+        """Return whether the server process is running."""
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        """Ask the server to shut down and wait a moment for it to exit, e.g. before quitting."""
+        if self.process is None:
+            return
+
+        if self.initialized:
+            self.request("shutdown", None)
+            self.notify("exit", None)
+        self.outbox.put(None)
+        try:
+            self.process.wait(shutdown_timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning("The language server did not exit, killing it.")
+            self.process.kill()
+            self.process.wait()
+        self.finish()
+
+    def finish(self):
+        """Forget the state of the exited server."""
+        if self.process is None:
+            return
+
+        self.outbox.put(None)
+        self.process.stdout.close()
+        self.process = None
+        self.initialized = False
+        self.queued.clear()
+        self.callbacks.clear()
+        for document in self.documents.values():
+            document.close()
+        self.documents.clear()
+        self.stopped.emit()
+
+    def send(self, message, queue_until_initialized=True):
+        """Send a message, or keep it until the server is initialized."""
+        if self.process is None:
+            return
+        if queue_until_initialized and not self.initialized:
+            self.queued.append(message)
+        else:
+            self.outbox.put(message)
+
+    def request(self, method, params, callback=None, queue_until_initialized=True):
+        """Send a request, after any pending edits so that it refers to the current text. The result is passed to callback."""
+        for synced in self.documents.values():
+            synced.send_changes()
+
+        message = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+        if callback is not None:
+            self.callbacks[self.next_id] = callback
+        self.next_id += 1
+        self.send(message, queue_until_initialized)
+
+    def notify(self, method, params):
+        """Send a notification."""
+        self.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def relay(self, message):
+        """Hand a message from the reader thread to the GUI thread."""
+        self.message_received.emit(message)
+
+    @QtCore.Slot(object)
+    def handle_message(self, message):
+        """Dispatch a message from the server."""
+        if message is None:
+            if self.process is not None:
+                logger.info("The language server exited.")
+                self.process.wait()
+                self.finish()
+            return
+
+        if "method" in message and "id" in message:
+            self.answer(message)
+        elif "id" in message:
+            callback = self.callbacks.pop(message["id"], None)
+            if "error" in message:
+                logger.warning("The language server reported an error: {}", message["error"].get("message"))
+            elif callback is not None:
+                callback(message.get("result"))
+        elif message.get("method") == "textDocument/publishDiagnostics":
+            self.publish_diagnostics(message["params"])
+        elif message.get("method") == "window/logMessage":
+            logger.debug("Language server: {}", message["params"].get("message"))
+
+    def answer(self, message):
+        """Answer a request of the server. Configuration is left at the defaults and everything else is acknowledged."""
+        result = None
+        if message["method"] == "workspace/configuration":
+            result = [None] * len(message["params"].get("items", []))
+        self.send({"jsonrpc": "2.0", "id": message["id"], "result": result}, queue_until_initialized=False)
+
+    def initialize_finished(self, result):
+        """Complete the initialization handshake and send the messages kept until now."""
+        self.capabilities = result.get("capabilities", {}) if result else {}
+        sync = self.capabilities.get("textDocumentSync", sync_incremental)
+        self.sync = sync.get("change", sync_incremental) if isinstance(sync, dict) else sync
+
+        self.initialized = True
+        self.send({"jsonrpc": "2.0", "method": "initialized", "params": {}}, queue_until_initialized=False)
+        for message in self.queued:
+            self.outbox.put(message)
+        self.queued.clear()
+        self.started.emit()
+
+    def open_document(self, path, changes):
+        """Start syncing the file at path from the ChangeTracker of its document, replacing a previously opened path."""
+        if self.process is None:
+            return
+
+        for old in [d for d in self.documents.values() if d.changes is changes or d.path == path]:
+            self.close_document(old.path)
+
+        (version, text) = changes.snapshot()
+        synced = SyncedDocument(self, path, changes, version)
+        self.documents[path] = synced
+        language = "typst" if path.endswith(".typ") else "plaintext"
+        params = {"textDocument": {"uri": synced.uri, "languageId": language, "version": version, "text": text}}
+        self.notify("textDocument/didOpen", params)
+
+    def close_document(self, path):
+        """Stop syncing the file at path."""
+        synced = self.documents.pop(path, None)
+        if synced is not None:
+            synced.close()
+            synced.deleteLater()
+            self.notify("textDocument/didClose", {"textDocument": {"uri": synced.uri}})
+
+    def document_saved(self, path):
+        """Tell the server that a file was saved."""
+        if path in self.documents:
+            self.notify("textDocument/didSave", {"textDocument": {"uri": self.documents[path].uri}})
+
+    def publish_diagnostics(self, params):
+        """Convert the diagnostics of a file to the format of CodeEdit.highlight_errors and emit them."""
+        path = uri_to_path(params["uri"])
+        synced = self.documents.get(path)
+        if synced is None:
+            return
+
+        errors = []
+        for diagnostic in params.get("diagnostics", []):
+            start = diagnostic["range"]["start"]
+            end = diagnostic["range"]["end"]
+            position = synced.position(start["line"], start["character"])
+            length = max(synced.position(end["line"], end["character"]) - position, 0)
+            severity = severities.get(diagnostic.get("severity", 1), "error")
+            errors.append((severity, start["line"] + 1, position - synced.position(start["line"], 0), length))
+        self.diagnostics_published.emit(path, errors)
+
+    def complete(self, path, line, column, callback):
+        """Request completions at a line and column of an opened file. callback is passed a list of labels."""
+        if path not in self.documents:
+            return
+
+        def finished(result):
+            items = result.get("items", []) if isinstance(result, dict) else result or []
+            callback([item["label"] for item in items])
+
+        params = {"textDocument": {"uri": self.documents[path].uri}, "position": {"line": line, "character": column}}
+        self.request("textDocument/completion", params, finished)
+
+    def request_semantic_tokens(self, path, callback):
+        """Request the semantic tokens of an opened file. callback is passed a list as returned by semantic_tokens."""
+        if path not in self.documents:
+            return
+
+        legend = self.capabilities.get("semanticTokensProvider", {}).get("legend", {}).get("tokenTypes", token_types)
+
+        def finished(result):
+            callback(semantic_tokens(result.get("data", []) if result else [], legend))
+
+        self.request("textDocument/semanticTokens/full", {"textDocument": {"uri": self.documents[path].uri}}, finished)
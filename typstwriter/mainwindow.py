@@ -2,15 +2,28 @@ from qtpy import QtGui
 from qtpy import QtCore
 from qtpy import QtWidgets
 
+import os
+
 from typstwriter import menubar
 from typstwriter import toolbar
 from typstwriter import actions
 from typstwriter import editor
-from typstwriter import pdf_viewer
 from typstwriter import fs_explorer
+from typstwriter import outline
+from typstwriter import problems
 from typstwriter import compiler_tools
 from typstwriter import compiler
 from typstwriter import util
+from typstwriter import file_watcher
+from typstwriter import journal
+from typstwriter import workspace_index
+from typstwriter import file_index
+from typstwriter import file_finder
+from typstwriter import decorations
+from typstwriter import lazy
+from typstwriter import profiling
+from typstwriter import typst_probe
+from typstwriter import watchdog
 
 from typstwriter import logging
 from typstwriter import configuration
@@ -22,6 +35,11 @@ config = configuration.Config
 state = globalstate.State
 args = arguments.Args
 
+# Imports QtPdf, which takes a while
+pdf_viewer = lazy.module("typstwriter.pdf_viewer")
+# Only needed if a language server is used
+lsp = lazy.module("typstwriter.lsp")
+
 
 class MainWindow(QtWidgets.QMainWindow):
     """The main window."""
@@ -34,6 +52,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setObjectName("MainWindow")
         self.setWindowIcon(QtGui.QIcon(util.icon_path("typstwriter.svg")))
 
+        # Logs stalls of the event loop with the stack of the GUI thread
+        self.watchdog = watchdog.Watchdog(self)
+        if config.get("Watchdog", "enabled", typ="bool"):
+            self.watchdog.start()
+
         # Actions
         self.actions = actions.Actions(self)
 
@@ -66,33 +89,69 @@ class MainWindow(QtWidgets.QMainWindow):
         self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.Widgetidget)
         self.verticalLayout_3.setContentsMargins(0, 0, 0, 0)
 
-        # PDF Viewer
-        self.PDFWidget = pdf_viewer.PDFViewer()
-        self.verticalLayout_1.addWidget(self.PDFWidget)
+        # In the lazy startup mode the PDF viewer and the docks are only constructed after the editor was shown
+        self.lazy_startup = config.get("General", "startup_mode") == "lazy"
+
+        # Watches the opened files and the working directory for all of the below
+        self.file_watcher = file_watcher.FileWatcher(self)
+
+        # Indexes the labels and bibliography keys of all files in the working directory
+        self.workspace_index = workspace_index.WorkspaceIndex(self)
+        # Indexes the paths of all files in the working directory for Go to File
+        self.file_index = file_index.FileIndex(self)
+        self.file_finder = None
+        # Tracks the main file, its dependencies, unsaved files and files with problems for the FS explorer
+        self.decorations = decorations.Decorations(self)
+        self.typst_probe = typst_probe.TypstProbe(self)
+
+        # Checks the opened documents while typing, if a language server is used
+        self.language_server = None
+        if config.get("LSP", "enabled", typ="bool"):
+            self.language_server = lsp.LanguageServer(self)
+            self.language_server.start(state.working_directory.Value)
 
         # Editor
-        self.editor = editor.Editor()
+        self.editor = editor.Editor(self.file_watcher, self.workspace_index, self.language_server)
         self.verticalLayout_3.addWidget(self.editor)
 
+        # CompilerConnector
+        self.CompilerConnector = compiler.WrappedCompilerConnector(state.compiler_mode.Value)
+        # Set while the compiler waits for the pending saves to start
+        self.compiler_start_pending = False
+
+        # PDF Viewer
+        self.PDFWidget = None
+        if not self.lazy_startup:
+            self.create_pdf_viewer()
+
         # FSExplorer
-        self.FSExplorer = fs_explorer.FSExplorer()
-        self.FSdock = QtWidgets.QDockWidget("File System Explorer", self)
-        self.FSdock.setWidget(self.FSExplorer)
+        self.FSExplorer = None
+        self.FSdock = lazy.LazyDockWidget("File System Explorer", self.create_fs_explorer, self, lazy=self.lazy_startup)
         self.FSdock.setFeatures(QtWidgets.QDockWidget.DockWidgetMovable)
         self.FSdock.setAllowedAreas(QtCore.Qt.DockWidgetArea.LeftDockWidgetArea | QtCore.Qt.DockWidgetArea.RightDockWidgetArea)
         self.addDockWidget(QtCore.Qt.LeftDockWidgetArea, self.FSdock)
 
+        # Outline
+        self.Outline = None
+        self.Outlinedock = lazy.LazyDockWidget("Outline", self.create_outline, self, lazy=self.lazy_startup)
+        self.Outlinedock.setFeatures(QtWidgets.QDockWidget.DockWidgetMovable)
+        self.Outlinedock.setAllowedAreas(
+            QtCore.Qt.DockWidgetArea.LeftDockWidgetArea | QtCore.Qt.DockWidgetArea.RightDockWidgetArea
+        )
+        self.addDockWidget(QtCore.Qt.LeftDockWidgetArea, self.Outlinedock)
+
         # CompilerOptions
-        self.CompilerOptions = compiler_tools.CompilerOptions()
-        self.CompilerOptionsdock = QtWidgets.QDockWidget("Compiler Options", self)
-        self.CompilerOptionsdock.setWidget(self.CompilerOptions)
+        self.CompilerOptions = None
+        self.CompilerOptionsdock = lazy.LazyDockWidget(
+            "Compiler Options", self.create_compiler_options, self, lazy=self.lazy_startup
+        )
         self.CompilerOptionsdock.setFeatures(QtWidgets.QDockWidget.DockWidgetMovable)
         self.CompilerOptionsdock.setAllowedAreas(
             QtCore.Qt.DockWidgetArea.LeftDockWidgetArea | QtCore.Qt.DockWidgetArea.RightDockWidgetArea
         )
         self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.CompilerOptionsdock)
 
-        # Compiler Output
+        # Compiler Output and Problems collect the results of every compilation, so they are always constructed
         self.CompilerOutput = compiler_tools.CompilerOutput()
         self.CompilerOutputdock = QtWidgets.QDockWidget("Compiler Output", self)
         self.CompilerOutputdock.setWidget(self.CompilerOutput)
@@ -102,8 +161,15 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.CompilerOutputdock)
 
-        # CompilerConnector
-        self.CompilerConnector = compiler.WrappedCompilerConnector(state.compiler_mode.Value)
+        # Problems
+        self.Problems = problems.ProblemsView()
+        self.Problemsdock = QtWidgets.QDockWidget("Problems", self)
+        self.Problemsdock.setWidget(self.Problems)
+        self.Problemsdock.setFeatures(QtWidgets.QDockWidget.DockWidgetMovable)
+        self.Problemsdock.setAllowedAreas(
+            QtCore.Qt.DockWidgetArea.LeftDockWidgetArea | QtCore.Qt.DockWidgetArea.RightDockWidgetArea
+        )
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.Problemsdock)
 
         # Connect signals and slots
         self.actions.new_File.triggered.connect(self.editor.new_file)
@@ -112,6 +178,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.menubar.recent_files_menu.open_file.connect(self.editor.open_file)
         self.menubar.recent_files_menu.display_recent_files(self.editor.recentFiles.list())
         self.actions.load_last_Session.triggered.connect(self.load_session)
+        self.actions.go_to_file.triggered.connect(self.show_file_finder)
         self.actions.save.triggered.connect(self.editor.saveactive_tab)
         self.actions.save_as.triggered.connect(self.editor.saveactive_tab_as)
         self.actions.close.triggered.connect(self.editor.closeactive_tab)
@@ -120,6 +187,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actions.cut.triggered.connect(self.editor.cut)
         self.actions.paste.triggered.connect(self.editor.paste)
         self.actions.search.triggered.connect(self.editor.search)
+        self.actions.go_to_definition.triggered.connect(self.editor.go_to_definition)
         self.actions.layout_typewriter.triggered.connect(self.set_layout_typewriter)
         self.actions.layout_editorL.triggered.connect(self.set_layout_editorL)
         self.actions.layout_editorR.triggered.connect(self.set_layout_editorR)
@@ -129,27 +197,52 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actions.show_fs_explorer.toggled.connect(self.set_fs_explorer_visibility)
         self.actions.show_compiler_options.toggled.connect(self.set_compiler_options_visibility)
         self.actions.show_compiler_output.toggled.connect(self.set_compiler_output_visibility)
+        self.actions.show_outline.toggled.connect(self.set_outline_visibility)
+        self.actions.show_problems.toggled.connect(self.set_problems_visibility)
         self.actions.show_fs_explorer.setChecked(True)
         self.actions.show_compiler_options.setChecked(True)
         self.actions.show_compiler_output.setChecked(True)
+        self.actions.show_outline.setChecked(True)
+        self.actions.show_problems.setChecked(True)
         if config.get("Editor", "save_at_run", "bool"):
             self.actions.run.activated.connect(self.editor.save_all)
         self.actions.run.activated.connect(self.prepare_compilation)
-        self.actions.run.activated.connect(self.CompilerConnector.start)
-        self.actions.run.deactivated.connect(self.CompilerConnector.stop)
+        self.actions.run.activated.connect(self.start_compiler)
+        self.editor.save_service.idle.connect(self.saves_finished)
+        self.actions.run.deactivated.connect(self.stop_compiler)
         self.CompilerConnector.started.connect(lambda: self.actions.run.setChecked(True))
         self.CompilerConnector.stopped.connect(lambda: self.actions.run.setChecked(False))
         self.actions.open_config.triggered.connect(self.open_config)
+        self.actions.export_slow_operations.triggered.connect(self.export_slow_operations)
 
-        self.FSExplorer.open_file.connect(self.editor.open_file)
-        state.working_directory.Signal.connect(self.FSExplorer.root_changed)
+        self.editor.TabWidget.currentChanged.connect(self.update_outline)
         self.editor.text_changed.connect(self.CompilerConnector.source_changed)
-        self.CompilerConnector.document_changed.connect(self.PDFWidget.reload)
+        self.file_watcher.file_changed.connect(self.CompilerConnector.source_changed)
+        self.file_watcher.file_changed.connect(self.workspace_index.update_file)
+        self.file_watcher.directory_changed.connect(self.workspace_index.directory_changed)
+        self.editor.save_service.saved.connect(self.workspace_index.update_file)
+        state.working_directory.Signal.connect(self.workspace_index.set_root)
+        self.workspace_index.set_root(state.working_directory.Value)
+        self.file_watcher.directory_changed.connect(self.file_index.directory_changed)
+        self.editor.save_service.saved.connect(self.file_index.file_saved)
+        state.working_directory.Signal.connect(self.file_index.set_root)
+        self.file_index.set_root(state.working_directory.Value)
+        state.main_file.Signal.connect(self.decorations.set_main_file)
+        self.decorations.set_main_file(state.main_file.Value)
+        self.file_watcher.file_changed.connect(self.decorations.file_changed)
+        self.editor.save_service.saved.connect(self.decorations.file_changed)
+        self.editor.unsaved_files_changed.connect(self.decorations.set_unsaved)
+        self.CompilerConnector.compilation_finished.connect(self.decorations.clear_compiler_problems)
+        self.CompilerConnector.error_report.connect(self.decorations.set_compiler_problems)
+        if self.language_server is not None:
+            self.language_server.diagnostics_published.connect(self.decorations.set_language_server_problems)
         self.CompilerConnector.compilation_finished.connect(self.editor.clear_errors)
         self.CompilerConnector.error_report.connect(self.editor.apply_errors)
-        state.main_file.Signal.connect(lambda s: self.CompilerConnector.stop())
-        state.main_file.Signal.connect(lambda s: self.CompilerOptions.main_changed(s))  # noqa: PLW0108
-        state.main_file.Signal.connect(lambda s: self.PDFWidget.open(util.pdf_path(s)))
+        self.CompilerConnector.compilation_finished.connect(self.Problems.model.clear)
+        self.CompilerConnector.error_report.connect(self.Problems.model.set_report)
+        self.Problems.open_location.connect(self.open_problem)
+        state.main_file.Signal.connect(lambda s: self.stop_compiler())
+        state.main_file.Signal.connect(self.main_file_changed)
 
         # For now only display errors
         self.CompilerConnector.compilation_started.connect(self.CompilerOutput.insert_block)
@@ -165,9 +258,12 @@ class MainWindow(QtWidgets.QMainWindow):
         # Use default theme
         self.use_default_theme()
 
-        # Load last session
-        if config.get("General", "resume_last_session", "bool"):
-            self.load_session()
+        # Load last session, otherwise only offer to recover unsaved changes
+        with profiling.span("session restore"):
+            if config.get("General", "resume_last_session", "bool"):
+                self.load_session()
+            else:
+                self.recover_unsaved_changes()
 
         # Open files if given as arguments
         for file in args.files:
@@ -177,11 +273,60 @@ class MainWindow(QtWidgets.QMainWindow):
         if len(self.editor.tabs_list()) == 0:
             self.editor.welcome()
 
-        # Check if typst is available
-        QtCore.QTimer().singleShot(0, self.check_typst_availability)
+        # Construct the PDF viewer once the editor was painted
+        if self.lazy_startup:
+            lazy.after_first_paint(self.editor, self.create_pdf_viewer)
+
+        # Check if typst is available, without waiting for it
+        self.typst_probe.finished.connect(self.check_typst_availability)
+        QtCore.QTimer().singleShot(0, self.typst_probe.start)
 
         logger.info("Gui ready")
 
+    def create_pdf_viewer(self):
+        """Construct the PDF viewer."""
+        self.PDFWidget = pdf_viewer.PDFViewer()
+        self.verticalLayout_1.addWidget(self.PDFWidget)
+        self.CompilerConnector.document_changed.connect(self.PDFWidget.reload)
+        if state.main_file.Value is not None:
+            self.PDFWidget.open(util.pdf_path(state.main_file.Value))
+
+    def create_fs_explorer(self):
+        """Construct the file system explorer."""
+        self.FSExplorer = fs_explorer.FSExplorer(self.file_watcher, self.decorations)
+        self.FSExplorer.open_file.connect(self.editor.open_file)
+        state.working_directory.Signal.connect(self.FSExplorer.root_changed)
+        return self.FSExplorer
+
+    @QtCore.Slot()
+    def show_file_finder(self):
+        """Show the popup to go to a file of the working directory, constructing it on first use."""
+        if self.file_finder is None:
+            self.file_finder = file_finder.FileFinder(self.file_index, self)
+            self.file_finder.open_file.connect(self.editor.open_file)
+        self.file_finder.popup()
+
+    def create_outline(self):
+        """Construct the outline."""
+        self.Outline = outline.OutlineView()
+        self.update_outline()
+        return self.Outline
+
+    def create_compiler_options(self):
+        """Construct the compiler options."""
+        self.CompilerOptions = compiler_tools.CompilerOptions()
+        if state.main_file.Value is not None:
+            self.CompilerOptions.main_changed(state.main_file.Value)
+        return self.CompilerOptions
+
+    @QtCore.Slot(object)
+    def main_file_changed(self, path):
+        """Show the new main file and its PDF."""
+        if self.CompilerOptions is not None:
+            self.CompilerOptions.main_changed(path)
+        if self.PDFWidget is not None:
+            self.PDFWidget.open(util.pdf_path(path))
+
     def set_layout_typewriter(self):
         """Set Typstwriter Layout: PDF on top, Editor on bottom."""
         # Vertical orientation
@@ -224,6 +369,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actions.show_fs_explorer.setChecked(config.get("Layout", "show_fs_explorer", typ="bool"))
         self.actions.show_compiler_options.setChecked(config.get("Layout", "show_compiler_options", typ="bool"))
         self.actions.show_compiler_output.setChecked(config.get("Layout", "show_compiler_output", typ="bool"))
+        self.actions.show_outline.setChecked(config.get("Layout", "show_outline", typ="bool"))
+        self.actions.show_problems.setChecked(config.get("Layout", "show_problems", typ="bool"))
 
         self.splitter.setSizes([1e6, 1e6])
 
@@ -246,17 +393,61 @@ class MainWindow(QtWidgets.QMainWindow):
         """Set the visibility of the fs explplorer."""
         self.CompilerOutputdock.setVisible(visibility)
 
+    def set_outline_visibility(self, visibility):
+        """Set the visibility of the outline."""
+        self.Outlinedock.setVisible(visibility)
+
+    def set_problems_visibility(self, visibility):
+        """Set the visibility of the problems."""
+        self.Problemsdock.setVisible(visibility)
+
+    @QtCore.Slot(str, int, int)
+    def open_problem(self, path, line, column):
+        """Open the location of a problem, showing the stored errors of its file without compiling again."""
+        self.editor.open_location(path, line, column, self.Problems.model.errors_for(path))
+
+    @QtCore.Slot()
+    def update_outline(self):
+        """Show the outline of the active editor page."""
+        if self.Outline is None:
+            return
+        page = self.editor.TabWidget.currentWidget()
+        self.Outline.set_edit(page.edit if isinstance(page, editor.EditorPage) else None)
+
     def open_config(self):
         """Open config file."""
         config.write()
         util.open_with_external_program(config.writepath)
 
+    @QtCore.Slot()
+    def export_slow_operations(self):
+        """Write the slow operations report to a file chosen by the user."""
+        default = os.path.join(state.working_directory.Value, "slow_operations.txt")
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Slow Operations Report", default, "Text Files (*.txt)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.watchdog.report())
+        except OSError as e:
+            logger.warning("Could not write file {!r}: {}", path, e)
+            QtWidgets.QMessageBox.warning(self, "Typstwriter", f"Could not write '{path}'.")
+
     def closeEvent(self, event):  # noqa: N802
         """Handle close event."""
-        self.CompilerConnector.stop()
+        self.stop_compiler()
         self.save_session()
         s = self.editor.tryclose()
         if s:
+            self.workspace_index.stop()
+            self.file_index.stop()
+            self.decorations.stop()
+            if self.FSExplorer is not None:
+                self.FSExplorer.file_operations.stop()
+                self.FSExplorer.scanner.stop()
+            self.watchdog.stop()
+            if self.language_server is not None:
+                self.language_server.stop()
             event.accept()
         else:
             event.ignore()
@@ -271,7 +462,30 @@ class MainWindow(QtWidgets.QMainWindow):
         if main:
             self.CompilerConnector.set_fin(main)
             self.CompilerConnector.set_fout(util.pdf_path(main))
-            self.PDFWidget.open(util.pdf_path(main))
+            if self.PDFWidget is not None:
+                self.PDFWidget.open(util.pdf_path(main))
+
+    @QtCore.Slot()
+    def start_compiler(self):
+        """Start the compiler once all pending saves have reached the disk."""
+        if self.editor.save_service.busy():
+            self.compiler_start_pending = True
+        else:
+            self.CompilerConnector.start()
+
+    @QtCore.Slot()
+    def saves_finished(self):
+        """Start the compiler if it waits for the saves and Run was not toggled off meanwhile."""
+        if self.compiler_start_pending:
+            self.compiler_start_pending = False
+            if self.actions.run.isChecked():
+                self.CompilerConnector.start()
+
+    @QtCore.Slot()
+    def stop_compiler(self):
+        """Stop the compiler, or keep it from starting once the pending saves are written."""
+        self.compiler_start_pending = False
+        self.CompilerConnector.stop()
 
     def load_session(self):
         """Load the last session."""
@@ -280,17 +494,46 @@ class MainWindow(QtWidgets.QMainWindow):
         if session:
             (working_directory, files) = session
             state.working_directory.Value = working_directory
-            for f in files:
-                self.editor.open_file(f)
+            self.editor.open_files_lazily(files)
+
+        self.recover_unsaved_changes()
+
+    def recover_unsaved_changes(self):
+        """Offer to recover unsaved changes from journals left behind by a crash."""
+        recoveries = []
+        for file in journal.orphaned_journals():
+            recovery = journal.replay(file)
+            if recovery is None:
+                journal.discard(file)
+            else:
+                recoveries.append((file, *recovery))
+
+        if not recoveries:
+            return
+
+        names = "\n".join(path if path else "*new*" for (_, path, _) in recoveries)
+        ans = QtWidgets.QMessageBox.question(
+            self,
+            "Recover unsaved changes",
+            f"Typstwriter was not closed properly.\nUnsaved changes to these documents can be recovered:\n\n{names}\n\n"
+            "Do you want to recover them?",
+        )
+
+        for file, path, text in recoveries:
+            if ans == QtWidgets.QMessageBox.StandardButton.Yes:
+                logger.info("Recovering unsaved changes to {!r}.", path)
+                self.editor.restore(path, text)
+            journal.discard(file)
 
     def save_session(self):
         """Save the current session."""
         logger.debug("Saving last session.")
-        util.write_session_file(state.working_directory.Value, self.editor.openfiles_list())
+        util.write_session_file(state.working_directory.Value, self.editor.session())
 
-    def check_typst_availability(self):
-        """Check if typst is available."""
-        if not util.typst_available():
+    @QtCore.Slot(dict)
+    def check_typst_availability(self, record):
+        """Warn if the typst probe did not find a working typst."""
+        if not record["available"]:
             logger.warning("The typst executable was not found.")
 
             msg_box = QtWidgets.QMessageBox()
@@ -40,6 +40,7 @@ class MenuBar(QtWidgets.QMenuBar):
         self.menuFile.addAction(actions.open_File)
         self.recent_files_menu = RecentFilesMenu()
         self.menuFile.addMenu(self.recent_files_menu)
+        self.menuFile.addAction(actions.go_to_file)
         self.menuFile.addAction(actions.load_last_Session)
         self.menuFile.addSeparator()
         self.menuFile.addAction(actions.save)
@@ -55,6 +56,7 @@ class MenuBar(QtWidgets.QMenuBar):
         self.menuEdit.addAction(actions.paste)
         self.menuEdit.addSeparator()
         self.menuEdit.addAction(actions.search)
+        self.menuEdit.addAction(actions.go_to_definition)
 
         self.layout_menu = QtWidgets.QMenu(self)
         self.layout_menu.setTitle("Layout")
@@ -76,10 +78,14 @@ class MenuBar(QtWidgets.QMenuBar):
         self.menuView.addAction(actions.show_fs_explorer)
         self.menuView.addAction(actions.show_compiler_options)
         self.menuView.addAction(actions.show_compiler_output)
+        self.menuView.addAction(actions.show_outline)
+        self.menuView.addAction(actions.show_problems)
         self.menuView.addSeparator()
         self.menuView.addMenu(self.editor_zoom_menu)
 
         self.menuSettings.addAction(actions.open_config)
+        self.menuSettings.addSeparator()
+        self.menuSettings.addAction(actions.export_slow_operations)
 
 
 class RecentFilesMenu(QtWidgets.QMenu):
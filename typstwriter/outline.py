@@ -0,0 +1,231 @@
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+import collections
+import re
+
+from typstwriter import folding
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+label_pattern = re.compile(r"<([\w\-:.]+)>")
+reference_pattern = re.compile(r"(?<![\w@])@([\w\-:.]*[\w\-])")
+function_pattern = re.compile(r"\s*#?let\s+([\w\-]+)\(")
+heading_pattern = re.compile(r"\s*=+\s+(.*?)\s*(<[\w\-:.]+>)?\s*$")
+
+# The kinds of symbols shown in the outline, references are only indexed
+outline_kinds = ("heading", "label", "function")
+outline_icons = {"heading": "format-text-bold", "label": "tag", "function": "code-function"}
+
+
+class Symbol:
+    """A symbol found in a block of a document."""
+
+    __slots__ = ("block", "column", "kind", "level", "name")
+
+    def __init__(self, kind, name, block, column, level=0):
+        """Init."""
+        self.kind = kind
+        self.name = name
+        self.block = block
+        self.column = column
+        self.level = level
+
+    def line(self):
+        """Return the number of the line the symbol is in."""
+        return self.block.blockNumber()
+
+    def position(self):
+        """Return the position of the symbol in the document."""
+        return self.block.position() + self.column
+
+    def __repr__(self):
+        """Repr."""
+        return f"Symbol({self.kind!r}, {self.name!r}, line={self.line()}, column={self.column})"
+
+
+def scan(block):
+    """Return the symbols of a block."""
+    text = block.text()
+    symbols = []
+
+    level = folding.heading_level(text)
+    if level:
+        match = heading_pattern.match(text)
+        symbols.append(Symbol("heading", match.group(1), block, 0, level))
+    elif match := function_pattern.match(text):
+        symbols.append(Symbol("function", match.group(1), block, match.start(1)))
+
+    symbols.extend(Symbol("label", m.group(1), block, m.start()) for m in label_pattern.finditer(text))
+    symbols.extend(Symbol("reference", m.group(1), block, m.start()) for m in reference_pattern.finditer(text))
+    return tuple(symbols)
+
+
+class SymbolIndex(QtCore.QObject):
+    """
+    An index of the headings, labels, references and function definitions of a document.
+
+    The symbols of every block are kept in a list parallel to the blocks of the document and are updated from
+    contentsChange, rescanning only the changed blocks. Symbols are additionally collected by kind and name, so that
+    e.g. the definition of a label can be looked up in constant time. The revision of a kind counts the changes of its
+    names, so that consumers can cache what they derive from them.
+
+    Signals:
+    changed(): Emitted after the symbols of the document changed.
+    """
+
+    changed = QtCore.Signal()
+
+    def __init__(self, document, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.document = document
+        self.blocks = []
+        self.names = {kind: collections.defaultdict(list) for kind in (*outline_kinds, "reference")}
+        self.revisions = collections.Counter()
+
+        self.update(0, 0, self.document.characterCount())
+        self.document.contentsChange.connect(self.update)
+
+    @QtCore.Slot(int, int, int)
+    def update(self, position, removed, added):
+        """Rescan the blocks changed by an edit."""
+        first = self.document.findBlock(position)
+        if not first.isValid():
+            first = self.document.lastBlock()
+        last = self.document.findBlock(position + added)
+        if not last.isValid():
+            last = self.document.lastBlock()
+
+        start = first.blockNumber()
+        stop = last.blockNumber() + 1
+        # The number of blocks before the edit follows from how much the number of blocks changed
+        old_stop = stop - (self.document.blockCount() - len(self.blocks))
+
+        symbols = []
+        block = first
+        while block.isValid() and block.blockNumber() < stop:
+            symbols.append(scan(block))
+            block = block.next()
+
+        old_symbols = self.blocks[start:old_stop]
+        self.blocks[start:old_stop] = symbols
+
+        if any(old_symbols) or any(symbols):
+            for symbol in (s for block_symbols in old_symbols for s in block_symbols):
+                entries = self.names[symbol.kind][symbol.name]
+                entries.remove(symbol)
+                if not entries:
+                    del self.names[symbol.kind][symbol.name]
+                    self.revisions[symbol.kind] += 1
+            for symbol in (s for block_symbols in symbols for s in block_symbols):
+                if symbol.name not in self.names[symbol.kind]:
+                    self.revisions[symbol.kind] += 1
+                self.names[symbol.kind][symbol.name].append(symbol)
+            self.changed.emit()
+
+    def definition(self, label):
+        """Return the symbol defining a label, or None if it is not defined."""
+        symbols = self.names["label"].get(label)
+        return symbols[0] if symbols else None
+
+    def references(self, label):
+        """Return the symbols referencing a label."""
+        return list(self.names["reference"].get(label, []))
+
+    def function(self, name):
+        """Return the symbol defining a function, or None if it is not defined."""
+        symbols = self.names["function"].get(name)
+        return symbols[0] if symbols else None
+
+    def labels(self):
+        """Return the names of all defined labels."""
+        return list(self.names["label"])
+
+    def outline(self):
+        """Return the headings, labels and function definitions of the document in order."""
+        return [s for block_symbols in self.blocks for s in block_symbols if s.kind in outline_kinds]
+
+
+class OutlineView(QtWidgets.QFrame):
+    """Shows the outline of the active document and jumps to symbols when they are clicked."""
+
+    # Time in milliseconds to wait for further changes before updating the outline
+    update_interval = 200
+
+    def __init__(self):
+        """Init."""
+        QtWidgets.QFrame.__init__(self)
+
+        self.Layout = QtWidgets.QVBoxLayout(self)
+        self.Layout.setContentsMargins(0, 0, 0, 0)
+
+        self.tree_widget = QtWidgets.QTreeWidget()
+        self.tree_widget.setHeaderHidden(True)
+        self.tree_widget.itemActivated.connect(self.jump_to)
+        self.tree_widget.itemClicked.connect(self.jump_to)
+        self.Layout.addWidget(self.tree_widget)
+
+        self.edit = None
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.update_interval)
+        self.timer.timeout.connect(self.populate)
+
+    def set_edit(self, edit):
+        """Show the outline of a CodeEdit, or nothing if edit is None."""
+        if edit is self.edit:
+            return
+
+        if self.edit is not None:
+            self.edit.symbols.changed.disconnect(self.timer.start)
+            self.edit.destroyed.disconnect(self.edit_destroyed)
+        self.edit = edit
+        if edit is not None:
+            edit.symbols.changed.connect(self.timer.start)
+            edit.destroyed.connect(self.edit_destroyed)
+        self.populate()
+
+    @QtCore.Slot()
+    def edit_destroyed(self):
+        """Forget the edit once its page was closed."""
+        self.edit = None
+        self.tree_widget.clear()
+
+    @QtCore.Slot()
+    def populate(self):
+        """Fill the tree with the symbols of the document, nested by heading level."""
+        self.timer.stop()
+        self.tree_widget.clear()
+        if self.edit is None:
+            return
+
+        # Stack of the enclosing headings as tuples of level and item
+        parents = [(0, self.tree_widget.invisibleRootItem())]
+        for symbol in self.edit.symbols.outline():
+            if symbol.kind == "heading":
+                while parents[-1][0] >= symbol.level:
+                    parents.pop()
+
+            text = f"<{symbol.name}>" if symbol.kind == "label" else symbol.name
+            item = QtWidgets.QTreeWidgetItem(parents[-1][1], [text])
+            item.setIcon(0, QtGui.QIcon.fromTheme(outline_icons[symbol.kind]))
+            item.setData(0, QtCore.Qt.ItemDataRole.UserRole, symbol)
+
+            if symbol.kind == "heading":
+                parents.append((symbol.level, item))
+
+        self.tree_widget.expandAll()
+
+    @QtCore.Slot(QtWidgets.QTreeWidgetItem, int)
+    def jump_to(self, item, _column=0):
+        """Move the cursor of the edit to the symbol of an item."""
+        symbol = item.data(0, QtCore.Qt.ItemDataRole.UserRole)
+        if self.edit is not None and symbol.block.isValid():
+            self.edit.jump_to(symbol.position())
@@ -0,0 +1,195 @@
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+import collections
+import os
+
+from typstwriter import logging
+from typstwriter import globalstate
+
+logger = logging.getLogger(__name__)
+state = globalstate.State
+
+
+# Number of rows handed to the view at a time
+fetch_size = 200
+
+columns = ("Message", "File", "Line", "Column")
+
+
+class ProblemsModel(QtCore.QAbstractTableModel):
+    """
+    The diagnostics of the latest compilation across all files.
+
+    Every problem is a tuple of path, line (1-based), column, length and message. The problems matching the filter are
+    kept sorted in rows, of which the view only fetches as many as it shows.
+    """
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.problems = []
+        self.by_path = {}
+        self.rows = []
+        self.loaded = 0
+        self.filter_text = ""
+        self.sort_column = 1
+        self.sort_order = QtCore.Qt.SortOrder.AscendingOrder
+
+    def rowCount(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return the number of fetched rows."""
+        if parent.isValid():
+            return 0
+        return self.loaded
+
+    def columnCount(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return the number of columns."""
+        if parent.isValid():
+            return 0
+        return len(columns)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Return whether there are rows which were not fetched yet."""
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):  # This is an overriding function # noqa: N802, B008
+        """Fetch the next rows."""
+        if parent.isValid():
+            return
+        count = min(fetch_size, len(self.rows) - self.loaded)
+        if count > 0:
+            self.beginInsertRows(QtCore.QModelIndex(), self.loaded, self.loaded + count - 1)
+            self.loaded += count
+            self.endInsertRows()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):  # This is an overriding function # noqa: N802
+        """Return the column titles."""
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.DisplayRole:
+            return columns[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Return the data of a problem."""
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+
+        (path, line, column, _, message) = self.rows[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return (message, self.display_path(path), line, column)[index.column()]
+        if role == QtCore.Qt.ToolTipRole:
+            return f"{path}:{line}:{column}\n{message}"
+        return None
+
+    @staticmethod
+    def display_path(path):
+        """Return path relative to the working directory."""
+        return os.path.relpath(path, start=state.working_directory.Value) if state.working_directory.Value else path
+
+    def problem(self, index):
+        """Return the problem shown in the row of index."""
+        return self.rows[index.row()]
+
+    @QtCore.Slot(collections.defaultdict)
+    def set_report(self, errors):
+        """Replace the problems by the errors of a compilation, given by path like CompilerConnector.error_report."""
+        self.problems = [
+            (path, line, column, length, message)
+            for path, entries in errors.items()
+            for (message, line, column, length) in entries
+        ]
+        self.by_path = {path: list(entries) for path, entries in errors.items()}
+        self.update_rows()
+
+    @QtCore.Slot()
+    def clear(self):
+        """Remove all problems."""
+        if self.problems:
+            self.problems = []
+            self.by_path = {}
+            self.update_rows()
+
+    def errors_for(self, path):
+        """Return the errors of a file in the format of CodeEdit.highlight_errors."""
+        return self.by_path.get(path, [])
+
+    @QtCore.Slot(str)
+    def set_filter(self, text):
+        """Only show the problems whose message or file contain text, ignoring case."""
+        self.filter_text = text.lower()
+        self.update_rows()
+
+    def sort(self, column, order=QtCore.Qt.SortOrder.AscendingOrder):
+        """Sort the problems by a column."""
+        self.sort_column = column
+        self.sort_order = order
+        self.update_rows()
+
+    def sort_key(self, problem):
+        """Return the key sorting a problem by the sort column."""
+        (path, line, column, _, message) = problem
+        match self.sort_column:
+            case 0:
+                return (message.lower(), path, line, column)
+            case 2:
+                return (line, path, column)
+            case 3:
+                return (column, path, line)
+            case _:
+                return (path, line, column)
+
+    def update_rows(self):
+        """Filter and sort the problems and show the first rows."""
+        self.beginResetModel()
+        text = self.filter_text
+        rows = [p for p in self.problems if text in p[4].lower() or text in self.display_path(p[0]).lower()]
+        rows.sort(key=self.sort_key, reverse=self.sort_order == QtCore.Qt.SortOrder.DescendingOrder)
+        self.rows = rows
+        self.loaded = min(fetch_size, len(rows))
+        self.endResetModel()
+
+
+class ProblemsView(QtWidgets.QFrame):
+    """
+    Lists the problems of the latest compilation and opens their location when they are activated.
+
+    Signals:
+    open_location(str, int, int): Emitted with the path, line (1-based) and column of an activated problem.
+    """
+
+    open_location = QtCore.Signal(str, int, int)
+
+    def __init__(self):
+        """Init."""
+        QtWidgets.QFrame.__init__(self)
+
+        self.Layout = QtWidgets.QVBoxLayout(self)
+        self.Layout.setContentsMargins(0, 0, 0, 0)
+
+        self.filter = QtWidgets.QLineEdit()
+        self.filter.setPlaceholderText("Filter")
+        self.filter.setClearButtonEnabled(True)
+        self.Layout.addWidget(self.filter)
+
+        self.model = ProblemsModel(self)
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(1, QtCore.Qt.SortOrder.AscendingOrder)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)
+        self.Layout.addWidget(self.table)
+
+        self.filter.textChanged.connect(self.model.set_filter)
+        self.table.activated.connect(self.activate)
+        self.table.clicked.connect(self.activate)
+
+    @QtCore.Slot(QtCore.QModelIndex)
+    def activate(self, index):
+        """Open the location of the problem at index."""
+        (path, line, column, _, _) = self.model.problem(index)
+        self.open_location.emit(path, line, column)
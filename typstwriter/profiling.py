@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import importlib.abc
+import json
+import os
+import sys
+import threading
+import time
+
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# The trace is written to the current directory unless a path is given
+default_trace_path = "typstwriter-startup-trace.json"
+
+# Milliseconds between two samples of the event loop latency
+sample_interval = 10
+
+# Seconds the event loop latency is sampled after the first paint, which covers the work deferred until then
+sampling_time = 2
+
+# The profiler of this run, if the startup is profiled
+active = None
+
+
+def requested(argv):
+    """Return whether argv asks to profile the startup, before the arguments are parsed."""
+    return any(a == "--profile-startup" or a.startswith("--profile-startup=") for a in argv[1:])
+
+
+def trace_path(path):
+    """Return path if the trace can be written to it, so that e.g. a Typst file given after the option is not overwritten."""
+    if not path.endswith(".json"):
+        msg = f"the trace path {path!r} does not end in .json, use --profile-startup=PATH before file arguments"
+        raise argparse.ArgumentTypeError(msg)
+    return path
+
+
+def start():
+    """Start profiling the startup and return the profiler."""
+    global active  # noqa: PLW0603
+    active = Profiler()
+    sys.meta_path.insert(0, ImportTimer(active))
+    return active
+
+
+def span(name):
+    """Return a context manager recording a span of the startup, if the startup is profiled."""
+    if active is None:
+        return contextlib.nullcontext()
+    return active.span(name)
+
+
+class Profiler:
+    """
+    Records the startup as Chrome trace events, which can be viewed with Perfetto or chrome://tracing.
+
+    Spans are recorded as complete events, the event loop latency as counter events. Times are given in microseconds
+    since the profiler was created.
+    """
+
+    def __init__(self):
+        """Init."""
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.timer = None
+        self.last_sample = None
+
+    def now(self):
+        """Return the microseconds since the profiler was created."""
+        return 1e6 * (time.perf_counter() - self.origin)
+
+    def complete(self, name, category, start, end):
+        """Record a span from start to end."""
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start,
+                "dur": end - start,
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+            }
+        )
+
+    @contextlib.contextmanager
+    def span(self, name, category="startup"):
+        """Record the span of the with block."""
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, category, start, self.now())
+
+    def counter(self, name, values):
+        """Record the values of a counter."""
+        self.events.append({"name": name, "ph": "C", "ts": self.now(), "pid": self.pid, "args": values})
+
+    def trace(self):
+        """Return the recorded events as Chrome trace."""
+        metadata = {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "Typstwriter"}}
+        return {"traceEvents": [metadata, *self.events], "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        """Write the Chrome trace to path."""
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+        logger.info("Wrote the startup trace to {!r}.", os.path.abspath(path))
+
+    def finish(self, window, path, done=None):
+        """
+        Wait for the first paint of window, sample the event loop latency, write the trace to path and call done.
+
+        done defaults to quitting the application.
+        """
+        from qtpy import QtCore  # noqa: PLC0415
+
+        from typstwriter import lazy  # noqa: PLC0415
+
+        shown = self.now()
+
+        def painted():
+            self.complete("first paint", "startup", shown, self.now())
+            self.timer = QtCore.QTimer()
+            self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            self.timer.setInterval(sample_interval)
+            self.timer.timeout.connect(self.sample)
+            self.last_sample = time.perf_counter()
+            self.timer.start()
+            QtCore.QTimer.singleShot(1000 * sampling_time, stop)
+
+        def stop():
+            self.timer.stop()
+            self.write(path)
+            (done or (lambda: QtCore.QCoreApplication.exit(0)))()
+
+        lazy.after_first_paint(window, painted)
+
+    def sample(self):
+        """Record how much later than planned the sampling timer fired."""
+        now = time.perf_counter()
+        latency = max(0.0, 1000 * (now - self.last_sample) - sample_interval)
+        self.last_sample = now
+        self.counter("event loop latency", {"ms": latency})
+
+
+class TimedLoader(importlib.abc.Loader):
+    """Wraps the loader of a module and records the time it takes to create and execute the module."""
+
+    def __init__(self, loader, profiler):
+        """Init."""
+        self.loader = loader
+        self.profiler = profiler
+        self.start = None
+
+    def create_module(self, spec):
+        """Create the module with the wrapped loader."""
+        self.start = self.profiler.now()
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        """Execute the module with the wrapped loader."""
+        start = self.start if self.start is not None else self.profiler.now()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            # Other code expects the original loader
+            module.__loader__ = self.loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self.loader
+            self.profiler.complete(module.__name__, "import", start, self.profiler.now())
+
+    def __getattr__(self, name):
+        """Forward everything else to the wrapped loader."""
+        return getattr(self.loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Finds modules with the other finders and wraps their loaders, so that every import is recorded as span."""
+
+    def __init__(self, profiler):
+        """Init."""
+        self.profiler = profiler
+
+    def find_spec(self, name, path, target=None):
+        """Find the module with the other finders."""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader, self.profiler)
+                return spec
+        return None
@@ -0,0 +1,41 @@
+from typstwriter import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Layers in the order they are drawn, layers which are not listed are drawn afterwards
+layer_order = ("errors", "search")
+
+
+class SelectionLayers:
+    """
+    Keeps the extra selections of a CodeEdit in separate layers, e.g. errors and search matches.
+
+    Every layer is cached on its own. Qt takes all extra selections at once, so they are only handed to the edit when a
+    layer actually changes and unrelated events, e.g. moving the cursor, submit nothing at all.
+    """
+
+    def __init__(self, edit):
+        """Init."""
+        self.edit = edit
+        self.layers = {name: [] for name in layer_order}
+
+    def get(self, name):
+        """Return the selections of a layer."""
+        return self.layers.get(name, [])
+
+    def set(self, name, selections):
+        """Replace the selections of a layer."""
+        selections = list(selections)
+        if not selections and not self.get(name):
+            return
+        self.layers[name] = selections
+        self.apply()
+
+    def clear(self, name):
+        """Remove the selections of a layer."""
+        self.set(name, [])
+
+    def apply(self):
+        """Hand the selections of all layers to the edit."""
+        self.edit.setExtraSelections([s for selections in self.layers.values() for s in selections])
@@ -0,0 +1,175 @@
+from qtpy import QtCore
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+import platformdirs
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Seconds a single typst invocation may take, listing the fonts scans every font of the system
+probe_timeout = 30
+
+version_regex = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+
+def executable_identity(name):
+    """Return the path, modification time and size of the executable found for name, or None if it is not found."""
+    path = shutil.which(name)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"executable": os.path.realpath(path), "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def run(executable, *arguments):
+    """Run the executable and return its output, or None if it failed."""
+    try:
+        process = subprocess.run(
+            [executable, *arguments],
+            check=False,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=probe_timeout,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.info("Running {!r} failed: {}", executable, e)
+        return None
+    if process.returncode != 0:
+        return None
+    return process.stdout
+
+
+def package_paths():
+    """Return the directories typst looks for local and downloaded packages in."""
+    return {
+        "local": os.environ.get("TYPST_PACKAGE_PATH", os.path.join(platformdirs.user_data_dir(), "typst", "packages")),
+        "cache": os.environ.get("TYPST_PACKAGE_CACHE_PATH", os.path.join(platformdirs.user_cache_dir(), "typst", "packages")),
+    }
+
+
+def probe(identity):
+    """Run the typst executable of identity and return its capability record."""
+    record = {**identity, "available": False, "version": None, "fonts": [], "package_paths": package_paths()}
+
+    output = run(identity["executable"], "--version")
+    if output is None or "typst" not in output.lower():
+        return record
+    match = version_regex.search(output)
+    record["available"] = True
+    record["version"] = match.group(0) if match else output.strip()
+
+    fonts = run(identity["executable"], "fonts")
+    if fonts is not None:
+        record["fonts"] = [line.strip() for line in fonts.splitlines() if line.strip()]
+
+    return record
+
+
+def version_tuple(record):
+    """Return the version of a capability record as tuple of integers, or None if it is unknown."""
+    match = version_regex.search(record.get("version") or "") if record else None
+    return tuple(int(n) for n in match.groups()) if match else None
+
+
+def read_cache(identity):
+    """Return the cached capability record of identity, or None if there is none."""
+    path = os.path.expanduser(config.get("Internals", "typst_probe_path"))
+    try:
+        with open(path, "r") as f:
+            record = json.load(f)
+    except OSError:
+        return None
+    except ValueError:
+        logger.warning("Invalid typst probe cache {!r}.", path)
+        return None
+
+    if not isinstance(record, dict) or any(record.get(key) != value for key, value in identity.items()):
+        return None
+    return record
+
+
+def write_cache(record):
+    """Cache a capability record."""
+    path = os.path.expanduser(config.get("Internals", "typst_probe_path"))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(record, f)
+    except OSError:
+        logger.info("Could not write file {!r}.", path)
+
+
+class TypstProbe(QtCore.QObject):
+    """
+    Finds out which typst is installed without blocking the GUI.
+
+    The capability record holds the path, modification time and size of the executable, whether it is a working typst,
+    its version, the installed fonts and the package directories. Working typsts are cached and only probed again once
+    the executable changes. Until the probe finished, record is None.
+
+    Signals:
+    finished(dict): Emitted with the capability record once it is known.
+    """
+
+    finished = QtCore.Signal(dict)
+    probed = QtCore.Signal(dict)
+
+    def __init__(self, parent=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.record = None
+        self.probed.connect(self.probe_finished, QtCore.Qt.ConnectionType.QueuedConnection)
+
+    @QtCore.Slot()
+    def start(self):
+        """Look up the capability record of the configured typst, probing it in the background if it is not cached."""
+        identity = executable_identity(config.get("Compiler", "name"))
+        if identity is None:
+            self.probe_finished({"executable": None, "available": False, "version": None, "fonts": [], "package_paths": {}})
+            return
+
+        record = read_cache(identity)
+        if record is not None:
+            self.probe_finished(record)
+            return
+
+        threading.Thread(target=self.run, args=(identity,), daemon=True).start()
+
+    def run(self, identity):
+        """Probe typst and cache the result, runs in a background thread."""
+        record = probe(identity)
+        # Failures may be transient, e.g. a timeout of a busy system, so they are probed again on the next start
+        if record["available"]:
+            write_cache(record)
+        self.probed.emit(record)
+
+    @QtCore.Slot(dict)
+    def probe_finished(self, record):
+        """Store the capability record."""
+        logger.debug("Typst probe: available {}, version {}.", record["available"], record["version"])
+        self.record = record
+        self.finished.emit(record)
+
+    def available(self):
+        """Return whether a working typst was found, or None if the probe did not finish yet."""
+        return None if self.record is None else self.record["available"]
+
+    def version(self):
+        """Return the version of typst as tuple of integers, or None if it is unknown."""
+        return version_tuple(self.record)
@@ -9,39 +9,55 @@ import qtpy  # noqa: E402 RUF100
 
 def main():
     """Run Typstwriter."""
+    # Start profiling first, the arguments are only parsed after some imports
+    from typstwriter import profiling  # noqa: PLC0415
+
+    profiler = profiling.start() if profiling.requested(sys.argv) else None
+
     # Initialise logging
-    from typstwriter import logging  # noqa: PLC0415
+    with profiling.span("logging"):
+        from typstwriter import logging  # noqa: PLC0415
 
-    logging.setup_logger(os.environ.get("LOGLEVEL"))
+        logging.setup_logger(os.environ.get("LOGLEVEL"))
     logger = logging.getLogger(__name__)
     logger.debug("Logging initialized")
 
     # Parse Arguments
     logger.debug("Parse Arguments")
-    from typstwriter import arguments  # noqa: F401, PLC0415
+    with profiling.span("arguments"):
+        from typstwriter import arguments  # noqa: PLC0415
 
     # Start Typstwriter
     logger.info("Typstwriter started")
 
     # Initialise Config
     logger.info("Reading Config")
-    from typstwriter import configuration  # noqa: F401, PLC0415
+    with profiling.span("configuration"):
+        from typstwriter import configuration  # noqa: F401, PLC0415
 
     # Initialise State
     logger.info("Initialising State")
-    from typstwriter import globalstate  # noqa: F401, PLC0415
+    with profiling.span("globalstate"):
+        from typstwriter import globalstate  # noqa: F401, PLC0415
 
     # With logging, config and state set up, import the main GUI
-    from typstwriter import mainwindow  # noqa: PLC0415
+    with profiling.span("import mainwindow"):
+        from typstwriter import mainwindow  # noqa: PLC0415
 
     # Make sure the application can receive SIGINT
     signal.signal(signal.SIGINT, signal.SIG_DFL)
 
     # Initialize the application
     logger.info("Initialize Application")
-    app = qtpy.QtWidgets.QApplication(sys.argv)
-    main = mainwindow.MainWindow()
-    main.show()
+    with profiling.span("QApplication construction"):
+        app = qtpy.QtWidgets.QApplication(sys.argv)
+    with profiling.span("MainWindow construction"):
+        main = mainwindow.MainWindow()
+        main.show()
+
+    # Quit once the startup is profiled
+    if profiler is not None:
+        profiler.finish(main, arguments.Args.profile_startup)
 
     # Run he application
     logger.info("Run Application")
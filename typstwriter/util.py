@@ -226,22 +226,6 @@ def selection_end_block(cursor):
     return c.blockNumber()
 
 
-def typst_available():
-    """Check if typst is available."""
-    valid_output = "Typst"
-    valid_exit_codes = [0, 2]
-
-    process = QtCore.QProcess()
-    process.setProcessChannelMode(QtCore.QProcess.ProcessChannelMode.MergedChannels)
-    process.start(config.get("Compiler", "name"))
-    process.waitForFinished(msecs=100)
-    output = bytes(process.readAll()).decode("utf8")
-
-    return (
-        process.exitStatus() == QtCore.QProcess.NormalExit and process.exitCode() in valid_exit_codes and valid_output in output
-    )
-
-
 def qstring_length(text):
     """
     Compute the length of a utf16-encoded QString.
@@ -259,11 +243,18 @@ def qstring_length(text):
 
 
 def read_session_file():
-    """Read Session file."""
+    """
+    Read Session file.
+
+    Return the working directory and a list of dicts holding the path, scroll position and folded lines of each opened
+    file.
+    """
     path = os.path.expanduser(config.get("Internals", "session_path"))
     try:
         with open(path, "r") as f:
             (working_directory, files) = json.load(f)
+        # Older sessions only store the paths or lack some of the fields
+        files = [{"scroll": 0, "folds": [], **({"path": f} if isinstance(f, str) else f)} for f in files]
         return (working_directory, files)
     except OSError:
         logger.info("Could not read file {!r}.", path)
@@ -0,0 +1,142 @@
+from qtpy import QtCore
+
+import collections
+import datetime
+import platform
+import sys
+import threading
+import time
+import traceback
+
+import typstwriter
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# Milliseconds between two heartbeats of the event loop
+heartbeat_interval = 20
+
+# Number of stacks sampled during a single stall
+max_samples = 5
+
+# Number of stalls kept for the report
+report_length = 100
+
+
+class Stall:
+    """A period in which the event loop did not process events, with the stacks of the GUI thread sampled meanwhile."""
+
+    __slots__ = ("duration", "stacks", "start")
+
+    def __init__(self, start, duration, stacks):
+        """Init."""
+        self.start = start
+        self.duration = duration
+        self.stacks = stacks
+
+    def __repr__(self):
+        """Repr."""
+        return f"Stall(start={self.start}, duration={self.duration:.3f}, stacks={len(self.stacks)})"
+
+    def describe(self):
+        """Return a description of the stall and the sampled stacks."""
+        start = datetime.datetime.fromtimestamp(self.start).isoformat(sep=" ", timespec="milliseconds")
+        lines = [f"Stall of {1000 * self.duration:.0f} ms at {start}"]
+        if not self.stacks:
+            lines.append("  No stack was sampled.")
+        for after, stack in self.stacks:
+            lines.append(f"  Stack of the GUI thread after {1000 * after:.0f} ms:")
+            lines.extend("    " + line for line in "".join(stack).rstrip().splitlines())
+        return "\n".join(lines)
+
+
+class Watchdog(QtCore.QObject):
+    """
+    Detects stalls of the event loop and samples where the GUI thread spends its time meanwhile.
+
+    A timer on the GUI thread beats every heartbeat_interval ms. A helper thread checks the time of the last heartbeat
+    and samples the stack of the GUI thread with sys._current_frames once the heartbeat is late by more than the
+    threshold. When the heartbeat resumes, the stall is logged and kept for the slow operations report.
+
+    Signals:
+    stalled(object): Emitted with the Stall once the event loop processes events again.
+    """
+
+    stalled = QtCore.Signal(object)
+
+    def __init__(self, parent=None, threshold=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.threshold = (threshold if threshold is not None else config.get("Watchdog", "threshold", typ="int")) / 1000
+        self.thread_id = threading.get_ident()
+        self.stalls = collections.deque(maxlen=report_length)
+
+        self.lock = threading.Lock()
+        self.last_beat = time.monotonic()
+        self.stacks = []
+        self.stopping = threading.Event()
+        self.helper = None
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(heartbeat_interval)
+        self.timer.timeout.connect(self.beat)
+
+    def start(self):
+        """Start watching the event loop."""
+        self.last_beat = time.monotonic()
+        self.stopping.clear()
+        self.timer.start()
+        self.helper = threading.Thread(target=self.watch, daemon=True)
+        self.helper.start()
+
+    def stop(self):
+        """Stop watching the event loop."""
+        self.timer.stop()
+        self.stopping.set()
+
+    @QtCore.Slot()
+    def beat(self):
+        """Record a heartbeat and report the stall if the previous heartbeat was too long ago."""
+        now = time.monotonic()
+        with self.lock:
+            gap = now - self.last_beat
+            self.last_beat = now
+            (stacks, self.stacks) = (self.stacks, [])
+
+        # The timer is due after one interval, only the time beyond that is a stall
+        duration = gap - heartbeat_interval / 1000
+        if duration > self.threshold:
+            stall = Stall(time.time() - gap, duration, stacks)
+            self.stalls.append(stall)
+            logger.warning("The event loop stalled.\n{}", stall.describe())
+            self.stalled.emit(stall)
+
+    def watch(self):
+        """Sample the stack of the GUI thread while the heartbeat is late, runs in the helper thread."""
+        while not self.stopping.wait(heartbeat_interval / 1000):
+            with self.lock:
+                late = time.monotonic() - self.last_beat - heartbeat_interval / 1000
+                due = len(self.stacks) < max_samples and late > self.threshold * (len(self.stacks) + 1)
+            if not due:
+                continue
+
+            frame = sys._current_frames().get(self.thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            with self.lock:
+                # Only keep the sample if the heartbeat did not resume in the meantime
+                if time.monotonic() - self.last_beat - heartbeat_interval / 1000 > self.threshold:
+                    self.stacks.append((late, stack))
+
+    def report(self):
+        """Return the slow operations report."""
+        header = [
+            "Slow operations report",
+            f"Typstwriter {typstwriter.__version__}, Python {platform.python_version()}, Qt {QtCore.qVersion()}",
+            f"Stalls longer than {1000 * self.threshold:.0f} ms: {len(self.stalls)}",
+        ]
+        return "\n\n".join(["\n".join(header), *(s.describe() for s in self.stalls)]) + "\n"
@@ -0,0 +1,355 @@
+from qtpy import QtCore
+
+import os
+import re
+import sqlite3
+import threading
+
+from typstwriter import background
+from typstwriter import file_watcher
+from typstwriter import folding
+from typstwriter import fs_model
+from typstwriter import outline
+
+from typstwriter import logging
+from typstwriter import configuration
+
+logger = logging.getLogger(__name__)
+config = configuration.Config
+
+
+# The file types which are indexed, by extension
+index_extensions = {".typ": "typst", ".bib": "bibtex", ".yml": "hayagriva", ".yaml": "hayagriva"}
+
+# Maximum number of files indexed in a working directory, so that e.g. a home directory does not take forever
+max_files = 10000
+
+bibtex_pattern = re.compile(r"@\w+\s*\{\s*([^,\s{}]+)\s*,")
+hayagriva_pattern = re.compile(r"""([^\s#\-"'][^:#]*?):(\s|$)""")
+# The entry types of Hayagriva, YAML files are only indexed as bibliographies if one of their entries has one of them
+hayagriva_type_pattern = re.compile(
+    r"\btype:\s*[\"']?(anthology|anthos|article|artwork|audio|blog|book|case|chapter|conference|entry|legislation|manuscript|"
+    r"misc|newspaper|original|patent|performance|periodical|post|proceedings|reference|repository|report|scene|thesis|"
+    r"video|web)\b",
+    re.IGNORECASE,
+)
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT);
+CREATE TABLE IF NOT EXISTS symbols (path TEXT, kind TEXT, name TEXT, line INTEGER, col INTEGER);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+"""
+
+
+def index_path():
+    """Return the path of the workspace index database."""
+    return os.path.expanduser(config.get("Internals", "workspace_index_path"))
+
+
+def connect(path):
+    """Open the workspace index database, creating it if necessary."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=10)
+    # Allows reading in the GUI thread while the index is updated in the background
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(schema)
+    return connection
+
+
+def is_hayagriva(text):
+    """Return whether a YAML file looks like a Hayagriva bibliography, unlike e.g. configuration files."""
+    return hayagriva_type_pattern.search(text) is not None
+
+
+def parse(path, text):
+    """Return the labels or bibliography keys defined in a file as tuples of kind, name, line and column."""
+    symbols = []
+    file_type = index_extensions.get(os.path.splitext(path)[1])
+    if file_type == "hayagriva" and not is_hayagriva(text):
+        return symbols
+    in_raw = False
+    for line, line_text in enumerate(text.splitlines()):
+        match file_type:
+            case "typst":
+                if folding.is_fence(line_text):
+                    in_raw = not in_raw
+                elif not in_raw:
+                    symbols.extend(("label", m.group(1), line, m.start()) for m in outline.label_pattern.finditer(line_text))
+            case "bibtex":
+                symbols.extend(("key", m.group(1), line, m.start(1)) for m in bibtex_pattern.finditer(line_text))
+            case "hayagriva":
+                # Entries are the keys of the top level mapping
+                if match := hayagriva_pattern.match(line_text):
+                    symbols.append(("key", match.group(1).strip(), line, 0))
+    return symbols
+
+
+def is_home(path):
+    """Return whether path is the home directory."""
+    return fs_model.normalize(path) == fs_model.normalize("~")
+
+
+def is_indexable(name, patterns):
+    """Return whether a file name has an indexed type and is not ignored."""
+    return os.path.splitext(name)[1] in index_extensions and not fs_model.is_ignored(name, patterns)
+
+
+def is_ignored_path(root, path, patterns):
+    """Return whether path or one of the directories between root and path is hidden or ignored."""
+    names = os.path.relpath(path, root).split(os.sep)
+    return any(n.startswith(".") or fs_model.is_ignored(n, patterns) for n in names if n != os.curdir)
+
+
+def indexable_files(root, patterns, stop=None):
+    """
+    Return the files below root which are indexed, skipping hidden and ignored directories.
+
+    A home directory is not walked, as it holds all kinds of unrelated files, only the files directly in it are indexed.
+    """
+    files = []
+    recursive = not is_home(root)
+    for directory, subdirectories, filenames in os.walk(root):
+        if recursive:
+            subdirectories[:] = sorted(
+                d for d in subdirectories if not d.startswith(".") and not fs_model.is_ignored(d, patterns)
+            )
+        else:
+            subdirectories[:] = []
+        files.extend(os.path.join(directory, f) for f in sorted(filenames) if is_indexable(f, patterns))
+        if len(files) >= max_files:
+            logger.warning("Only indexing the first {} files in {!r}.", max_files, root)
+            return files[:max_files]
+        if stop is not None and stop.is_set():
+            break
+    return files
+
+
+def update_files(db_path, paths, root=None, stop=None, complete=True):
+    """
+    Bring the index up to date for the given files and return the paths whose symbols changed.
+
+    Files are only parsed again if their size and modification time and then also their content changed. If root is
+    given, files below root which are not in paths are removed from the index, if paths are not complete, i.e. not all
+    indexed files below root, only if they no longer exist. Runs on a worker thread.
+    """
+    connection = connect(db_path)
+    changed = []
+    try:
+        with connection:
+            known = {row[0]: row[1:] for row in connection.execute("SELECT path, mtime_ns, size, digest FROM files")}
+
+            for path in paths:
+                if stop is not None and stop.is_set():
+                    return changed
+                if update_file(connection, path, known.get(path)):
+                    changed.append(path)
+
+            if root is not None:
+                prefix = os.path.join(root, "")
+                existing = set(paths)
+                removed = [
+                    p for p in known if p.startswith(prefix) and p not in existing and (complete or not os.path.exists(p))
+                ]
+                for path in removed:
+                    connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                    connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+                changed.extend(removed)
+    finally:
+        connection.close()
+    return changed
+
+
+def update_file(connection, path, known):
+    """Update the index entry of a file, given its known modification time, size and digest. Return whether it changed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+        return known is not None
+
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return False
+
+    digest = file_watcher.file_digest(path)
+    # Large files are not hashed, so they are parsed again whenever they changed
+    changed = known is None or digest is None or known[2] != digest
+    if changed:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            logger.info("Could not index {!r}: {}", path, e)
+            return False
+
+        connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+        connection.executemany(
+            "INSERT INTO symbols (path, kind, name, line, col) VALUES (?, ?, ?, ?, ?)",
+            ((path, *symbol) for symbol in parse(path, text)),
+        )
+
+    connection.execute(
+        "INSERT OR REPLACE INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+        (path, stat.st_mtime_ns, stat.st_size, digest),
+    )
+    return changed
+
+
+def index_directory(db_path, root, patterns, stop=None):
+    """Bring the index up to date for all files below root. Runs on a worker thread."""
+    return update_files(db_path, indexable_files(root, patterns, stop), root, stop)
+
+
+def update_directory(db_path, directory, patterns, stop=None):
+    """
+    Bring the index up to date for the files directly in a directory, e.g. after its entries changed.
+
+    Files below the directory are dropped once they no longer exist, e.g. after a subdirectory was removed. Runs on a
+    worker thread.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            paths = sorted(e.path for e in entries if e.is_file() and is_indexable(e.name, patterns))
+    except OSError:
+        paths = []
+    return update_files(db_path, paths, directory, stop, complete=False)
+
+
+class WorkspaceIndex(QtCore.QObject):
+    """
+    An on-disk index of the labels and bibliography keys defined in the files of the working directory.
+
+    The index is kept in an SQLite database and updated on a worker thread, only parsing files which changed since they
+    were last indexed. Lookups run in the GUI thread and do not wait for updates.
+
+    Signals:
+    updated(): Emitted when an update changed the indexed symbols.
+    """
+
+    updated = QtCore.Signal()
+
+    def __init__(self, parent=None, path=None):
+        """Init."""
+        super().__init__(parent)
+
+        self.path = path if path is not None else index_path()
+        self.root = None
+        self.connection = None
+        self.stop_event = threading.Event()
+
+        self.jobs = background.BackgroundJobs("WorkspaceIndex")
+        self.jobs.finished.connect(self.finish_job)
+
+    @QtCore.Slot(object)
+    def set_root(self, root):
+        """Index the files below root and resolve names from them only."""
+        self.root = root
+        self.scan()
+
+    @QtCore.Slot()
+    def scan(self):
+        """Update the index for all files below the root directory."""
+        if self.root is not None:
+            self.submit(index_directory, self.path, self.root, fs_model.ignore_patterns(), self.stop_event)
+
+    @QtCore.Slot(str)
+    def directory_changed(self, path):
+        """Update the index for the files directly in a changed directory below the root."""
+        if self.root is None or not (path == self.root or path.startswith(os.path.join(self.root, ""))):
+            return
+        patterns = fs_model.ignore_patterns()
+        if not is_ignored_path(self.root, path, patterns):
+            self.submit(update_directory, self.path, path, patterns, self.stop_event)
+
+    @QtCore.Slot(str)
+    def update_file(self, path):
+        """Update the index for a single file, e.g. after it was saved."""
+        if self.is_indexed(path):
+            self.submit(update_files, self.path, [path])
+
+    def submit(self, function, *args):
+        """Run a job on the worker thread."""
+        self.jobs.submit(None, function, *args)
+
+    @QtCore.Slot(object, object)
+    def finish_job(self, future, _):
+        """Report the result of a finished job."""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.warning("Could not update the workspace index: {}", future.exception())
+        elif future.result():
+            logger.debug("Updated the workspace index for {} files.", len(future.result()))
+            self.updated.emit()
+
+    def wait(self):
+        """Block until all pending jobs are finished."""
+        self.jobs.wait()
+
+    def stop(self):
+        """Abort pending jobs, e.g. before quitting."""
+        self.stop_event.set()
+        self.jobs.stop()
+
+    def is_indexed(self, path):
+        """Return whether a file is indexed, i.e. lies below the root and has an indexed type."""
+        return (
+            self.root is not None
+            and os.path.splitext(path)[1] in index_extensions
+            and path.startswith(os.path.join(self.root, ""))
+            and not is_ignored_path(self.root, path, fs_model.ignore_patterns())
+        )
+
+    def query(self, sql, parameters=()):
+        """Run a query in the GUI thread and return all rows, or no rows if the database cannot be read."""
+        try:
+            if self.connection is None:
+                self.connection = connect(self.path)
+            return self.connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Could not read the workspace index {!r}: {}", self.path, e)
+            return []
+
+    def root_range(self):
+        """Return the bounds of the paths below the root, so that queries only select them in SQL."""
+        prefix = os.path.join(self.root, "")
+        return (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+    def definitions(self, name):
+        """Return the locations defining a label or bibliography key as tuples of path, line and column."""
+        if self.root is None:
+            return []
+        return self.query(
+            "SELECT path, line, col FROM symbols WHERE name = ? AND path >= ? AND path < ? ORDER BY path, line",
+            (name, *self.root_range()),
+        )
+
+    def names(self, prefix, limit=50):
+        """Return up to limit names of labels and bibliography keys starting with prefix."""
+        if self.root is None:
+            return []
+        rows = self.query(
+            "SELECT DISTINCT name FROM symbols WHERE name >= ? AND name < ? AND path >= ? AND path < ? ORDER BY name LIMIT ?",
+            (prefix, prefix + "\U0010ffff", *self.root_range(), limit),
+        )
+        return [name for (name,) in rows]
+
+    def unresolved(self, names):
+        """Return the names which are neither defined as labels nor as bibliography keys."""
+        names = set(names)
+        if self.root is None or not names:
+            return names
+
+        resolved = set()
+        ordered = sorted(names)
+        # SQLite limits the number of parameters of a query
+        for i in range(0, len(ordered), 500):
+            chunk = ordered[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.query(
+                f"SELECT name FROM symbols WHERE name IN ({placeholders}) AND path >= ? AND path < ?",
+                (*chunk, *self.root_range()),
+            )
+            resolved.update(name for (name,) in rows)
+        return names - resolved